@@ -0,0 +1,91 @@
+"""Compares one-off requests.put calls with the pooled APIService session.
+
+A local stub server answers attendance PUTs after a fixed delay. Each burst
+is sent serially and from a few threads, the way the recognition workers
+report results. The stub speaks plain HTTP, so the saving shown here is only
+the TCP handshake; against the HTTPS backend each new connection also pays
+a TLS handshake.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_api_client
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.services.api_service import APIService
+
+BURST = 200
+THREADS = 4
+SERVER_DELAY = 0.002
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = set()
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_PUT(self):
+        with self.lock:
+            self.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(SERVER_DELAY)
+        data = json.dumps({"message": "updated"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _burst(put, threads):
+    body = {"FRIdentifiedId": "", "checkIn": "2025-01-01 10:00:00"}
+    paths = [f"attendance/{i}" for i in range(BURST)]
+    StubHandler.connections.clear()
+    start = time.perf_counter()
+    if threads == 1:
+        for path in paths:
+            put(path, body)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda path: put(path, body), paths))
+    elapsed = time.perf_counter() - start
+    return BURST / elapsed, len(StubHandler.connections)
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def unpooled_put(path, body):
+        response = requests.put(f"{base_url}/{path}", json=body)
+        response.raise_for_status()
+        return response.json()
+
+    api_service = APIService(base_url=base_url, api_key="bench")
+
+    print(f"Burst of {BURST} PUTs, {SERVER_DELAY * 1000:.0f} ms server time each")
+    print(f"{'client':<10} {'threads':>7} {'req/s':>8} {'connections':>12}")
+    for threads in (1, THREADS):
+        for label, put in (("requests", unpooled_put), ("pooled", api_service.put)):
+            _burst(put, threads)
+            rate, connections = _burst(put, threads)
+            print(f"{label:<10} {threads:>7} {rate:>8.0f} {connections:>12}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Throughput of the micro-batching inference worker during a tap rush.
+
+Thirty single-face captures arrive at once. The old path ran run_on_image on
+three ThreadPool workers that shared one MTCNN and one InceptionResnetV1
+without batching; the new path submits every capture to the single
+inference worker, which batches up to BATCH_MAX_SIZE frames. Embedding
+weights are random here, which does not change the timing.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_batching
+"""
+
+import glob
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import cv2
+from PIL import Image
+import torch
+
+from benchmarks.common import bench_service
+
+PHOTO_DIR = os.path.join(
+    os.path.dirname(__file__), "../../poc/Facial Recognition/registered_photo"
+)
+TAPS = 30
+THREADS = 3
+
+
+def _captures(workdir):
+    """Writes TAPS 640x480 captures, cycling through the registered photos."""
+    photos = sorted(glob.glob(os.path.join(PHOTO_DIR, "*.jpg")))
+    paths = []
+    for i in range(TAPS):
+        frame = cv2.resize(cv2.imread(photos[i % len(photos)]), (640, 480))
+        path = os.path.join(workdir, f"capture_{i}.jpg")
+        cv2.imwrite(path, frame)
+        paths.append(path)
+    return paths
+
+
+def legacy_run_on_image(service, image_path):
+    """One unbatched pass per image, as each ThreadPool worker used to do."""
+    frame = cv2.imread(image_path)
+    img_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    boxes, _, _, faces = service._detect_faces(img_pil)
+    matches = service._compare_batch(service._embed(faces)) if len(boxes) else []
+    results = service._build_results(frame, img_pil, boxes, matches, "bench")
+    os.remove(image_path)
+    return results
+
+
+def run_threads(service, paths):
+    pending = list(paths)
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                path = pending.pop()
+            legacy_run_on_image(service, path)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def run():
+    workdir = tempfile.mkdtemp()
+    try:
+        service = bench_service(workdir)
+        service.run_on_images(_captures(workdir)[:2])
+
+        start = time.perf_counter()
+        run_threads(service, _captures(workdir))
+        threads_s = time.perf_counter() - start
+
+        paths = _captures(workdir)
+        start = time.perf_counter()
+        service.run_on_images(paths)
+        batched_s = time.perf_counter() - start
+        service.artifact_writer.flush()
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f"{TAPS} captures, torch threads {torch.get_num_threads()}")
+    print(f"{THREADS} competing threads: {TAPS / threads_s:6.2f} images/s")
+    print(f"micro-batching worker: {TAPS / batched_s:6.2f} images/s")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,72 @@
+"""Per-scan cost of the JPEG round-trip versus the in-memory capture path.
+
+The old path encoded each still to JPEG, wrote it under the capture
+directory, read and decoded it for recognition, converted BGR to RGB and
+deleted it. The new path hands the RGB array from Picamera2 straight to
+recognition. Face recognition itself is identical in both paths and is left
+out. A registered photo scaled to the still resolution stands in for a
+capture.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_capture_path
+"""
+
+import glob
+import os
+import tempfile
+import time
+
+import cv2
+from PIL import Image
+
+PHOTO_DIR = os.path.join(
+    os.path.dirname(__file__), "../../poc/Facial Recognition/registered_photo"
+)
+RESOLUTIONS = [(640, 480), (2592, 1944), (4608, 2592)]
+REPEATS = 10
+
+
+def jpeg_round_trip(rgb, directory):
+    """capture_file + cv2.imread + BGR->RGB->PIL + os.remove, per scan."""
+    path = os.path.join(directory, "capture.jpg")
+    cv2.imwrite(path, cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+    written = os.path.getsize(path)
+    frame = cv2.imread(path)
+    img_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    os.remove(path)
+    return img_pil, written
+
+
+def in_memory(rgb):
+    """capture_array + run_on_array: a PIL view and the BGR copy for annotation."""
+    img_pil = Image.fromarray(rgb)
+    cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+    return img_pil, 0
+
+
+def _time(fn):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        _, written = fn()
+    return (time.perf_counter() - start) / REPEATS, written
+
+
+def run():
+    photo = cv2.imread(sorted(glob.glob(os.path.join(PHOTO_DIR, "*.jpg")))[0])
+    print(f"{'resolution':>11} {'jpeg ms':>8} {'array ms':>9} {'KiB written/scan':>17}")
+    with tempfile.TemporaryDirectory() as directory:
+        for width, height in RESOLUTIONS:
+            rgb = cv2.cvtColor(cv2.resize(photo, (width, height)), cv2.COLOR_BGR2RGB)
+            jpeg_s, written = _time(lambda: jpeg_round_trip(rgb, directory))
+            array_s, _ = _time(lambda: in_memory(rgb))
+            print(
+                f"{width:>5}x{height:<5} {jpeg_s * 1e3:>8.1f} {array_s * 1e3:>9.1f} "
+                f"{written / 1024:>17.0f}"
+            )
+
+
+if __name__ == "__main__":
+    run()
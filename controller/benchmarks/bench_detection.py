@@ -0,0 +1,85 @@
+"""Compares the old two-pass MTCNN path with single-pass detection and batching.
+
+The old path ran the full MTCNN cascade on the frame, then again on every
+resized crop, and embedded each face with its own forward pass. The new path
+detects once, extracts the face tensors from those boxes and embeds all faces
+in one batch. Embedding weights are random here, which does not change the
+timing; the frame is the registered photos from the POC tiled 2x2.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_detection
+"""
+
+import glob
+import os
+import time
+
+import torch
+from PIL import Image
+
+from benchmarks.common import bench_service
+
+PHOTO_DIR = os.path.join(
+    os.path.dirname(__file__), "../../poc/Facial Recognition/registered_photo"
+)
+TILE = (640, 480)
+REPEATS = 5
+
+
+def _frame():
+    photos = sorted(glob.glob(os.path.join(PHOTO_DIR, "*.jpg")))[:4]
+    frame = Image.new("RGB", (TILE[0] * 2, TILE[1] * 2))
+    for i, path in enumerate(photos):
+        photo = Image.open(path).convert("RGB")
+        photo.thumbnail(TILE)
+        frame.paste(photo, ((i % 2) * TILE[0], (i // 2) * TILE[1]))
+    return frame
+
+
+def legacy_embed(service, img_pil):
+    """The per-face two-pass loop run_on_image used before single-pass detection."""
+    boxes, _ = service.mtcnn.detect(img_pil)
+    embeddings = []
+    for box in boxes if boxes is not None else []:
+        x1, y1, x2, y2 = box
+        if x2 - x1 < 80 or y2 - y1 < 100:
+            continue
+        face_tensor = service.mtcnn(img_pil.crop((x1, y1, x2, y2)).resize((160, 160)))
+        if face_tensor is None:
+            continue
+        if face_tensor.dim() == 3:
+            face_tensor = face_tensor.unsqueeze(0)
+        embeddings.append(service.embedder(face_tensor))
+    return embeddings
+
+
+def single_pass_embed(service, img_pil):
+    boxes, _, _, faces = service._detect_faces(img_pil)
+    return service._embed(faces)
+
+
+def _time(fn):
+    fn()
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        result = fn()
+    return (time.perf_counter() - start) / REPEATS, len(result)
+
+
+def run():
+    service = bench_service()
+    img_pil = _frame()
+
+    legacy_s, legacy_n = _time(lambda: legacy_embed(service, img_pil))
+    single_s, single_n = _time(lambda: single_pass_embed(service, img_pil))
+    print(
+        f"frame {img_pil.size[0]}x{img_pil.size[1]}, torch threads {torch.get_num_threads()}"
+    )
+    print(f"two-pass:    {legacy_s * 1e3:7.1f} ms ({legacy_n} faces)")
+    print(f"single-pass: {single_s * 1e3:7.1f} ms ({single_n} faces)")
+    print(f"speedup:     {legacy_s / single_s:7.2f}x")
+
+
+if __name__ == "__main__":
+    run()
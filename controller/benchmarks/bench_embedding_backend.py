@@ -0,0 +1,89 @@
+"""Latency and memory of the embedding backends against the eager model.
+
+Each backend runs in a fresh process so resident memory is not shared.
+Weights are random when the pretrained ones cannot be downloaded, which does
+not change the timing. Exported models are written to a temporary directory.
+The ONNX backends are skipped unless requirements-onnx.txt is installed.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_embedding_backend
+"""
+
+import importlib.util
+import multiprocessing
+import os
+import tempfile
+import time
+
+REPEATS = 10
+BACKENDS = [
+    ("torch", False),
+    ("torchscript", False),
+    ("torchscript", True),
+    ("onnx", False),
+    ("onnx", True),
+]
+if importlib.util.find_spec("onnxruntime") is None:
+    BACKENDS = [b for b in BACKENDS if b[0] != "onnx"]
+
+
+def _rss_mib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def _measure(backend, quantize, model_dir):
+    import torch
+    from facenet_pytorch import InceptionResnetV1
+
+    from src.services.embedding_backend import create_embedder
+
+    torch.manual_seed(0)
+    before = _rss_mib()
+    start = time.perf_counter()
+    embedder = create_embedder(
+        InceptionResnetV1, torch.device("cpu"), backend, quantize, model_dir
+    )
+    load_s = time.perf_counter() - start
+    rss = _rss_mib() - before
+
+    latency = {}
+    for batch in (1, 4):
+        faces = torch.randn(batch, 3, 160, 160)
+        embedder(faces)
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            embedder(faces)
+        latency[batch] = (time.perf_counter() - start) / REPEATS
+    return load_s, rss, latency
+
+
+def run():
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as model_dir:
+        # Export every model once so the timed runs only load them.
+        for backend, quantize in BACKENDS:
+            with context.Pool(1) as pool:
+                pool.apply(_measure, (backend, quantize, model_dir))
+
+        print(
+            f"{'backend':>16} {'load s':>7} {'RSS MiB':>8} {'b=1 ms':>8} {'b=4 ms':>8}"
+        )
+        for backend, quantize in BACKENDS:
+            with context.Pool(1) as pool:
+                load_s, rss, latency = pool.apply(
+                    _measure, (backend, quantize, model_dir)
+                )
+            name = backend + (" int8" if quantize else "")
+            print(
+                f"{name:>16} {load_s:>7.2f} {rss:>8.0f} "
+                f"{latency[1] * 1e3:>8.1f} {latency[4] * 1e3:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,96 @@
+"""Single best-box face versus quality-weighted multi-frame voting.
+
+Each simulated tap gives BURST frames of one of STUDENTS enrolled
+students. A frame has a box size, sharpness and pose score. Its embedding is
+the student's gallery vector plus noise that grows as the product of the
+three (its quality) falls. The old path embeds only the face with the
+largest box, which ignores blur and pose. The new path follows
+FaceRecognitionService._vote_bursts: it embeds faces in quality order into
+an IdentityVote, matches the mean embedding after each one, and stops at
+RECOGNITION_CONFIDENCE or RECOGNITION_MAX_FRAMES. The numbers depend on this
+noise model; they show the trade-off, not field accuracy.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_frame_voting
+"""
+
+import numpy as np
+
+from src.services.face_scoring import (
+    RECOGNITION_CONFIDENCE,
+    RECOGNITION_MAX_FRAMES,
+    IdentityVote,
+)
+from src.services.gallery import EmbeddingGallery
+
+TAPS = 2000
+BURST = 8
+STUDENTS = 50
+# Noise norm of a frame with quality 1; it grows as 1 / quality.
+NOISE = 0.35
+
+
+def _unit(vectors):
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def _tap(rng, gallery_vectors):
+    student = rng.integers(STUDENTS)
+    size = rng.uniform(0.4, 1.0, BURST)
+    quality = size * rng.uniform(0.2, 1.0, BURST) * rng.uniform(0.5, 1.0, BURST)
+    noise = _unit(rng.standard_normal((BURST, 512)))
+    scale = np.minimum(NOISE / quality, 3.0)[:, None]
+    embeddings = _unit(gallery_vectors[student] + scale * noise)
+    return f"S{student}", size, quality, embeddings
+
+
+def _best_box(gallery, size, embeddings):
+    identity, _, _ = gallery.match(embeddings[[np.argmax(size)]])[0]
+    return identity, 1
+
+
+def _voting(gallery, quality, embeddings):
+    order = list(np.argsort(-quality))
+    vote = IdentityVote()
+    while True:
+        i = order.pop(0)
+        identity, _, _ = gallery.match(embeddings[[i]])[0]
+        vote.add(embeddings[i], identity, quality[i])
+        match = gallery.match(vote.mean_embedding()[None, :])[0]
+        vote.decide(match)
+        if vote.done(order):
+            return match[0], vote.frames
+
+
+def run():
+    rng = np.random.default_rng(0)
+    vectors = _unit(rng.standard_normal((STUDENTS, 512))).astype(np.float32)
+    gallery = EmbeddingGallery([f"S{i}" for i in range(STUDENTS)], vectors)
+
+    outcomes = {"best box": [], "voting": []}
+    for _ in range(TAPS):
+        student, size, quality, embeddings = _tap(rng, vectors)
+        for mode, (identity, frames) in (
+            ("best box", _best_box(gallery, size, embeddings)),
+            ("voting", _voting(gallery, quality, embeddings)),
+        ):
+            outcomes[mode].append((identity == student, identity == "Unknown", frames))
+
+    print(
+        f"{TAPS} taps of {BURST} frames, confidence {RECOGNITION_CONFIDENCE}, "
+        f"at most {RECOGNITION_MAX_FRAMES} frames"
+    )
+    for mode, rows in outcomes.items():
+        correct, unknown, frames = (np.array(x) for x in zip(*rows))
+        print(
+            f"{mode:9s} correct {correct.mean() * 100:5.1f}%  "
+            f"unknown {unknown.mean() * 100:5.1f}%  "
+            f"wrong {(~correct & ~unknown).mean() * 100:4.1f}%  "
+            f"embeddings/tap {frames.mean():4.2f}  "
+            f"<3 frames {(frames < 3).mean() * 100:5.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,69 @@
+"""Compares the old per-identity matching loop with EmbeddingGallery.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_gallery
+"""
+
+import time
+
+import numpy as np
+import torch
+
+from src.services.gallery import EmbeddingGallery
+
+FACES_PER_FRAME = 3
+REPEATS = 20
+
+
+def _unit(rows):
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def legacy_compare(embedding, database_embeddings):
+    """The matching loop FaceRecognitionService._compare used before the gallery."""
+    min_dist = float("inf")
+    identity = "Unknown"
+    for name, db_emb in database_embeddings.items():
+        dist = torch.norm(embedding - db_emb, p=2).item()
+        if dist < min_dist:
+            min_dist = dist
+            identity = name if dist < 0.9 else "Unknown"
+    return identity, min_dist
+
+
+def _time(fn, repeats=REPEATS):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def run(sizes=(10, 500, 10_000)):
+    rng = np.random.default_rng(0)
+    print(f"{'identities':>10} {'loop ms':>10} {'gallery ms':>11} {'speedup':>8}")
+    for n in sizes:
+        matrix = _unit(rng.normal(size=(n, 512))).astype(np.float32)
+        ids = [f"S{i:05d}" for i in range(n)]
+        queries = matrix[rng.integers(0, n, FACES_PER_FRAME)]
+
+        database = {
+            name: torch.tensor(row).unsqueeze(0) for name, row in zip(ids, matrix)
+        }
+        query_tensors = [torch.tensor(q).unsqueeze(0) for q in queries]
+        gallery = EmbeddingGallery(ids, matrix)
+
+        loop_s = _time(
+            lambda: [legacy_compare(q, database) for q in query_tensors],
+            repeats=max(1, REPEATS // max(1, n // 500)),
+        )
+        gallery_s = _time(lambda: gallery.match(queries))
+        print(
+            f"{n:>10} {loop_s * 1e3:>10.3f} {gallery_s * 1e3:>11.3f} "
+            f"{loop_s / gallery_s:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    run()
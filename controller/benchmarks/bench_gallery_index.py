@@ -0,0 +1,64 @@
+"""Recall versus latency of the IVF-PQ gallery index against the exact matcher.
+
+Synthetic embeddings have a low intrinsic dimension (a random 32-d latent
+projected to 512-d plus noise), which is how real face embeddings behave;
+isotropic random vectors have no neighbourhood structure to index. Queries are
+enrolled faces with extra noise, i.e. a new photo of a known student.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_gallery_index
+"""
+
+import time
+
+import numpy as np
+
+from src.services.gallery import EmbeddingGallery, IVFPQIndex
+
+GALLERY_SIZE = 50_000
+QUERIES = 200
+
+
+def _unit(rows):
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _per_query_ms(index, queries):
+    index.search(queries[:1], k=1)
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, k=1)
+    return (time.perf_counter() - start) / len(queries) * 1e3
+
+
+def run(size=GALLERY_SIZE):
+    rng = np.random.default_rng(0)
+    latent = rng.normal(size=(size, 32)) @ rng.normal(size=(32, 512))
+    vectors = _unit(latent + 0.3 * rng.normal(size=latent.shape))
+    ids = [f"S{i:06d}" for i in range(size)]
+    picks = rng.choice(size, QUERIES, replace=False)
+    queries = _unit(vectors[picks] + 0.02 * rng.normal(size=(QUERIES, 512)))
+
+    exact = EmbeddingGallery(ids, vectors)
+    _, truth = exact.search(queries, k=1)
+    exact_ms = _per_query_ms(exact, queries)
+
+    start = time.perf_counter()
+    index = IVFPQIndex()
+    index.build(ids, vectors)
+    build_s = time.perf_counter() - start
+
+    print(f"{size} identities, {QUERIES} queries")
+    print(f"exact:  {exact_ms:.3f} ms/query, {vectors.nbytes / 2**20:.1f} MiB")
+    print(f"ivfpq:  built in {build_s:.1f} s, {index.nbytes / 2**20:.1f} MiB")
+    print(f"{'n_probe':>8} {'recall@1':>9} {'ms/query':>9}")
+    for n_probe in (1, 2, 4, 8, 16, 32):
+        index.n_probe = n_probe
+        _, found = index.search(queries, k=1)
+        recall = np.mean(found[:, 0] == truth[:, 0])
+        print(f"{n_probe:>8} {recall:>9.3f} {_per_query_ms(index, queries):>9.3f}")
+
+
+if __name__ == "__main__":
+    run()
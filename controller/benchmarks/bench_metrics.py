@@ -0,0 +1,45 @@
+"""Measures the per-call cost of the stage instrumentation.
+
+Compares an uninstrumented block with the same block under
+``metrics.timer`` and ``metrics.since``, with metrics disabled and enabled.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_metrics
+"""
+
+import time
+import timeit
+
+from src.services.metrics import Metrics
+
+NUMBER = 200_000
+
+
+def _ns(statement, metrics):
+    seconds = min(
+        timeit.repeat(
+            statement,
+            globals={"metrics": metrics, "time": time},
+            number=NUMBER,
+            repeat=5,
+        )
+    )
+    return seconds / NUMBER * 1e9
+
+
+def main():
+    baseline = _ns("pass", None)
+    print(f"{'call':<32} {'disabled ns':>12} {'enabled ns':>11}")
+    for label, statement in (
+        ("with metrics.timer(stage)", "with metrics.timer('detect'): pass"),
+        ("metrics.since(stage, start)", "metrics.since('pool_wait', 0.0)"),
+        ("time.perf_counter() stamp", "time.perf_counter()"),
+    ):
+        disabled = _ns(statement, Metrics(enabled=False)) - baseline
+        enabled = _ns(statement, Metrics(enabled=True)) - baseline
+        print(f"{label:<32} {disabled:>12.0f} {enabled:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
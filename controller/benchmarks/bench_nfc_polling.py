@@ -0,0 +1,156 @@
+"""Fixed versus adaptive NFC polling in a simulated rush and a quiet spell.
+
+STUDENTS queue at the reader. Each one holds a card on it until the beep,
+lifts it REACT seconds later, and the next student taps GAP seconds after
+that. The fixed mode is the old read loop: 0.5 s reads in active mode and a
+2 s sleep after every read. The adaptive mode is NFCController with its
+PollingScheduler and per-card de-duplication. Then the reader is left alone
+for QUIET seconds in low-power mode, and the share of time the RF field is
+on is reported (the old loop keeps it on throughout).
+
+Time runs SPEED times faster than real time; figures are in simulated
+seconds.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_nfc_polling
+"""
+
+import threading
+import time
+
+from src.controllers.nfc import (
+    NFC_BACKOFF,
+    NFC_DEDUP_WINDOW,
+    NFC_FAST_INTERVAL,
+    NFC_READ_TIMEOUT,
+    NFC_SLOW_INTERVAL,
+    NFCController,
+    PollingScheduler,
+)
+
+SPEED = 10
+STUDENTS = 40
+REACT = 0.3
+GAP = 0.3
+QUIET = 120
+
+
+class RushReader:
+    """A PN532 stand-in with a queue of students tapping in turn."""
+
+    def __init__(self, students):
+        self.cards = [i.to_bytes(4, "big") for i in range(1, students + 1)]
+        self.index = 0
+        self.present_at = time.monotonic()
+        self.lift_at = None
+        self.first_tap = self.present_at
+        self.beeps = []
+        self.reads = 0
+
+    def beep(self, card_id):
+        now = time.monotonic()
+        if self.lift_at is None and card_id == self.cards[self.index].hex().upper():
+            self.beeps.append(now)
+            self.lift_at = now + REACT / SPEED
+
+    def read_passive_target(self, timeout):
+        self.reads += 1
+        deadline = time.monotonic() + timeout / SPEED
+        while True:
+            now = time.monotonic()
+            if self.lift_at is not None and now >= self.lift_at:
+                self.index += 1
+                self.present_at = self.lift_at + GAP / SPEED
+                self.lift_at = None
+            if self.index >= len(self.cards) or self.present_at > deadline:
+                time.sleep(max(0.0, deadline - now))
+                return None
+            if self.present_at <= now:
+                return self.cards[self.index]
+            time.sleep(self.present_at - now)
+
+    def done(self):
+        return self.index >= len(self.cards)
+
+
+class Events:
+    def __init__(self, reader):
+        self.reader = reader
+        self.taps = 0
+
+    def send_event(self, event_name, event_data=None):
+        self.taps += 1
+        self.reader.beep(event_data["card_id"])
+
+
+def legacy_read_nfc(reader, events, stopped):
+    """The old loop in active mode, with its intervals scaled by SPEED."""
+    while not stopped.is_set():
+        uid = reader.read_passive_target(timeout=0.5)
+        if uid:
+            events.send_event("nfc_scanned", {"card_id": uid.hex().upper()})
+            time.sleep(2 / SPEED)
+
+
+def _scheduler():
+    return PollingScheduler(
+        fast=NFC_FAST_INTERVAL / SPEED,
+        slow=NFC_SLOW_INTERVAL / SPEED,
+        backoff=NFC_BACKOFF,
+        busy_window=5 / SPEED,
+    )
+
+
+def _rush(mode, loop):
+    reader = RushReader(STUDENTS)
+    events = Events(reader)
+    stopped = threading.Event()
+    thread = threading.Thread(target=loop, args=(reader, events, stopped))
+    thread.start()
+    while not reader.done():
+        time.sleep(0.01)
+    stopped.set()
+    thread.join()
+
+    elapsed = (reader.beeps[-1] - reader.first_tap) * SPEED
+    gaps = [b - a for a, b in zip(reader.beeps, reader.beeps[1:])]
+    print(
+        f"{mode:9s} {len(reader.beeps) / elapsed * 60:5.1f} taps/min, "
+        f"{sum(gaps) / len(gaps) * SPEED:4.2f}s between beeps, "
+        f"{events.taps} events for {STUDENTS} students"
+    )
+
+
+def _adaptive(reader, events, stopped):
+    nfc = NFCController(
+        pn532=reader, scheduler=_scheduler(), dedup_window=NFC_DEDUP_WINDOW / SPEED
+    )
+    nfc.exit_low_power_mode()
+    nfc.stopped = stopped
+    nfc.read_nfc(events)
+
+
+def _quiet():
+    reader = RushReader(0)
+    nfc = NFCController(pn532=reader, scheduler=_scheduler())
+    nfc.note_motion()
+    nfc.start(Events(reader))
+    time.sleep(QUIET / SPEED)
+    nfc.stop()
+    duty = reader.reads * NFC_READ_TIMEOUT / QUIET
+    print(
+        f"quiet {QUIET}s: {reader.reads} polls, RF on {duty * 100:4.1f}% "
+        f"(fixed loop 100%), settled at {nfc.scheduler.interval * SPEED:.1f}s"
+    )
+
+
+def run():
+    print(f"{STUDENTS} students, lift {REACT}s after the beep, next tap {GAP}s later")
+    _rush("fixed", legacy_read_nfc)
+    _rush("adaptive", _adaptive)
+    _quiet()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,87 @@
+"""Throughput of thread versus process recognition workers during a tap rush.
+
+TAPS taps arrive at once, each a real tap's burst: the ring buffer's 640x480
+RGB frames plus a 12 MP still. The thread mode submits them to one
+in-process FaceRecognitionService; the process modes hand them to 1, 2 and
+4 worker processes, each worker with cpu_count / workers torch threads.
+The shared and pickled counts show whether the bursts went through shared
+memory; there are two slots per worker, so one worker pickles the requests
+that find both taken. Embedding weights are random here, which does not change the
+timing. On a 4-core board, run it with the controller otherwise idle.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_recognition_processes
+"""
+
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.common import bench_service
+from src.controllers.frame_buffer import (
+    BUFFER_FPS,
+    BUFFER_SECONDS,
+    LORES_SIZE,
+    STILL_SIZE,
+)
+from src.services.recognition_processes import ProcessRecognitionService
+
+PHOTO_DIR = os.path.join(
+    os.path.dirname(__file__), "../../poc/Facial Recognition/registered_photo"
+)
+TAPS = 4
+WORKERS = (1, 2, 4)
+FACTORY = "benchmarks.common:bench_service"
+
+
+def _bursts():
+    """One burst per tap: buffered lores frames, then the full-resolution still."""
+    photos = sorted(glob.glob(os.path.join(PHOTO_DIR, "*.jpg")))
+    bursts = []
+    for i in range(TAPS):
+        photo = cv2.cvtColor(cv2.imread(photos[i % len(photos)]), cv2.COLOR_BGR2RGB)
+        lores = cv2.resize(photo, LORES_SIZE)
+        still = np.full((STILL_SIZE[1], STILL_SIZE[0], 3), 90, dtype=np.uint8)
+        face = cv2.resize(photo, (STILL_SIZE[1] * 3 // 4, STILL_SIZE[1]))
+        still[:, : face.shape[1]] = face
+        bursts.append([lores] * (BUFFER_SECONDS * BUFFER_FPS) + [still])
+    return bursts
+
+
+def _rush(service, bursts):
+    service.run_on_frames(bursts[0], "warm")
+    start = time.perf_counter()
+    futures = [service.submit(burst, f"tap_{i}") for i, burst in enumerate(bursts)]
+    for future in futures:
+        future.result()
+    return TAPS / (time.perf_counter() - start)
+
+
+def run():
+    bursts = _bursts()
+    print(
+        f"{TAPS} taps of {len(bursts[0]) - 1} lores frames plus a "
+        f"{STILL_SIZE[0]}x{STILL_SIZE[1]} still, {os.cpu_count()} CPUs"
+    )
+
+    print(f"threads (1 process):  {_rush(bench_service(), bursts):6.2f} taps/s")
+    for workers in WORKERS:
+        service = ProcessRecognitionService(workers=workers, factory=FACTORY)
+        try:
+            rate = _rush(service, bursts)
+            stats = service.stats()
+        finally:
+            service.close()
+        print(
+            f"{workers} worker process(es), {service.torch_threads} torch "
+            f"thread(s) each: {rate:6.2f} taps/s "
+            f"({stats['shared']} shared, {stats['pickled']} pickled)"
+        )
+
+
+if __name__ == "__main__":
+    run()
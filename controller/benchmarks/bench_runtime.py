@@ -0,0 +1,197 @@
+"""Thread versus asyncio controller runtime under a burst of 100 taps.
+
+Taps arrive back to back as NFC events. Each one goes through the state
+machine, a stub camera, the recognition ThreadPool (a stub recognizer
+that takes INFERENCE seconds) and the outbox, which uploads the portrait
+and PUTs the attendance record to a local stub server with ROUND_TRIP
+seconds of latency per request. The thread runtime's outbox sender
+delivers one job at a time; the asyncio runtime's sender delivers up to
+OUTBOX_CONCURRENCY at once. Neither mode applies a drain rate limit here.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_runtime
+"""
+
+import asyncio
+import json
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock
+
+import numpy as np
+
+from src.async_runtime import AsyncStateMachine
+from src.services import attendance_service as attendance_module
+from src.services.api_service import APIService
+from src.services.attendance_service import AttendanceService
+from src.services.logging_service import LoggingService
+from src.services.outbox import OUTBOX_CONCURRENCY, Outbox
+from src.services.tap_cache import TapCache
+from src.services.thread_pool import ThreadPool
+from src.state_machine import StateMachine
+
+TAPS = 100
+ROUND_TRIP = 0.02
+INFERENCE = 0.005
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    put_times = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(ROUND_TRIP)
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self._reply({"message": {"fileUrl": f"https://example.com{self.path}"}})
+
+    def do_PUT(self):
+        self._reply({"message": "updated"})
+        self.put_times[self.path] = time.time()
+
+
+class StubCamera:
+    power_state = "warm"
+
+    def turn_on(self):
+        pass
+
+    def turn_off(self):
+        pass
+
+    def capture_array(self, filename=None):
+        return np.zeros((480, 640, 3), dtype=np.uint8)
+
+    def recent_frames(self):
+        return []
+
+
+class StubRecognizer:
+    def get(self):
+        return self
+
+    def run_on_frames(self, frames, name=None):
+        time.sleep(INFERENCE)
+        return [
+            {
+                "identity": "Student",
+                "croppedPath": f"{name}.jpg",
+                "croppedImage": b"\xff\xd8" + bytes(8000),
+            }
+        ]
+
+
+def _attendance(api_service, outbox):
+    service = object.__new__(AttendanceService)
+    service.api_service = api_service
+    service.outbox = outbox
+    service.camera_controller = StubCamera()
+    service.thread_pool = ThreadPool(num_workers=3, max_pending=TAPS)
+    service.tap_cache = TapCache()
+    class_info = {"id": "class-1", "startTime": "09:00:00", "endTime": "09:50:00"}
+    service.class_schedule = Mock(current=Mock(return_value=class_info))
+    service.current_class = class_info
+    service.current_session = {"id": "session-1"}
+    service.studentId_to_attendanceId = {f"S{i}": f"att-{i}" for i in range(TAPS)}
+    session_key = service._session_key(service._session_data(class_info, date.today()))
+    service.sessions = {
+        session_key: (service.current_session, service.studentId_to_attendanceId)
+    }
+    outbox.register("attendance", service._send_attendance)
+    return service
+
+
+def _taps(sm):
+    sm.send_event("motion_detected")
+    started = {}
+    for i in range(TAPS):
+        started[f"/attendance/att-{i}"] = time.time()
+        sm.send_event("nfc_scanned", {"card_id": f"S{i}", "tapped_at": time.time()})
+    return started
+
+
+def _report(mode, started):
+    while len(StubHandler.put_times) < TAPS:
+        time.sleep(0.01)
+    latencies = sorted(StubHandler.put_times[p] - t for p, t in started.items())
+    total = max(StubHandler.put_times.values()) - min(started.values())
+    print(
+        f"{mode:8s} all {TAPS} PUTs in {total:5.2f}s, tap to PUT "
+        f"p50 {statistics.median(latencies):5.2f}s "
+        f"p95 {latencies[int(0.95 * TAPS)]:5.2f}s"
+    )
+
+
+def run_threads(api_service, workdir):
+    outbox = Outbox(f"{workdir}/threads.db", drain_rate=0)
+    LoggingService(api_service).use_outbox(outbox)
+    attendance = _attendance(api_service, outbox)
+    sm = StateMachine(Mock(), attendance.camera_controller, None, None, attendance)
+    outbox.start()
+    StubHandler.put_times.clear()
+    started = _taps(sm)
+    _report("threads", started)
+    sm.stop()
+    outbox.stop()
+    attendance.thread_pool.shutdown()
+
+
+def run_asyncio(api_service, workdir):
+    async def main():
+        outbox = Outbox(f"{workdir}/asyncio.db", drain_rate=0)
+        LoggingService(api_service).use_outbox(outbox)
+        attendance = _attendance(api_service, outbox)
+        sm = AsyncStateMachine(
+            Mock(), attendance.camera_controller, None, None, attendance
+        )
+        tasks = [
+            asyncio.create_task(sm.process_events()),
+            asyncio.create_task(outbox.send_async()),
+        ]
+        StubHandler.put_times.clear()
+        started = _taps(sm)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _report, "asyncio", started)
+        await sm.stop()
+        outbox.stop()
+        await asyncio.gather(*tasks)
+        attendance.thread_pool.shutdown()
+
+    asyncio.run(main())
+
+
+def run():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_service = APIService(base_url=f"http://127.0.0.1:{server.server_address[1]}")
+    attendance_module.face_recognition = StubRecognizer()
+
+    print(
+        f"{TAPS} taps, {ROUND_TRIP * 1000:.0f} ms per request, "
+        f"outbox concurrency {OUTBOX_CONCURRENCY} in asyncio mode"
+    )
+    with tempfile.TemporaryDirectory() as workdir:
+        run_threads(api_service, workdir)
+        run_asyncio(api_service, workdir)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,117 @@
+"""Busy-wait versus edge-callback ultrasonic ranging on a simulated sensor.
+
+A still target stands 80 cm away. Readings carry 1 cm of noise and every
+tenth echo is a spurious 20 cm reflection. Each mode ranges at SAMPLE_RATE
+Hz for DURATION seconds. Meanwhile a stand-in for a recognition thread
+sleeps 5 ms in a loop, and its wake-up lateness shows how much the ranging
+thread holds the GIL. The busy-wait mode is the old get_distance loop;
+motion events are counted with the old raw-reading rule and with the new
+filtered one.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_ultrasonic
+"""
+
+import itertools
+import random
+import statistics
+import threading
+import time
+from unittest.mock import Mock
+
+from src.controllers.gpio_sim import SimulatedGPIO
+from src.controllers.ultrasonic import MOTION_DELTA, RangeFilter, UltrasonicController
+
+DURATION = 5
+SAMPLE_RATE = 20
+TARGET = 80.0
+THRESHOLD = 90
+
+
+def _scene():
+    samples = itertools.count()
+    return lambda now: 20.0 if next(samples) % 10 == 9 else random.gauss(TARGET, 1)
+
+
+def legacy_get_distance(gpio, trig_pin, echo_pin):
+    """The old polling loop, without its fixed 0.1 s settle sleep."""
+    gpio.output(trig_pin, True)
+    time.sleep(0.00001)
+    gpio.output(trig_pin, False)
+
+    start_time = time.time()
+    while gpio.input(echo_pin) == 0:
+        pulse_start = time.time()
+        if pulse_start - start_time > 0.02:
+            return None
+    while gpio.input(echo_pin) == 1:
+        pulse_end = time.time()
+        if pulse_end - pulse_start > 0.02:
+            return None
+    return round((pulse_end - pulse_start) * 17150, 2)
+
+
+def _bystander(stop, lateness):
+    while not stop.is_set():
+        start = time.perf_counter()
+        time.sleep(0.005)
+        lateness.append(time.perf_counter() - start - 0.005)
+
+
+def _run(measure):
+    readings, lateness = [], []
+    stop = threading.Event()
+    bystander = threading.Thread(target=_bystander, args=(stop, lateness))
+    bystander.start()
+
+    cpu, start = time.process_time(), time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        tick = time.perf_counter()
+        distance = measure()
+        if distance is not None:
+            readings.append(distance)
+        time.sleep(max(0.0, 1 / SAMPLE_RATE - (time.perf_counter() - tick)))
+    cpu = (time.process_time() - cpu) / (time.perf_counter() - start)
+
+    stop.set()
+    bystander.join()
+    return readings, cpu, sorted(lateness)
+
+
+def _motion_events(values):
+    return sum(
+        1
+        for last, current in zip(values, values[1:])
+        if current < THRESHOLD and abs(current - last) > MOTION_DELTA
+    )
+
+
+def _report(mode, readings, cpu, lateness, values):
+    real = [r for r in readings if r > 50]
+    print(
+        f"{mode:12s} cpu {cpu * 100:5.1f}%  "
+        f"error {statistics.mean(abs(r - TARGET) for r in real):4.2f} cm  "
+        f"jitter {statistics.stdev(real):4.2f} cm  "
+        f"bystander p99 late {lateness[int(0.99 * len(lateness))] * 1000:5.2f} ms  "
+        f"motion events {_motion_events(values)}"
+    )
+
+
+def run():
+    print(f"{DURATION}s at {SAMPLE_RATE} Hz, target {TARGET:.0f} cm")
+
+    gpio = SimulatedGPIO(_scene())
+    readings, cpu, lateness = _run(lambda: legacy_get_distance(gpio, 23, 24))
+    _report("busy-wait", readings, cpu, lateness, readings)
+
+    controller = UltrasonicController(Mock(), gpio=SimulatedGPIO(_scene()))
+    readings, cpu, lateness = _run(controller.get_distance)
+    _report("edge", readings, cpu, lateness, readings)
+    range_filter = RangeFilter()
+    filtered = [range_filter.update(r) for r in readings]
+    _report("edge+filter", filtered, cpu, lateness, filtered)
+
+
+if __name__ == "__main__":
+    run()
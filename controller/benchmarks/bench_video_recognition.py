@@ -0,0 +1,177 @@
+"""Clip verification: the proof of concept's three passes versus one stream.
+
+A 15 s 640x480 clip at 20 fps shows a registered photo drifting across the
+frame. The old path is run_face_recognition_on_videos from
+poc/Facial Recognition/face_recog_us255.py. It opens the clip three times:
+once for its properties, once to seek to five sample frames, and once to
+decode every frame for the overlay video. It detects once a second until
+three matches, and it runs MTCNN again on every face crop before embedding.
+The new path is VideoRecognitionEngine at several detection strides. Each
+path runs twice: on a clip of the expected student, where both stop after
+three matches, and against a different expected name, so the whole clip is
+searched. Embedding weights are random here, which does not change the
+timing.
+
+Run from the controller directory:
+
+    python -m benchmarks.bench_video_recognition
+"""
+
+import glob
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+
+from benchmarks.common import bench_service
+from src.services.face_recognition_service import annotate_frame
+from src.services.gallery import EmbeddingGallery
+from src.services.video_recognition import VideoRecognitionEngine
+
+PHOTO_DIR = os.path.join(
+    os.path.dirname(__file__), "../../poc/Facial Recognition/registered_photo"
+)
+SECONDS = 15
+FPS = 20
+STUDENT = "Zhiguo Ren"
+STRIDES = (5, 10, 20)
+
+
+def _service(workdir):
+    service = bench_service(workdir)
+    names, embeddings = [], []
+    for path in sorted(glob.glob(os.path.join(PHOTO_DIR, "*.jpg"))):
+        face = service.mtcnn(Image.open(path).convert("RGB"))
+        names.append(os.path.splitext(os.path.basename(path))[0])
+        embeddings.append(service._embed(face[:1])[0])
+    service.gallery = EmbeddingGallery(names, np.stack(embeddings))
+    return service
+
+
+def _clip(workdir):
+    photo = cv2.resize(
+        cv2.imread(os.path.join(PHOTO_DIR, f"{STUDENT}.jpg")), (300, 400)
+    )
+    path = os.path.join(workdir, f"{STUDENT} (0.40)_04142025_165346_888.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), FPS, (640, 480))
+    for i in range(SECONDS * FPS):
+        frame = np.full((480, 640, 3), 90, dtype=np.uint8)
+        x = 20 + i * 300 // (SECONDS * FPS)
+        frame[40:440, x : x + 300] = photo
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def _recognize(service, img_pil, box):
+    # The proof of concept re-runs MTCNN on each crop.
+    x1, y1, x2, y2 = box
+    face = service.mtcnn(img_pil.crop((x1, y1, x2, y2)).resize((160, 160)))
+    if face is None:
+        return None
+    return service._compare(service._embed(face[:1]))
+
+
+def legacy_process(service, path, expected, out_dir):
+    """run_face_recognition_on_videos for one clip, without its file moves."""
+    cap = cv2.VideoCapture(path)
+    frame_rate = cap.get(cv2.CAP_PROP_FPS)
+    duration = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) / frame_rate
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+
+    samples = []
+    cap = cv2.VideoCapture(path)
+    for frac in [0.1, 0.3, 0.5, 0.7, 0.9]:
+        cap.set(cv2.CAP_PROP_POS_MSEC, min(frac * duration, duration - 0.001) * 1000)
+        ret, frame = cap.read()
+        if not ret:
+            continue
+        img_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        boxes, _ = service.mtcnn.detect(img_pil)
+        for box in boxes if boxes is not None else []:
+            if (box[2] - box[0]) < 80 or (box[3] - box[1]) < 100:
+                continue
+            match = _recognize(service, img_pil, box)
+            if match is not None:
+                samples.append((match[1], frame))
+                break
+    cap.release()
+
+    cap = cv2.VideoCapture(path)
+    writer = cv2.VideoWriter(
+        os.path.join(out_dir, "legacy.mp4"),
+        cv2.VideoWriter_fourcc(*"mp4v"),
+        frame_rate,
+        (width, height),
+    )
+    match_count, frames, last = 0, 0, None
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames += 1
+        if match_count < 3 and frames % int(frame_rate) == 0:
+            img_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            boxes, _ = service.mtcnn.detect(img_pil)
+            for box in boxes if boxes is not None else []:
+                if (box[2] - box[0]) < 80 or (box[3] - box[1]) < 100:
+                    continue
+                match = _recognize(service, img_pil, box)
+                if match is not None and match[0] == expected:
+                    match_count += 1
+                    last = (box, *match)
+                    break
+        if last is not None:
+            annotate_frame(frame, *last)
+        writer.write(frame)
+    cap.release()
+    writer.release()
+    return frames, "VV" if match_count >= 3 else "VF"
+
+
+def _report(mode, scene, frames, verdict, elapsed, extra=""):
+    print(
+        f"{mode:10s} {scene:9s} {verdict}  {frames} frames in {elapsed:5.2f}s "
+        f"= {frames / elapsed:6.1f} fps{extra}"
+    )
+
+
+def run():
+    torch.set_grad_enabled(False)
+    with tempfile.TemporaryDirectory() as workdir:
+        service = _service(workdir)
+        path = _clip(workdir)
+        print(
+            f"{SECONDS}s 640x480 clip at {FPS} fps, {torch.get_num_threads()} thread(s)"
+        )
+        for scene, expected in (("verified", STUDENT), ("searched", "Someone Else")):
+            start = time.perf_counter()
+            frames, verdict = legacy_process(service, path, expected, workdir)
+            _report("legacy", scene, frames, verdict, time.perf_counter() - start)
+
+            for stride in STRIDES:
+                engine = VideoRecognitionEngine(
+                    service, stride=stride, output_dir=workdir
+                )
+                start = time.perf_counter()
+                result = engine.process(path, expected=expected)
+                _report(
+                    f"stride {stride}",
+                    scene,
+                    result["frames"],
+                    result["verdict"],
+                    time.perf_counter() - start,
+                    f"  ({result['detections']} detections, "
+                    f"{result['embeddings']} embeddings)",
+                )
+                engine.artifact_writer.flush()
+
+
+if __name__ == "__main__":
+    run()
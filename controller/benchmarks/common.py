@@ -0,0 +1,34 @@
+"""Helpers shared by the recognition benchmarks."""
+
+import os
+import tempfile
+import threading
+
+
+def bench_service(workdir=None):
+    """Builds a FaceRecognitionService with random weights, bypassing the singleton.
+
+    No gallery or pretrained weights are needed; the gallery starts empty.
+    Artifacts go to ``workdir`` (a new temporary directory by default) and
+    the inference worker is running.
+    """
+    import torch
+    from facenet_pytorch import InceptionResnetV1, MTCNN
+
+    from src.services.artifact_writer import ArtifactWriter
+    from src.services.embedding_backend import TorchEmbedder
+    from src.services.face_recognition_service import FaceRecognitionService
+    from src.services.gallery import EmbeddingGallery
+
+    workdir = workdir or tempfile.mkdtemp()
+    service = object.__new__(FaceRecognitionService)
+    service.device = torch.device("cpu")
+    service.mtcnn = MTCNN(keep_all=True, device=service.device)
+    service.embedder = TorchEmbedder(InceptionResnetV1(), service.device)
+    service.gallery_lock = threading.Lock()
+    service.gallery = EmbeddingGallery()
+    service.CAPTURED_PHOTO_DIR = service.FRED_PIC_DIR = workdir
+    service.LOG_FILE = os.path.join(workdir, "face_log.txt")
+    service.artifact_writer = ArtifactWriter()
+    service._start_inference_worker()
+    return service
@@ -2,40 +2,94 @@ from src.state_machine import StateMachine
 from src.controllers.nfc import NFCController
 from src.controllers.ultrasonic import UltrasonicController
 from src.controllers.camera import CameraController
+from src.services.api_cache import APICache
 from src.services.api_service import APIService
 from src.services.thread_pool import ThreadPool
-from src.services.attendance_service import AttendanceService
+from src.services.attendance_service import AttendanceService, face_recognition
 from src.services.logging_service import LoggingService, printt
+from src.services.metrics import metrics
+from src.services.outbox import Outbox
+from src.shutdown import shutdown_services
+import asyncio
 import time
 import os
 
+BOOT_START = time.perf_counter()
+
 API_URL = os.getenv("API_URL")
 API_KEY = os.getenv("API_KEY")
 ROOM_NUMBER = os.getenv("ROOM_NUMBER")
+CONTROLLER_RUNTIME = os.getenv("CONTROLLER_RUNTIME", "threads")
+
+
+def main():
+    """Starts the controller and runs until interrupted."""
+    if not API_URL or not API_KEY or not ROOM_NUMBER:
+        print("API_URL, API_KEY, and ROOM_NUMBER environment variables must be set")
+        raise ValueError("Missing environment variables")
+
+    face_recognition.start()
+    face_recognition.add_ready_callback(
+        lambda report: printt(f"Face recognition startup: {report}")
+    )
+
+    nfc = NFCController()
+    camera = CameraController()
+
+    api_service = APIService(base_url=API_URL, api_key=API_KEY)
+    outbox = Outbox()
+    api_cache = APICache(api_service)
+    logger = LoggingService(api_service)
+    logger.use_outbox(outbox)
+    thread_pool = ThreadPool(num_workers=3)
+    attendance_service = AttendanceService(
+        api_service, camera, thread_pool, ROOM_NUMBER, outbox, api_cache
+    )
+    nfc.scheduler.near_class = attendance_service.near_class_boundary
+
+    if CONTROLLER_RUNTIME == "asyncio":
+        from src.async_runtime import run_controller
+
+        try:
+            asyncio.run(
+                run_controller(
+                    nfc,
+                    camera,
+                    logger,
+                    api_service,
+                    attendance_service,
+                    thread_pool,
+                    outbox,
+                    api_cache,
+                    BOOT_START,
+                )
+            )
+        except KeyboardInterrupt:
+            pass
+        return
 
-if not API_URL or not API_KEY or not ROOM_NUMBER:
-    print("API_URL, API_KEY, and ROOM_NUMBER environment variables must be set")
-    raise ValueError("Missing environment variables")
+    outbox.start()
+    api_cache.start()
 
-nfc = NFCController()
-camera = CameraController()
+    sm = StateMachine(nfc, camera, logger, api_service, attendance_service)
+    ultrasonic = UltrasonicController(sm)
 
-api_service = APIService(base_url=API_URL, api_key=API_KEY)
-logger = LoggingService(api_service)
-thread_pool = ThreadPool(num_workers=3)
-attendance_service = AttendanceService(api_service, camera, thread_pool, ROOM_NUMBER)
+    nfc.start(sm)
+    ultrasonic.start()
+    metrics.start()
+    printt(f"Controller loop started in {time.perf_counter() - BOOT_START:.2f}s")
 
-sm = StateMachine(nfc, camera, logger, api_service, attendance_service)
-ultrasonic = UltrasonicController(sm)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        printt("\nShutting down...")
+        nfc.stop()
+        ultrasonic.stop()
+        sm.stop()
+        shutdown_services(thread_pool, attendance_service, logger, outbox)
 
-nfc.start(sm)
-ultrasonic.start()
 
-try:
-    while True:
-        time.sleep(1)
-except KeyboardInterrupt:
-    printt("\nShutting down...")
-    nfc.stop()
-    ultrasonic.stop()
-    sm.stop()
+# Recognition worker processes import this module, so only start when run.
+if __name__ == "__main__":
+    main()
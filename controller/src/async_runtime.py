@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.logging_service import printt
+from src.services.metrics import metrics
+from src.services.outbox import OUTBOX_CONCURRENCY
+from src.shutdown import shutdown_services
+from src.state_machine import StateMachine
+
+ASYNC_IO_THREADS = int(os.getenv("ASYNC_IO_THREADS", str(OUTBOX_CONCURRENCY + 2)))
+
+
+class AsyncStateMachine(StateMachine):
+    """StateMachine whose event handling and timers run on an asyncio loop.
+
+    Create it inside the running loop and run ``process_events()`` as a
+    task. ``send_event`` may still be called from the NFC and ultrasonic
+    threads. Timeouts use ``loop.call_later``; transition side effects run
+    in order on the SM-Action thread as in the thread runtime.
+    """
+
+    def _start_event_loop(self):
+        self.loop = asyncio.get_running_loop()
+        self.event_queue = asyncio.Queue()
+
+    async def process_events(self):
+        """Handles queued events until ``stop`` is called."""
+        while True:
+            event, data, queued_at = await self.event_queue.get()
+            if event is None:
+                return
+            metrics.since("event_queue_wait", queued_at)
+            self.handle_event(event, data)
+
+    def schedule(self, delay, callback):
+        return self.loop.call_later(delay, callback)
+
+    def cancel(self, timer):
+        if timer is not None:
+            timer.cancel()
+
+    def check_timeouts(self):
+        """Timers run on the loop by themselves."""
+
+    def send_event(self, event_name, event_data=None):
+        """Adds an event to the queue; safe to call from any thread."""
+        self.loop.call_soon_threadsafe(
+            self.event_queue.put_nowait, (event_name, event_data, time.perf_counter())
+        )
+
+    async def stop(self):
+        """Stops event handling once queued side effects have run."""
+        self.running = False
+        self.send_event(None)
+        await self.loop.run_in_executor(None, self.actions.shutdown)
+
+
+async def run_controller(
+    nfc,
+    camera,
+    logger,
+    api_service,
+    attendance_service,
+    thread_pool,
+    outbox,
+    api_cache,
+    boot_start=None,
+):
+    """Runs the controller on the current asyncio loop until cancelled.
+
+    The state machine, outbox sender (attendance uploads and PUTs, and log
+    batches) and cache refresh run as coroutines. Blocking work goes to
+    executors: HTTP calls to a pool of ASYNC_IO_THREADS threads, with at most
+    OUTBOX_CONCURRENCY deliveries at once; recognition to ``thread_pool``;
+    and the NFC and ultrasonic sensors keep their polling threads.
+    """
+    # RPi.GPIO only imports on the device.
+    from src.controllers.ultrasonic import UltrasonicController
+
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=ASYNC_IO_THREADS, thread_name_prefix="Async-IO")
+    )
+    sm = AsyncStateMachine(nfc, camera, logger, api_service, attendance_service)
+    ultrasonic = UltrasonicController(sm)
+    tasks = [
+        asyncio.create_task(sm.process_events()),
+        asyncio.create_task(outbox.send_async()),
+        asyncio.create_task(_refresh_cache(api_cache)),
+    ]
+
+    nfc.start(sm)
+    ultrasonic.start()
+    metrics.start()
+    if boot_start is not None:
+        printt(f"Async controller started in {time.perf_counter() - boot_start:.2f}s")
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        printt("Shutting down...")
+        nfc.stop()
+        ultrasonic.stop()
+        await sm.stop()
+        await loop.run_in_executor(
+            None, shutdown_services, thread_pool, attendance_service, logger, outbox
+        )
+
+
+async def _refresh_cache(api_cache):
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(api_cache.ttl)
+        await loop.run_in_executor(None, api_cache.refresh_all)
@@ -1,41 +1,198 @@
+import os
+import threading
 import time
-from picamera2 import Picamera2
+from picamera2 import MappedArray, Picamera2
+from src.controllers.frame_buffer import (
+    BUFFER_FPS,
+    BUFFER_SECONDS,
+    LORES_SIZE,
+    FrameRingBuffer,
+)
+from src.services.artifact_writer import ArtifactWriter
 from src.services.logging_service import printt
 
 IMAGE_DIR = "/capstone/captures/"
+SAVE_CAPTURES = os.getenv("SAVE_CAPTURES", "0") == "1"
+CAPTURE_JPEG_QUALITY = int(os.getenv("CAPTURE_JPEG_QUALITY", "95"))
+CAPTURE_MAX_WIDTH = int(os.getenv("CAPTURE_MAX_WIDTH", "0"))
+CAPTURE_QUEUE_SIZE = int(os.getenv("CAPTURE_QUEUE_SIZE", "2"))
+CAMERA_IDLE_OFF = float(os.getenv("CAMERA_IDLE_OFF", "300"))
+CAMERA_WARMUP = float(os.getenv("CAMERA_WARMUP", "2"))
 
 
 class CameraController:
-    def __init__(self):
+    """Picamera2 wrapper with three power states.
+
+    - ``off``: the camera is closed.
+    - ``warm``: a low-resolution preview stream runs and fills the ring
+      buffer (ACTIVE and STREAMING). Full-resolution stills are taken by
+      switching modes on demand.
+    - ``standby``: the stream still runs but nothing is buffered (IDLE).
+      After ``idle_off`` seconds in standby the camera is closed, so a
+      controller that goes back to ACTIVE soon skips the boot.
+    """
+
+    def __init__(self, save_captures=SAVE_CAPTURES, idle_off=CAMERA_IDLE_OFF):
         self.camera = None
         self.active = False
+        self.still_config = None
+        self.idle_off = idle_off
+        self.power_lock = threading.Lock()
+        self.off_timer = None
+        self.save_captures = save_captures
+        self.writer = None
+        if save_captures:
+            # Raw captures keep full resolution by default, so only a couple
+            # of 12 MP frames may wait for the SD card at once.
+            self.writer = ArtifactWriter(
+                max_pending=CAPTURE_QUEUE_SIZE,
+                jpeg_quality=CAPTURE_JPEG_QUALITY,
+                max_width=CAPTURE_MAX_WIDTH,
+                overflow="drop_newest",
+                name="Capture-Writer",
+            )
+        self.frame_buffer = FrameRingBuffer(
+            BUFFER_SECONDS * BUFFER_FPS, LORES_SIZE[1], LORES_SIZE[0]
+        )
+        self.buffering = threading.Event()
+        self.buffer_thread = None
+
+    @property
+    def power_state(self):
+        if not self.active:
+            return "off"
+        return "warm" if self.buffering.is_set() else "standby"
 
     def boot(self):
-        """Boot up the camera."""
+        """Opens the camera and starts the low-resolution preview stream."""
         self.camera = Picamera2()
-        self.camera.configure(self.camera.create_still_configuration())
+        self.still_config = self.camera.create_still_configuration(
+            lores={"size": LORES_SIZE}
+        )
+        self.camera.configure(
+            self.camera.create_preview_configuration(lores={"size": LORES_SIZE})
+        )
         self.camera.start()
-        time.sleep(2)
+        # Let auto exposure settle before the first capture.
+        time.sleep(CAMERA_WARMUP)
         self.active = True
         printt("Camera booted and ready.")
 
     def turn_on(self):
-        if not self.active:
-            self.boot()
+        """Moves to the warm state, booting the camera only if it is off."""
+        with self.power_lock:
+            self._cancel_power_off()
+            if not self.active:
+                self.boot()
+            self.start_buffering()
         printt("Camera is ON.")
 
+    def start_buffering(self):
+        """Starts filling the ring buffer with low-resolution frames."""
+        if self.buffering.is_set():
+            return
+        self.frame_buffer.clear()
+        self.buffering.set()
+        self.buffer_thread = threading.Thread(
+            target=self._buffer_frames, name="Camera-Buffer", daemon=True
+        )
+        self.buffer_thread.start()
+
+    def stop_buffering(self):
+        self.buffering.clear()
+        if self.buffer_thread:
+            self.buffer_thread.join()
+            self.buffer_thread = None
+
+    def _buffer_frames(self):
+        """Converts each YUV420 lores frame straight into its ring buffer slot."""
+        # cv2 is imported here rather than at start-up, see RecognitionLoader.
+        import cv2
+
+        interval = 1 / BUFFER_FPS
+        while self.buffering.is_set():
+            start = time.monotonic()
+            try:
+                request = self.camera.capture_request()
+                try:
+                    with MappedArray(request, "lores") as mapped:
+                        self.frame_buffer.write(
+                            lambda slot: cv2.cvtColor(
+                                mapped.array, cv2.COLOR_YUV420p2RGB, dst=slot
+                            )
+                        )
+                finally:
+                    request.release()
+            except Exception as e:
+                printt(f"Error buffering frame: {e}")
+            time.sleep(max(0.0, interval - (time.monotonic() - start)))
+
+    def recent_frames(self, seconds=BUFFER_SECONDS):
+        """Returns the buffered RGB frames from the last ``seconds``, oldest first."""
+        return list(self.frame_buffer.snapshot(since=time.monotonic() - seconds))
+
     def take_picture(self, filename="image.jpg"):
         filename = IMAGE_DIR + filename
         if not self.active:
             raise Exception("Camera is not on.")
         printt(f"Taking picture and saving as {filename}...")
-        self.camera.capture_file(filename)
+        self.camera.switch_mode_and_capture_file(self.still_config, filename)
         printt("Picture taken.")
 
         return filename
 
+    def capture_array(self, filename=None):
+        """Captures a full-resolution still straight into memory as an RGB array.
+
+        The camera switches to the still configuration for this one frame and
+        then back to the preview stream.
+
+        When raw captures are saved, the frame is also written to IMAGE_DIR as
+        ``filename`` in the background; the caller never waits on the SD card.
+        """
+        if not self.active:
+            raise Exception("Camera is not on.")
+        frame = self.camera.switch_mode_and_capture_array(self.still_config, "main")
+
+        if self.save_captures and filename:
+            import cv2
+
+            # Queue a private copy and convert it on the writer thread.
+            rgb = self.writer.shrink(frame)
+            self.writer.write_image(
+                os.path.join(IMAGE_DIR, filename),
+                lambda: cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR),
+            )
+
+        return frame
+
     def turn_off(self):
-        # if self.camera:
-        #     self.camera.close()
-        # self.active = False
+        """Moves to standby and closes the camera after ``idle_off`` seconds."""
+        self.stop_buffering()
+        with self.power_lock:
+            self._cancel_power_off()
+            if self.idle_off > 0:
+                self.off_timer = threading.Timer(self.idle_off, self.power_off)
+                self.off_timer.daemon = True
+                self.off_timer.start()
+        if self.idle_off > 0:
+            printt(f"Camera on standby, turning off in {self.idle_off:.0f}s.")
+        else:
+            self.power_off()
+
+    def power_off(self):
+        """Closes the camera unless it went back to the warm state."""
+        with self.power_lock:
+            if not self.active or self.buffering.is_set():
+                return
+            self.off_timer = None
+            self.camera.stop()
+            self.camera.close()
+            self.camera = None
+            self.active = False
         printt("Camera is OFF.")
+
+    def _cancel_power_off(self):
+        if self.off_timer is not None:
+            self.off_timer.cancel()
+            self.off_timer = None
@@ -0,0 +1,64 @@
+import threading
+import time
+import numpy as np
+
+# Size and rate of the low-resolution stream buffered for each tap.
+LORES_SIZE = (640, 480)
+BUFFER_SECONDS = 2
+BUFFER_FPS = 5
+# Full resolution of the Camera Module 3, the still taken after each tap.
+STILL_SIZE = (4608, 2592)
+
+
+class FrameRingBuffer:
+    """Fixed-size ring of frames backed by one preallocated array.
+
+    Writers fill the oldest slot in place, so buffering allocates nothing per
+    frame and memory stays at ``capacity * height * width * channels`` bytes.
+    """
+
+    def __init__(self, capacity, height, width, channels=3):
+        self.capacity = capacity
+        self.frames = np.zeros((capacity, height, width, channels), dtype=np.uint8)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        return self.frames.nbytes + self.timestamps.nbytes
+
+    def write(self, fill, timestamp=None):
+        """Calls ``fill(slot)`` to write the next frame into its slot in place."""
+        with self._lock:
+            fill(self.frames[self._next])
+            self.timestamps[self._next] = (
+                time.monotonic() if timestamp is None else timestamp
+            )
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def push(self, frame, timestamp=None):
+        """Copies ``frame`` into the next slot."""
+        self.write(lambda slot: np.copyto(slot, frame), timestamp)
+
+    def snapshot(self, since=None):
+        """Returns a copy of the buffered frames, oldest first.
+
+        Only frames with a timestamp at or after ``since`` are included. The
+        result is one (n, height, width, channels) array.
+        """
+        with self._lock:
+            order = (np.arange(self._count) + self._next - self._count) % self.capacity
+            if since is not None:
+                order = order[self.timestamps[order] >= since]
+            return self.frames[order]
+
+    def clear(self):
+        with self._lock:
+            self._next = 0
+            self._count = 0
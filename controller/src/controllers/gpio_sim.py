@@ -0,0 +1,84 @@
+import queue
+import threading
+import time
+
+
+class SimulatedGPIO:
+    """In-process stand-in for RPi.GPIO wired to an HC-SR04 style sensor.
+
+    Implements the subset of RPi.GPIO used by UltrasonicController, so the
+    ranging code can run off-device. A falling edge on ``trig_pin`` schedules
+    an echo pulse on ``echo_pin`` whose width matches ``distance(now)`` in
+    cm; ``distance`` may return None to simulate a lost echo. ``input``
+    reports the pulse from the clock, and edge callbacks are called from one
+    dispatcher thread, like RPi.GPIO's own event thread.
+    """
+
+    BCM = "BCM"
+    OUT = "OUT"
+    IN = "IN"
+    LOW = 0
+    HIGH = 1
+    RISING = "RISING"
+    FALLING = "FALLING"
+    BOTH = "BOTH"
+
+    def __init__(self, distance=lambda now: 100.0, trig_pin=23, echo_pin=24):
+        self.distance = distance
+        self.trig_pin = trig_pin
+        self.echo_pin = echo_pin
+        self.trig_level = self.LOW
+        self.echo_window = (0.0, 0.0)
+        self.callbacks = {}
+        self.edges = queue.Queue()
+        self.dispatcher = threading.Thread(
+            target=self._dispatch_edges, name="GPIO-Sim", daemon=True
+        )
+        self.dispatcher.start()
+
+    def setmode(self, mode):
+        pass
+
+    def setup(self, pin, direction):
+        pass
+
+    def cleanup(self):
+        self.callbacks.clear()
+
+    def output(self, pin, value):
+        if pin != self.trig_pin:
+            return
+        falling = self.trig_level and not value
+        self.trig_level = self.HIGH if value else self.LOW
+        if not falling:
+            return
+        now = time.monotonic()
+        distance = self.distance(now)
+        if distance is None:
+            return
+        # The sensor sends its burst ~0.5 ms after the trigger pulse.
+        rise = now + 0.0005
+        fall = rise + distance / 17150
+        self.echo_window = (rise, fall)
+        self.edges.put(rise)
+        self.edges.put(fall)
+
+    def input(self, pin):
+        if pin != self.echo_pin:
+            return self.trig_level if pin == self.trig_pin else self.LOW
+        rise, fall = self.echo_window
+        return self.HIGH if rise <= time.monotonic() < fall else self.LOW
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self.callbacks[pin] = callback
+
+    def remove_event_detect(self, pin):
+        self.callbacks.pop(pin, None)
+
+    def _dispatch_edges(self):
+        while True:
+            at = self.edges.get()
+            time.sleep(max(0.0, at - time.monotonic()))
+            callback = self.callbacks.get(self.echo_pin)
+            if callback is not None:
+                callback(self.echo_pin)
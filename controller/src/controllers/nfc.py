@@ -1,65 +1,162 @@
+import os
 import time
-import busio
-from adafruit_pn532.i2c import PN532_I2C
 import threading
 
+try:
+    import busio
+    from adafruit_pn532.i2c import PN532_I2C
+except ImportError:
+    # Off the Pi, pass a reader with read_passive_target instead.
+    busio = PN532_I2C = None
+
 from src.services.logging_service import printt
+from src.services.metrics import metrics
+from src.services.tap_cache import TapCache
+
+NFC_FAST_INTERVAL = float(os.getenv("NFC_FAST_INTERVAL", "0.2"))
+NFC_SLOW_INTERVAL = float(os.getenv("NFC_SLOW_INTERVAL", "5"))
+NFC_BACKOFF = float(os.getenv("NFC_BACKOFF", "1.5"))
+NFC_BUSY_WINDOW = float(os.getenv("NFC_BUSY_WINDOW", "30"))
+NFC_CLASS_WINDOW = float(os.getenv("NFC_CLASS_WINDOW", "600"))
+NFC_DEDUP_WINDOW = float(os.getenv("NFC_DEDUP_WINDOW", "3"))
+# How long each poll keeps the RF field up waiting for a card.
+NFC_READ_TIMEOUT = 0.1
+
+
+class PollingScheduler:
+    """Chooses the pause between NFC polls.
+
+    Polls every ``fast`` seconds while a tap is likely: the controller is
+    active, motion or a card was seen in the last ``busy_window`` seconds,
+    or ``near_class(class_window)`` reports a class starting or ending.
+    Otherwise the pause grows by ``backoff`` per poll up to ``slow``.
+    """
+
+    def __init__(
+        self,
+        fast=NFC_FAST_INTERVAL,
+        slow=NFC_SLOW_INTERVAL,
+        backoff=NFC_BACKOFF,
+        busy_window=NFC_BUSY_WINDOW,
+        class_window=NFC_CLASS_WINDOW,
+        near_class=None,
+    ):
+        self.fast = fast
+        self.slow = slow
+        self.backoff = backoff
+        self.busy_window = busy_window
+        self.class_window = class_window
+        self.near_class = near_class
+        self.active = False
+        self.last_activity = float("-inf")
+        self.interval = slow
+
+    def note_activity(self):
+        """Records motion or a tap, which keeps polling fast for a while."""
+        self.last_activity = time.monotonic()
+
+    def busy(self):
+        if self.active or time.monotonic() - self.last_activity < self.busy_window:
+            return True
+        if self.near_class is None:
+            return False
+        try:
+            return bool(self.near_class(self.class_window))
+        except Exception as e:
+            printt(f"NFC schedule check failed: {e}")
+            return False
+
+    def next_interval(self):
+        """Returns the pause before the next poll."""
+        if self.busy():
+            self.interval = self.fast
+        else:
+            self.interval = min(self.slow, self.interval * self.backoff)
+        return self.interval
 
 
 class NFCController:
+    """Polls a PN532 reader and sends ``nfc_scanned`` events.
+
+    The pause between polls comes from ``scheduler``. A card still on the
+    reader, or tapped again within ``dedup_window`` seconds, is reported
+    once, so the next student can tap straight after.
+    """
+
     SCL_PIN = 3
     SDA_PIN = 2
-    IDLE_POLLING_INTERVAL = 5
-    ACTIVE_POLLING_INTERVAL = 0.5
 
-    def __init__(self):
+    def __init__(self, pn532=None, scheduler=None, dedup_window=NFC_DEDUP_WINDOW):
         self.running = True
         self.low_power = True
+        self.stopped = threading.Event()
+        self.scheduler = scheduler or PollingScheduler()
+        self.recent_cards = TapCache(maxsize=256, ttl=dedup_window)
+        self.thread = None
 
-        i2c = busio.I2C(self.SCL_PIN, self.SDA_PIN)
-        self.pn532 = PN532_I2C(i2c, debug=False)
-        self.pn532.SAM_configuration()
+        if pn532 is None:
+            i2c = busio.I2C(self.SCL_PIN, self.SDA_PIN)
+            pn532 = PN532_I2C(i2c, debug=False)
+            pn532.SAM_configuration()
+        self.pn532 = pn532
         printt("NFC Controller initialized. Waiting for NFC cards...")
 
     def enter_low_power_mode(self):
-        """Reduce polling frequency when in low-power mode."""
+        """Lets polling back off when in low-power mode."""
         self.low_power = True
+        self.scheduler.active = False
         printt("NFC module entering software low-power mode.")
 
     def exit_low_power_mode(self):
-        """Increase polling frequency when in active mode."""
+        """Polls at the fast interval when in active mode."""
         self.low_power = False
+        self.scheduler.active = True
         printt("NFC module is now active.")
 
+    def note_motion(self):
+        """Called on motion so polling speeds up before the first tap."""
+        self.scheduler.note_activity()
+
     def read_nfc(self, state_machine):
-        """Reads NFC tags at a lower frequency in low-power mode."""
-        while self.running:
-            polling_interval = (
-                self.IDLE_POLLING_INTERVAL
-                if self.low_power
-                else self.ACTIVE_POLLING_INTERVAL
-            )
+        """Polls for cards at the scheduler's interval."""
+        while not self.stopped.is_set():
+            start = time.perf_counter()
             try:
-                uid = self.pn532.read_passive_target(timeout=polling_interval)
+                uid = self.pn532.read_passive_target(timeout=NFC_READ_TIMEOUT)
 
                 if uid:
                     card_id = "".join(format(x, "02X") for x in uid)
-                    state_machine.send_event("nfc_scanned", {"card_id": card_id})
-                    time.sleep(2)
+                    self.scheduler.note_activity()
+                    if self._is_new_tap(card_id):
+                        metrics.since("nfc_read", start)
+                        state_machine.send_event(
+                            "nfc_scanned",
+                            {"card_id": card_id, "tapped_at": time.time()},
+                        )
 
             except RuntimeError as e:
                 printt(f"NFC read error: {e}")
-                time.sleep(polling_interval)
+
+            interval = self.scheduler.next_interval()
+            self.stopped.wait(max(0.0, interval - (time.perf_counter() - start)))
+
+    def _is_new_tap(self, card_id):
+        # A card held on the reader keeps refreshing its own entry.
+        new = self.recent_cards.get(card_id) is None
+        self.recent_cards.set(card_id)
+        return new
 
     def start(self, state_machine):
         """Start NFC reading thread."""
         self.thread = threading.Thread(
-            target=self.read_nfc, args=(state_machine,), daemon=True
+            target=self.read_nfc, args=(state_machine,), name="NFC", daemon=True
         )
         self.thread.start()
 
     def stop(self):
         """Stop NFC and enter low-power mode."""
         self.running = False
-        self.thread.join()
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
         self.enter_low_power_mode()
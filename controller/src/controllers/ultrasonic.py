@@ -1,88 +1,162 @@
+import os
+import statistics
 import time
 import threading
-import RPi.GPIO as GPIO
+from collections import deque
+
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    # Off the Pi, pass a backend such as gpio_sim.SimulatedGPIO instead.
+    GPIO = None
 
 from src.services.logging_service import printt
 
+ULTRASONIC_SAMPLE_RATE = float(os.getenv("ULTRASONIC_SAMPLE_RATE", "5"))
+ULTRASONIC_MEDIAN_WINDOW = int(os.getenv("ULTRASONIC_MEDIAN_WINDOW", "5"))
+ULTRASONIC_EMA_ALPHA = float(os.getenv("ULTRASONIC_EMA_ALPHA", "0.5"))
+# Half the speed of sound in cm/s, as the echo travels there and back.
+SOUND_CM_PER_S = 17150
+ECHO_TIMEOUT = 0.03
+MOTION_DELTA = 5
+MOTION_COOLDOWN = 2
+
+
+class RangeFilter:
+    """Median of the last ``window`` readings, smoothed by an EMA.
+
+    The median drops single spurious echoes and the EMA evens out jitter, so
+    neither is mistaken for motion.
+    """
+
+    def __init__(self, window=ULTRASONIC_MEDIAN_WINDOW, alpha=ULTRASONIC_EMA_ALPHA):
+        self.readings = deque(maxlen=window)
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, distance):
+        self.readings.append(distance)
+        median = statistics.median(self.readings)
+        if self.value is None:
+            self.value = median
+        else:
+            self.value = self.alpha * median + (1 - self.alpha) * self.value
+        return self.value
+
 
 class UltrasonicController:
-    def __init__(self, state_machine, trig_pin=23, echo_pin=24, threshold=50):
+    """Detects motion with an HC-SR04 sensor.
+
+    The echo pulse is timed from GPIO edge callbacks with monotonic
+    timestamps, so measuring does not spin on ``GPIO.input``. Readings are
+    taken ``sample_rate`` times per second and filtered by RangeFilter;
+    a motion event is sent when the filtered distance is below
+    ``threshold`` and moved more than MOTION_DELTA cm, at most once per
+    MOTION_COOLDOWN seconds. ``clock`` is the monotonic time source for
+    both.
+    """
+
+    def __init__(
+        self,
+        state_machine,
+        trig_pin=23,
+        echo_pin=24,
+        threshold=50,
+        gpio=None,
+        sample_rate=ULTRASONIC_SAMPLE_RATE,
+        clock=time.monotonic,
+    ):
         self.state_machine = state_machine
         self.trig_pin = trig_pin
         self.echo_pin = echo_pin
         self.threshold = threshold
+        self.gpio = gpio or GPIO
+        self.sample_rate = sample_rate
+        self.clock = clock
+        self.filter = RangeFilter()
+        self.last_distance = None
+        self.quiet_until = 0.0
         self.running = True
-
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.trig_pin, GPIO.OUT)
-        GPIO.setup(self.echo_pin, GPIO.IN)
+        self.stopped = threading.Event()
+        self.echo_done = threading.Event()
+        self.echo_start = None
+        self.echo_duration = None
+        self.thread = None
+
+        self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setup(self.trig_pin, self.gpio.OUT)
+        self.gpio.setup(self.echo_pin, self.gpio.IN)
+        self.gpio.output(self.trig_pin, False)
+        self.gpio.add_event_detect(
+            self.echo_pin, self.gpio.BOTH, callback=self._on_echo_edge
+        )
 
         printt("Ultrasonic Controller initialized. Motion detection active.")
 
     def get_distance(self):
-        """Measures the distance using the ultrasonic sensor with timeout handling."""
-        GPIO.output(self.trig_pin, False)
-        time.sleep(0.1)
+        """Sends one ping and returns the distance in cm, or None without echo."""
+        self.echo_done.clear()
+        self.echo_start = None
 
-        GPIO.output(self.trig_pin, True)
+        self.gpio.output(self.trig_pin, True)
         time.sleep(0.00001)
-        GPIO.output(self.trig_pin, False)
-
-        start_time = time.time()
-
-        while GPIO.input(self.echo_pin) == 0:
-            pulse_start = time.time()
-            if pulse_start - start_time > 0.02:
-                return None
-
-        while GPIO.input(self.echo_pin) == 1:
-            pulse_end = time.time()
-            if pulse_end - pulse_start > 0.02:
-                return None
-
-        pulse_duration = pulse_end - pulse_start
-        distance = pulse_duration * 17150
-        return round(distance, 2)
+        self.gpio.output(self.trig_pin, False)
+
+        if not self.echo_done.wait(ECHO_TIMEOUT):
+            return None
+        return round(self.echo_duration * SOUND_CM_PER_S, 2)
+
+    def _on_echo_edge(self, channel):
+        # Edges alternate, so the level need not be read back (it may
+        # already have changed again for a near object).
+        now = self.clock()
+        if self.echo_start is None:
+            self.echo_start = now
+        else:
+            self.echo_duration = now - self.echo_start
+            self.echo_start = None
+            self.echo_done.set()
 
     def detect_motion(self):
-        """Continuously monitors motion and sends events to the state machine."""
-        last_distance = self.get_distance()
-
-        if last_distance is None:
+        """Samples the distance and sends events to the state machine."""
+        interval = 1 / self.sample_rate
+        while not self.stopped.is_set():
+            started = self.clock()
+            self.process_reading(self.get_distance(), started)
+            self.stopped.wait(max(0.0, interval - (self.clock() - started)))
+
+    def process_reading(self, distance, now):
+        """Filters one reading taken at ``now`` and sends motion if it moved."""
+        if distance is None:
             return
-
-        time.sleep(1)
-
-        while self.running:
-            current_distance = self.get_distance()
-
-            if current_distance is None:
-                time.sleep(0.5)
-                continue
-
-            if (
-                current_distance < self.threshold
-                and abs(current_distance - last_distance) > 5
-            ):
-                if self.state_machine:
-                    self.state_machine.send_event(
-                        "motion_detected", {"distance": current_distance}
-                    )
-                else:
-                    printt("StateMachine not initialized!")
-
-                time.sleep(2)
-
-            last_distance = current_distance
-            time.sleep(0.5)
+        current_distance = self.filter.update(distance)
+        if (
+            self.last_distance is not None
+            and current_distance < self.threshold
+            and abs(current_distance - self.last_distance) > MOTION_DELTA
+            and now >= self.quiet_until
+        ):
+            if self.state_machine:
+                self.state_machine.send_event(
+                    "motion_detected", {"distance": round(current_distance, 2)}
+                )
+            else:
+                printt("StateMachine not initialized!")
+            self.quiet_until = now + MOTION_COOLDOWN
+        self.last_distance = current_distance
 
     def start(self):
         """Starts the motion detection thread."""
-        self.thread = threading.Thread(target=self.detect_motion, daemon=True)
+        self.thread = threading.Thread(
+            target=self.detect_motion, name="Ultrasonic", daemon=True
+        )
         self.thread.start()
 
     def stop(self):
         """Stops the motion detection thread and cleans up GPIO."""
         self.running = False
-        self.thread.join()
-        GPIO.cleanup()
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.gpio.remove_event_detect(self.echo_pin)
+        self.gpio.cleanup()
@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+
+API_CACHE_PATH = os.getenv(
+    "API_CACHE_PATH",
+    os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "../../data/api_cache.json")
+    ),
+)
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "300"))
+
+
+class APICache:
+    """In-memory and on-disk cache of slowly changing GET responses.
+
+    Used for the room schedule and class rosters. Entries younger than
+    ``ttl`` are served without a request. Older ones are served as they are
+    and revalidated in the background with If-None-Match, so an unchanged
+    schedule costs a 304 and no body and the caller never waits on the API.
+    A failed revalidation is retried after another ``ttl``. A background
+    thread also revalidates every entry once per ``ttl``. When the API cannot
+    be reached the last stored copy is served, which lets the controller boot
+    and run a class offline.
+    """
+
+    def __init__(self, api_service, path=API_CACHE_PATH, ttl=API_CACHE_TTL):
+        self.api_service = api_service
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.stopped = threading.Event()
+        self.thread = None
+        self.revalidating = {}
+        self.entries = self._read()
+
+    def get(self, endpoint):
+        """Returns the cached body for ``endpoint``.
+
+        A stale entry is returned at once and revalidated in the background.
+        Only a miss waits for the API, and raises the request's error.
+        """
+        with self.lock:
+            entry = self.entries.get(endpoint)
+            if entry is not None:
+                stale = time.time() - entry["fetched"] >= self.ttl
+                if stale and endpoint not in self.revalidating:
+                    thread = threading.Thread(
+                        target=self._revalidate,
+                        args=(endpoint,),
+                        name="API-Cache-Revalidate",
+                        daemon=True,
+                    )
+                    self.revalidating[endpoint] = thread
+                    thread.start()
+                return entry["body"]
+        return self.refresh(endpoint)
+
+    def wait(self, timeout=None):
+        """Blocks until the background revalidations have finished."""
+        with self.lock:
+            threads = list(self.revalidating.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def refresh(self, endpoint):
+        """Revalidates ``endpoint`` with the API and returns the current body."""
+        with self.lock:
+            entry = self.entries.get(endpoint)
+        body, etag = self.api_service.get_if_changed(
+            endpoint, etag=entry and entry["etag"]
+        )
+        changed = body is not None
+        if not changed:
+            body = entry["body"]
+
+        with self.lock:
+            self.entries[endpoint] = {
+                "body": body,
+                "etag": etag,
+                "fetched": time.time(),
+            }
+            self._write()
+        if changed:
+            for listener in self.listeners:
+                listener(endpoint, body)
+        return body
+
+    def add_listener(self, listener):
+        """Calls ``listener(endpoint, body)`` whenever a body changes."""
+        self.listeners.append(listener)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self._refresh_loop, name="API-Cache", daemon=True
+            )
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def refresh_all(self):
+        """Revalidates every cached endpoint, logging failures."""
+        with self.lock:
+            endpoints = list(self.entries)
+        for endpoint in endpoints:
+            try:
+                self.refresh(endpoint)
+            except Exception as e:
+                print(f"Refreshing {endpoint} failed: {e}")
+
+    def _revalidate(self, endpoint):
+        try:
+            self.refresh(endpoint)
+        except Exception as e:
+            print(f"Using cached {endpoint}: {e}")
+            # Serve the stored copy for another ttl before trying again.
+            with self.lock:
+                self.entries[endpoint]["fetched"] = time.time()
+        finally:
+            with self.lock:
+                self.revalidating.pop(endpoint, None)
+
+    def _refresh_loop(self):
+        while not self.stopped.wait(self.ttl):
+            self.refresh_all()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
@@ -1,10 +1,34 @@
+import random
 import requests
 import os
+import time
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
 
 from src.services.logging_service import printt
 
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3.05"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "10"))
+API_RETRIES = int(os.getenv("API_RETRIES", "3"))
+API_BACKOFF = float(os.getenv("API_BACKOFF", "0.25"))
+API_MAX_RETRY_AFTER = float(os.getenv("API_MAX_RETRY_AFTER", "30"))
+
+IDEMPOTENT_METHODS = {"GET", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
 
 class APIService:
+    """Client for the backend API over a pooled keep-alive session.
+
+    Every call has a (connect, read) timeout. GET, PUT and DELETE are retried
+    on connection errors, timeouts and RETRY_STATUSES with full-jitter
+    exponential backoff; POST is never retried because it is not idempotent.
+    A ``Retry-After`` header on a retried response replaces the backoff. If
+    it asks for more than API_MAX_RETRY_AFTER seconds, the response is
+    returned as is rather than holding the caller that long.
+    """
+
     _instance = None
 
     def __new__(cls, *args, **kwargs):
@@ -12,7 +36,15 @@ class APIService:
             cls._instance = super(APIService, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self, base_url, api_key=None):
+    def __init__(
+        self,
+        base_url,
+        api_key=None,
+        pool_size=API_POOL_SIZE,
+        timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT),
+        retries=API_RETRIES,
+        backoff=API_BACKOFF,
+    ):
         if not hasattr(self, "initialized"):
             self.base_url = base_url
             self.api_key = api_key
@@ -20,54 +52,118 @@ class APIService:
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {self.api_key}" if self.api_key else None,
             }
+            self.timeout = timeout
+            self.retries = retries
+            self.backoff = backoff
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
             self.initialized = True
 
-    def get(self, endpoint, params=None):
-        endpoint = endpoint.lstrip("/")
-        url = f"{self.base_url}/{endpoint}"
-        response = requests.get(url, headers=self.headers, params=params)
+    def get(self, endpoint, params=None, timeout=None):
+        response = self._request(
+            "GET", endpoint, timeout, headers=self.headers, params=params
+        )
         return self._handle_response(response)
 
-    def post(self, endpoint, json=None, files=None):
-        endpoint = endpoint.lstrip("/")
-        url = f"{self.base_url}/{endpoint}"
+    def get_if_changed(self, endpoint, etag=None, timeout=None):
+        """Conditional GET. Returns (body, etag), with body None if unchanged."""
+        headers = dict(self.headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        response = self._request("GET", endpoint, timeout, headers=headers)
+        if response.status_code == 304:
+            return None, etag
+        return self._handle_response(response), response.headers.get("ETag")
+
+    def post(self, endpoint, json=None, files=None, timeout=None, headers=None):
+        headers = {**self.headers, **(headers or {})}
         if files:
-            headers = {
-                key: value
-                for key, value in self.headers.items()
-                if key != "Content-Type"
-            }
-            response = requests.post(url, headers=headers, data=json, files=files)
+            headers.pop("Content-Type")
+            response = self._request(
+                "POST", endpoint, timeout, headers=headers, data=json, files=files
+            )
         else:
-            response = requests.post(url, headers=self.headers, json=json)
+            response = self._request(
+                "POST", endpoint, timeout, headers=headers, json=json
+            )
         return self._handle_response(response)
 
-    def put(self, endpoint, json=None):
-        endpoint = endpoint.lstrip("/")
-        url = f"{self.base_url}/{endpoint}"
-        response = requests.put(url, headers=self.headers, json=json)
+    def put(self, endpoint, json=None, timeout=None, headers=None):
+        headers = {**self.headers, **(headers or {})}
+        response = self._request("PUT", endpoint, timeout, headers=headers, json=json)
         return self._handle_response(response)
 
-    def delete(self, endpoint):
-        endpoint.lstrip("/")
-        url = f"{self.base_url}/{endpoint}"
-        response = requests.delete(url, headers=self.headers)
+    def delete(self, endpoint, timeout=None):
+        response = self._request("DELETE", endpoint, timeout, headers=self.headers)
         return self._handle_response(response)
 
+    def close(self):
+        self.session.close()
+
+    def _request(self, method, endpoint, timeout=None, **kwargs):
+        endpoint = endpoint.lstrip("/")
+        url = f"{self.base_url}/{endpoint}"
+        timeout = timeout or self.timeout
+        attempts = self.retries + 1 if method in IDEMPOTENT_METHODS else 1
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                print(f"{method} {url} failed ({e}), retrying...")
+            else:
+                if last_attempt or response.status_code not in RETRY_STATUSES:
+                    return response
+                delay = self._retry_after(response)
+                if delay is not None:
+                    if delay > API_MAX_RETRY_AFTER:
+                        return response
+                    print(
+                        f"{method} {url} returned {response.status_code}, "
+                        f"retrying in {delay:.1f}s..."
+                    )
+                    time.sleep(delay)
+                    continue
+                print(f"{method} {url} returned {response.status_code}, retrying...")
+            time.sleep(random.uniform(0, self.backoff * 2**attempt))
+
+    @staticmethod
+    def _retry_after(response):
+        """Seconds to wait from a Retry-After header, or None if absent."""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, when.timestamp() - time.time())
+
     def _handle_response(self, response):
-        if response.status_code // 200:
+        if response.status_code == 401:
             try:
                 json_response = response.json()
+            except ValueError:
+                json_response = None
+            if (
+                isinstance(json_response, dict)
+                and json_response.get("error") == "Unauthorized"
+            ):
+                print("Error: Unauthorized access (please check your API key)")
+                os._exit(1)
 
-                if (
-                    isinstance(json_response, dict)
-                    and "error" in json_response
-                    and json_response["error"] == "Unauthorized"
-                ):
-                    print("Error: Unauthorized access (please check your API key)")
-                    os._exit(1)
-
-                return json_response
+        if 200 <= response.status_code < 300:
+            try:
+                return response.json()
             except ValueError:
                 print("Response is not valid JSON")
                 return None
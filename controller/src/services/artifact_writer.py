@@ -0,0 +1,150 @@
+import os
+import queue
+import threading
+
+from src.services.logging_service import printt
+
+ARTIFACT_JPEG_QUALITY = int(os.getenv("ARTIFACT_JPEG_QUALITY", "90"))
+ARTIFACT_MAX_WIDTH = int(os.getenv("ARTIFACT_MAX_WIDTH", "1280"))
+ARTIFACT_QUEUE_SIZE = int(os.getenv("ARTIFACT_QUEUE_SIZE", "16"))
+ARTIFACT_OVERFLOW = os.getenv("ARTIFACT_OVERFLOW", "drop_newest")
+
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+
+class ArtifactWriter:
+    """Writes images and log lines to disk on a background thread.
+
+    Jobs go through a bounded queue so a slow SD card never stalls the
+    caller. When the queue is full the ``overflow`` policy decides:
+
+    - ``drop_newest``: reject the new job.
+    - ``drop_oldest``: evict the oldest queued job to make room.
+    - ``block``: wait up to ``block_timeout`` seconds, then reject.
+
+    Images wider than ``max_width`` (0 = no limit) are scaled down and
+    copied when queued, so a queued job never holds on to the caller's
+    full-resolution frame, and encoded at ``jpeg_quality``.
+    """
+
+    def __init__(
+        self,
+        max_pending=ARTIFACT_QUEUE_SIZE,
+        jpeg_quality=ARTIFACT_JPEG_QUALITY,
+        max_width=ARTIFACT_MAX_WIDTH,
+        overflow=ARTIFACT_OVERFLOW,
+        block_timeout=1.0,
+        name="Artifact-Writer",
+    ):
+        if overflow not in (DROP_NEWEST, DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.jpeg_quality = jpeg_quality
+        self.max_width = max_width
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._worker, name=name, daemon=True)
+        self.thread.start()
+
+    def write_image(self, path, image):
+        """Queues a BGR image, or a callable rendering one, to be saved as JPEG.
+
+        An array is shrunk to ``max_width`` (or copied) before it is queued. A
+        callable is only run on the writer thread, which keeps work such as
+        annotating a frame off the caller's path; it should render from an
+        image passed through ``shrink``. Returns False if the job was dropped.
+        """
+        if not callable(image):
+            image = self.shrink(image)
+        return self._enqueue(("image", path, image))
+
+    def write_bytes(self, path, data):
+        """Queues already-encoded bytes to be written to ``path``."""
+        return self._enqueue(("bytes", path, data))
+
+    def append_text(self, path, text):
+        """Queues ``text`` to be appended to the file at ``path``."""
+        return self._enqueue(("text", path, text))
+
+    def shrink(self, image):
+        """Returns a copy of ``image`` no wider than ``max_width``."""
+        if self.max_width and image.shape[1] > self.max_width:
+            import cv2
+
+            height = round(image.shape[0] * self.max_width / image.shape[1])
+            return cv2.resize(
+                image, (self.max_width, height), interpolation=cv2.INTER_AREA
+            )
+        return image.copy()
+
+    def encode_jpeg(self, image):
+        """Encodes a BGR image with the writer's resolution and quality settings."""
+        # cv2 is imported on first use, keeping it off the controller's start.
+        import cv2
+
+        if self.max_width and image.shape[1] > self.max_width:
+            image = self.shrink(image)
+        ok, encoded = cv2.imencode(
+            ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        )
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return encoded.tobytes()
+
+    def flush(self):
+        """Blocks until every queued job has been written."""
+        self.queue.join()
+
+    def _enqueue(self, job):
+        try:
+            if self.overflow == BLOCK:
+                self.queue.put(job, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(job)
+            return True
+        except queue.Full:
+            if self.overflow != DROP_OLDEST:
+                self._count_drop()
+                return False
+
+        try:
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self._count_drop()
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except queue.Full:
+            self._count_drop()
+            return False
+
+    def _count_drop(self):
+        with self.lock:
+            self.dropped += 1
+
+    def _worker(self):
+        while True:
+            kind, path, payload = self.queue.get()
+            try:
+                if kind == "image":
+                    image = payload() if callable(payload) else payload
+                    payload = self.encode_jpeg(image)
+                if kind == "text":
+                    with open(path, "a") as f:
+                        f.write(payload)
+                else:
+                    with open(path, "wb") as f:
+                        f.write(payload)
+                with self.lock:
+                    self.written += 1
+            except Exception as e:
+                printt(f"Error writing {path}: {e}")
+            finally:
+                self.queue.task_done()
@@ -1,107 +1,386 @@
+import bisect
+import os
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from datetime import datetime
 
+from src.services.api_cache import APICache
 from src.services.logging_service import printt
-from src.services.face_recognition_service import FaceRecognitionService
+from src.services.metrics import metrics
+from src.services.outbox import Outbox
+from src.services.tap_cache import TAP_RECOGNIZED_TTL, TapCache
+from src.services.thread_pool import CRITICAL, PoolFull
+from src.services.recognition_loader import RecognitionLoader
+
+face_recognition = RecognitionLoader()
+
+ATTENDANCE_BULK_SIZE = int(os.getenv("ATTENDANCE_BULK_SIZE", "500"))
+ATTENDANCE_POST_CONCURRENCY = int(os.getenv("ATTENDANCE_POST_CONCURRENCY", "8"))
+SESSION_RETRY_INTERVAL = float(os.getenv("SESSION_RETRY_INTERVAL", "30"))
+# Sessions kept for scans that are still waiting in the outbox.
+SESSION_CACHE_SIZE = 64
+
+
+class ClassSchedule:
+    """A room's classes sorted by end time, for bisect lookups per tap."""
+
+    def __init__(self, schedule):
+        self.classes = sorted(schedule or [], key=lambda x: x["endTime"])
+        self.end_times = [class_info["endTime"] for class_info in self.classes]
+        self.boundaries = sorted(
+            _seconds(class_info[key])
+            for class_info in self.classes
+            for key in ("startTime", "endTime")
+            if class_info.get(key)
+        )
+
+    def current(self, current_time):
+        """Returns the first class ending after ``current_time``.
+
+        After the last class of the day this wraps to the first one.
+        """
+        if not self.classes:
+            return None
+        index = bisect.bisect_right(self.end_times, current_time)
+        return self.classes[index] if index < len(self.classes) else self.classes[0]
+
+    def near_boundary(self, current_time, window):
+        """True if a class starts or ends within ``window`` seconds of ``current_time``."""
+        now = _seconds(current_time)
+        index = bisect.bisect_left(self.boundaries, now - window)
+        return index < len(self.boundaries) and self.boundaries[index] <= now + window
 
-face_recognition_service = FaceRecognitionService()
+
+def _seconds(clock):
+    """Seconds since midnight for an "HH:MM" or "HH:MM:SS" string."""
+    parts = [int(part) for part in clock.split(":")]
+    return parts[0] * 3600 + parts[1] * 60 + (parts[2] if len(parts) > 2 else 0)
 
 
 class AttendanceService:
     _instance = None
+    # Guards the session caches; never held while the API is called.
+    _session_lock = threading.Lock()
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super(AttendanceService, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self, api_service, camera_controller, thread_pool, room_number):
+    def __init__(
+        self,
+        api_service,
+        camera_controller,
+        thread_pool,
+        room_number,
+        outbox=None,
+        api_cache=None,
+    ):
         if not hasattr(self, "initialized"):
             self.studentId_to_attendanceId = {}
+            self.sessions = {}
+            self.session_locks = {}
+            self.session_thread = None
+            self.session_retry_at = 0.0
             self.api_service = api_service
+            self.outbox = outbox or Outbox()
+            self.outbox.register("attendance", self._send_attendance)
+            self.api_cache = api_cache or APICache(api_service)
+            self.api_cache.add_listener(self._on_cache_change)
             self.camera_controller = camera_controller
             self.thread_pool = thread_pool
             self.room_number = room_number
+            self.bulk_attendance_supported = True
+            self.tap_cache = TapCache()
             self.schedule = self.get_schedule()
+            self.class_schedule = ClassSchedule(self.schedule)
             self.current_class = self.get_current_class()
-            self.current_session = self.create_session()
+            self.current_session = None
+            self._ensure_session()
             self.initialized = True
 
     def handle_attendance_event(self, nfc_event):
+        """Captures the scan and queues its recognition at CRITICAL priority.
+
+        Repeat taps within TAP_DEBOUNCE_WINDOW seconds, and taps from a
+        student already recognised in this session, are dropped before the
+        camera is used. If the pool has no room for the recognition, the tap
+        is still recorded, unrecognised. The scan's session and check-in time
+        are taken at the tap, however long its recognition waits. Returns the
+        recognition Future, or None if nothing was queued.
+        """
         printt("Handling attendance event...")
 
         if nfc_event is None:
             printt("No NFC event data received.")
             return
 
-        class_id = self.get_current_class()
+        class_info = self.get_current_class()
+        if self.current_class != class_info:
+            self.current_class = class_info
+            self.current_session = None
+            self.session_retry_at = 0.0
 
-        if self.current_class != class_id:
-            self.current_class = class_id
-            self.current_session = self.create_session()
-            if not self.current_session:
-                printt("Failed to create session.")
-                return
+        # Without a session the scan is still recorded; the outbox holds it
+        # and opens the session itself once the API is reachable.
+        self._ensure_session()
+        if not self.current_session:
+            printt("No session yet, queueing scan.")
 
-        if self.current_session is None:
-            self.current_session = self.create_session()
-            if not self.current_session:
-                printt("Failed to create session.")
-                return
+        session = None
+        if class_info is not None:
+            session = self._session_data(class_info, date.today())
+        check_in = time.strftime("%Y-%m-%d %H:%M:%S")
+        tapped_at = nfc_event.get("tapped_at")
+
+        student_id = nfc_event.get("card_id")
+        tap_key = self._tap_key(student_id, session)
+        if not self.tap_cache.add(tap_key):
+            printt(f"Ignoring repeat tap from {student_id}")
+            return
 
         try:
-            filename = f"capture_{int(time.time())}.jpg"
-            full_picture_path = self.camera_controller.take_picture(filename=filename)
-            printt(f"Picture saved as {filename}")
+            name = f"capture_{int(time.time())}"
+            with metrics.timer("capture"):
+                frame = self.camera_controller.capture_array(filename=f"{name}.jpg")
+            printt(f"Picture captured as {name}")
+            if tapped_at:
+                metrics.observe(
+                    f"tap_to_capture_{nfc_event.get('camera_state', 'unknown')}",
+                    time.time() - tapped_at,
+                )
         except Exception as e:
             printt(f"Error taking picture: {e}")
+            self.tap_cache.discard(tap_key)
             return
 
-        student_id = nfc_event.get("card_id")
-
-        self.thread_pool.submit(
-            self.process_facial_recognition, full_picture_path, student_id
+        # Score the frames buffered before the tap along with the post-tap still.
+        frames = self.camera_controller.recent_frames() + [frame]
+
+        future = self.thread_pool.submit_with_priority(
+            CRITICAL,
+            self.process_facial_recognition,
+            frames,
+            student_id,
+            name,
+            tapped_at,
+            tap_key,
+            session,
+            check_in,
+        )
+        future.add_done_callback(
+            lambda f: self._recognition_dropped(
+                f, student_id, name, tapped_at, tap_key, session, check_in
+            )
+        )
+        return future
+
+    def _recognition_dropped(
+        self, future, student_id, name, tapped_at, tap_key, session, check_in
+    ):
+        # A scan the pool rejected or cancelled is recorded without a face,
+        # and the student may tap again at once to be recognised.
+        if not future.cancelled() and not isinstance(future.exception(), PoolFull):
+            return
+        reason = "cancelled" if future.cancelled() else future.exception()
+        printt(f"Recognition for {student_id} dropped ({reason}), recording the tap")
+        self.tap_cache.discard(tap_key)
+        self.record_attendance(
+            student_id,
+            "Unknown",
+            f"{name}.jpg",
+            None,
+            tapped_at,
+            session=session,
+            check_in=check_in,
         )
 
-    def process_facial_recognition(self, image_path, student_id):
-        """Processes the image for facial recognition and logs attendance."""
+    def _tap_key(self, student_id, session):
+        # Keyed by class and start time, so a session opened mid-class keeps
+        # the taps made before it.
+        if session is None:
+            return (None, str(date.today()), student_id)
+        return (*self._session_key(session), student_id)
+
+    def process_facial_recognition(
+        self,
+        image,
+        student_id,
+        name=None,
+        tapped_at=None,
+        tap_key=None,
+        session=None,
+        check_in=None,
+    ):
+        """Processes the image for facial recognition and logs attendance.
+
+        ``image`` is the path of a captured file, an in-memory RGB frame or a
+        list of frames from which the best face is picked. Returns the primary
+        recognition result, or None when no face was recognised or it failed.
+        A trusted result marks ``tap_key`` so the student's later taps in the
+        session are dropped (see ``_trusted``). ``session`` and ``check_in``
+        are passed on to record_attendance.
+        """
         try:
-            results = face_recognition_service.run_on_image(image_path)
+            service = face_recognition.get()
+            if isinstance(image, str):
+                results = service.run_on_image(image)
+            elif isinstance(image, list):
+                results = service.run_on_frames(image, name)
+            else:
+                results = service.run_on_array(image, name)
             if not results:
                 return
 
             primary = results[0]
-            identity = primary["identity"]
-            portrait_path = primary["croppedPath"]
-            portrait_url = None
-
-            with open(portrait_path, "rb") as f:
-                response = self.api_service.post("/image", files={"image": f})
-                if response.get("error"):
-                    raise Exception("Image upload failed.")
-                image_url = response.get("message", {}).get("fileUrl")
-                portrait_url = image_url
-                printt(f"Image uploaded: {image_url}")
-
-            self.api_service.put(
-                f"/attendance/{self.studentId_to_attendanceId.get(student_id)}",
-                json={
-                    "FRIdentifiedId": "" if identity == "Unknown" else identity,
-                    "checkIn": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "portraitUrl": portrait_url,
-                },
+            self.record_attendance(
+                student_id,
+                primary["identity"],
+                os.path.basename(primary["croppedPath"]),
+                primary["croppedImage"],
+                tapped_at,
+                session=session,
+                check_in=check_in,
             )
-            printt(f"Attendance logged for {student_id} as {identity}")
+            detail = primary["identity"]
+            if primary.get("confidence") is not None:
+                detail += (
+                    f" (confidence {primary['confidence']:.2f}"
+                    f" from {primary['frames']} frames)"
+                )
+            printt(f"Attendance queued for {student_id} as {detail}")
+            if tap_key is not None and self._trusted(primary):
+                self.tap_cache.set(tap_key, primary["identity"], ttl=TAP_RECOGNIZED_TTL)
+            return primary
 
         except Exception as e:
             printt(f"Error in async recognition: {e}")
 
+    @staticmethod
+    def _trusted(result):
+        """True if a result may close the session to the card's later taps.
+
+        Only a known identity whose multi-frame vote reached
+        RECOGNITION_CONFIDENCE counts. A single-frame result, a weak vote or
+        someone else holding the card leaves only the debounce entry, so the
+        real student can still tap and be recognised.
+        """
+        # The recognition modules are loaded by now; importing them at the
+        # top would undo the lazy model import.
+        from src.services.face_scoring import RECOGNITION_CONFIDENCE
+
+        confidence = result.get("confidence")
+        return (
+            result["identity"] != "Unknown"
+            and confidence is not None
+            and confidence >= RECOGNITION_CONFIDENCE
+        )
+
+    def record_attendance(
+        self,
+        student_id,
+        identity,
+        portrait_name,
+        portrait,
+        tapped_at=None,
+        session=None,
+        check_in=None,
+    ):
+        """Persists a scan in the outbox; ``_send_attendance`` delivers it.
+
+        ``session`` is the ``/session`` body of the tap's class and
+        ``check_in`` the tap time; both default to the current class and
+        time. The payload names that session, so a scan recognised or sent
+        later is still attributed to the class it was made in.
+        """
+        if session is None and self.current_class is not None:
+            session = self._session_data(self.current_class, date.today())
+        attendance_id = None
+        if session is not None:
+            opened = self.sessions.get(self._session_key(session))
+            attendance_id = opened[1].get(student_id) if opened else None
+        self.outbox.add(
+            "attendance",
+            {
+                "studentId": student_id,
+                "attendanceId": attendance_id,
+                "session": session,
+                "FRIdentifiedId": "" if identity == "Unknown" else identity,
+                "checkIn": check_in or time.strftime("%Y-%m-%d %H:%M:%S"),
+                "portraitName": portrait_name,
+                "portraitUrl": None,
+                "tappedAt": tapped_at,
+            },
+            blob=portrait,
+            ordering_key=":".join(
+                str(part) for part in self._tap_key(student_id, session)
+            ),
+        )
+
+    def _send_attendance(self, jobs):
+        """Outbox handler: uploads the portrait, then updates the record."""
+        for job in jobs:
+            payload = job.payload
+            attendance_id = self._attendance_id(payload)
+
+            if payload["portraitUrl"] is None and job.blob is not None:
+                with metrics.timer("upload"):
+                    response = self.api_service.post(
+                        "/image",
+                        files={
+                            "image": (payload["portraitName"], job.blob, "image/jpeg")
+                        },
+                        headers={"Idempotency-Key": f"{job.key}-image"},
+                    )
+                if response.get("error"):
+                    raise Exception("Image upload failed.")
+                payload["portraitUrl"] = response.get("message", {}).get("fileUrl")
+                printt(f"Image uploaded: {payload['portraitUrl']}")
+
+            with metrics.timer("attendance_put"):
+                self.api_service.put(
+                    f"/attendance/{attendance_id}",
+                    json={
+                        "FRIdentifiedId": payload["FRIdentifiedId"],
+                        "checkIn": payload["checkIn"],
+                        "portraitUrl": payload["portraitUrl"],
+                    },
+                    headers={"Idempotency-Key": job.key},
+                )
+            if payload.get("tappedAt"):
+                metrics.observe("tap_to_attendance", time.time() - payload["tappedAt"])
+            printt(f"Attendance logged for {payload['studentId']}")
+
+    def _attendance_id(self, payload):
+        """Resolves a queued scan's attendance ID in the session of its tap."""
+        if payload["attendanceId"]:
+            return payload["attendanceId"]
+        student_id = payload["studentId"]
+        if "session" in payload:
+            session_data = payload["session"]
+        else:
+            # Scans queued before the session was recorded with them.
+            session_data = None
+            if self.current_class is not None:
+                session_data = self._session_data(self.current_class, date.today())
+        if session_data is None:
+            raise ValueError(f"No class was in session for the scan of {student_id}")
+
+        _, attendance_ids = self._open_session(session_data)
+        attendance_id = attendance_ids.get(student_id)
+        if attendance_id is None:
+            raise ValueError(f"No attendance record for student {student_id}")
+        # Kept in the payload so a retry does not resolve it again.
+        payload["attendanceId"] = attendance_id
+        return attendance_id
+
     def get_schedule(self):
-        """Fetches the schedule from the API."""
+        """Returns the room's schedule, from the cache when it is fresh."""
         try:
-            response = self.api_service.get("/schedule/" + self.room_number)
+            response = self.api_cache.get(f"/schedule/{self.room_number}")
             if response:
                 return response
         except requests.RequestException as e:
@@ -109,83 +388,178 @@ class AttendanceService:
             return None
 
     def get_current_class(self):
-        """Returns the current class ID based on the schedule using endtimes."""
-        current_time = time.strftime("%H:%M")
-
-        if self.schedule:
-            current_class = None
-            self.schedule.sort(key=lambda x: x["endTime"])
-
-            for class_info in self.schedule:
-                end_time = class_info["endTime"]
-                if current_time < end_time:
-                    current_class = class_info
-                    break
-
-            if current_class:
-                return current_class
-            elif not current_class and self.schedule.__len__() > 0:
-                return self.schedule[0]
-            else:
-                printt("No current class found.")
-                return None
-
-        return None
-
-    def create_session(self):
-        """Creates a new session for the given class ID."""
-        start_str = self.current_class.get("startTime")
-        end_str = self.current_class.get("endTime")
-
-        start_time = datetime.strptime(start_str, "%H:%M:%S").time()
-        end_time = datetime.strptime(end_str, "%H:%M:%S").time()
-
-        today = date.today()
-        start_datetime = datetime.combine(today, start_time).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
-        end_datetime = datetime.combine(today, end_time).strftime("%Y-%m-%d %H:%M:%S")
-
-        session_data = {
-            "startTime": start_datetime,
-            "endTime": end_datetime,
-            "classId": self.current_class.get("id"),
-        }
+        """Returns the current class based on the schedule using endtimes."""
+        return self.class_schedule.current(time.strftime("%H:%M"))
+
+    def near_class_boundary(self, window):
+        """True if a class in this room starts or ends within ``window`` seconds."""
+        return self.class_schedule.near_boundary(time.strftime("%H:%M:%S"), window)
+
+    def _on_cache_change(self, endpoint, body):
+        if endpoint == f"/schedule/{self.room_number}":
+            self.schedule = body
+            self.class_schedule = ClassSchedule(body)
+
+    def _ensure_session(self):
+        """Starts opening the current class's session on a background thread.
+
+        Taps never wait on the API for it. After a failed attempt the next
+        one starts SESSION_RETRY_INTERVAL seconds later at the earliest.
+        """
+        with self._session_lock:
+            if (
+                self.current_session
+                or self.current_class is None
+                or (self.session_thread and self.session_thread.is_alive())
+                or time.monotonic() < self.session_retry_at
+            ):
+                return
+            self.session_retry_at = time.monotonic() + SESSION_RETRY_INTERVAL
+            self.session_thread = threading.Thread(
+                target=self._open_current_session,
+                args=(self.current_class,),
+                name="Session-Open",
+                daemon=True,
+            )
+            self.session_thread.start()
 
-        try:
-            session = self.api_service.post("/session", json=session_data)
+    def _open_current_session(self, class_info):
+        session = self.create_session(class_info)
+        # A class that ended meanwhile gets its own session on the next tap.
+        if session and self.current_class == class_info:
             self.current_session = session
-            printt(f"Session created: {session}")
-        except requests.RequestException as e:
-            print(f"Error creating session: {e}")
+
+    def create_session(self, class_info=None):
+        """Creates the session of ``class_info``, by default the current class."""
+        class_info = class_info or self.current_class
+        if class_info is None:
+            printt("No class to create a session for.")
             return None
 
+        session_data = self._session_data(class_info, date.today())
         try:
-            student_ids = self.api_service.get(
-                f"/class/{self.current_class.get('id')}/students"
-            )
-
-            for studentId in student_ids:
-                attendance_data = {"studentId": studentId}
-                attendance_record = self.api_service.post(
-                    f"/session/{self.current_session.get('id')}/attendance",
-                    json=attendance_data,
-                )
-
-                print(
-                    f"Attendance record created for student {studentId}: {attendance_record.get('id')}"
-                )
-
-                self.studentId_to_attendanceId[studentId] = attendance_record.get("id")
-
-            printt(
-                f"Attendance records inserted for session {self.current_session.get('id')}"
-            )
+            session, attendance_ids = self._open_session(session_data)
         except requests.RequestException as e:
-            print(f"Error inserting attendance records: {e}")
+            print(f"Error creating session: {e}")
             return None
         except Exception as e:
             print(f"Unexpected error: {e}")
             return None
 
+        self.studentId_to_attendanceId = attendance_ids
         return session
+
+    @staticmethod
+    def _session_data(class_info, day):
+        """The ``/session`` request body for ``class_info`` on ``day``."""
+        times = {}
+        for key in ("startTime", "endTime"):
+            clock = datetime.strptime(class_info.get(key), "%H:%M:%S").time()
+            times[key] = datetime.combine(day, clock).strftime("%Y-%m-%d %H:%M:%S")
+        return {**times, "classId": class_info.get("id")}
+
+    @staticmethod
+    def _session_key(session_data):
+        return (session_data["classId"], session_data["startTime"])
+
+    def _open_session(self, session_data):
+        """Returns ``(session, {studentId: attendanceId})`` for ``session_data``.
+
+        The session and its attendance records are created on first use and
+        then reused, from the session thread and outbox deliveries alike.
+        Only callers of the same session wait for its requests. Raises if
+        either cannot be created, so nothing half-made is kept.
+        """
+        key = self._session_key(session_data)
+        with self._session_lock:
+            if key in self.sessions:
+                return self.sessions[key]
+            lock = self.session_locks.setdefault(key, threading.Lock())
+
+        with lock:
+            with self._session_lock:
+                if key in self.sessions:
+                    return self.sessions[key]
+
+            session = self.api_service.post("/session", json=session_data)
+            printt(f"Session created: {session}")
+            student_ids = self.api_cache.get(
+                f"/class/{session_data['classId']}/students"
+            )
+            attendance_ids = self.create_attendance_records(
+                session.get("id"), student_ids
+            )
+            printt(f"Attendance records inserted for session {session.get('id')}")
+
+            with self._session_lock:
+                self.sessions[key] = (session, attendance_ids)
+                if len(self.sessions) > SESSION_CACHE_SIZE:
+                    oldest = next(iter(self.sessions))
+                    del self.sessions[oldest]
+                    self.session_locks.pop(oldest, None)
+            return session, attendance_ids
+
+    def create_attendance_records(self, session_id, student_ids):
+        """Creates attendance records for a roster, returning studentId -> id.
+
+        The roster is sent to the bulk endpoint in chunks of
+        ATTENDANCE_BULK_SIZE. Students the bulk endpoint did not handle are
+        created with individual POSTs, at most ATTENDANCE_POST_CONCURRENCY at
+        a time. A server without the bulk endpoint is only probed once.
+        """
+        attendance_ids = {}
+
+        if self.bulk_attendance_supported:
+            try:
+                for i in range(0, len(student_ids), ATTENDANCE_BULK_SIZE):
+                    chunk = student_ids[i : i + ATTENDANCE_BULK_SIZE]
+                    attendance_ids.update(
+                        self._create_attendance_bulk(session_id, chunk)
+                    )
+            except Exception as e:
+                printt(f"Bulk attendance upload failed, posting individually: {e}")
+
+        remaining = [s for s in student_ids if s not in attendance_ids]
+        if remaining:
+            attendance_ids.update(
+                self._create_attendance_parallel(session_id, remaining)
+            )
+        return attendance_ids
+
+    def _create_attendance_bulk(self, session_id, student_ids):
+        try:
+            records = self.api_service.post(
+                f"/session/{session_id}/attendance/bulk",
+                json={"studentIds": student_ids},
+            )
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code in (404, 405):
+                self.bulk_attendance_supported = False
+            raise
+        if records is None:
+            self.bulk_attendance_supported = False
+            raise Exception("bulk attendance endpoint not available")
+        if not isinstance(records, list):
+            raise Exception(records.get("error", records))
+        return {record.get("studentId"): record.get("id") for record in records}
+
+    def _create_attendance_parallel(self, session_id, student_ids):
+        def create(student_id):
+            try:
+                record = self.api_service.post(
+                    f"/session/{session_id}/attendance",
+                    json={"studentId": student_id},
+                )
+                return student_id, record.get("id")
+            except Exception as e:
+                printt(f"Error creating attendance record for {student_id}: {e}")
+                return student_id, None
+
+        workers = max(1, min(ATTENDANCE_POST_CONCURRENCY, len(student_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(create, student_ids)
+        return {
+            student_id: attendance_id
+            for student_id, attendance_id in results
+            if attendance_id is not None
+        }
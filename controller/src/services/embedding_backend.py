@@ -0,0 +1,131 @@
+import os
+import torch
+
+from src.services.logging_service import printt
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_QUANTIZE = os.getenv("EMBEDDING_QUANTIZE", "0") == "1"
+MODEL_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../../data", "models")
+)
+MODEL_NAME = "inception_resnet_v1"
+INPUT_SHAPE = (1, 3, 160, 160)
+
+
+class TorchEmbedder:
+    """Reference backend: eager-mode float32 InceptionResnetV1."""
+
+    name = "torch"
+
+    def __init__(self, model, device):
+        self.model = model.eval().to(device)
+        self.device = device
+
+    def __call__(self, faces):
+        with torch.no_grad():
+            return self.model(faces.to(self.device)).cpu().numpy()
+
+
+class TorchScriptEmbedder:
+    """Traced and frozen TorchScript module, optionally int8 dynamic-quantized.
+
+    Dynamic quantization in PyTorch only covers the final Linear layer, so the
+    gain is mostly load time and a smaller interpreter overhead.
+    """
+
+    name = "torchscript"
+
+    def __init__(self, load_model, model_dir=MODEL_DIR, quantize=False):
+        suffix = ".int8.pt" if quantize else ".pt"
+        self.path = os.path.join(model_dir, MODEL_NAME + suffix)
+        if not os.path.exists(self.path):
+            self._export(load_model(), quantize)
+        self.module = torch.jit.load(self.path, map_location="cpu")
+
+    def _export(self, model, quantize):
+        printt(f"Exporting TorchScript embedding model to {self.path}...")
+        model = model.eval().cpu()
+        if quantize:
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        with torch.no_grad():
+            traced = torch.jit.freeze(torch.jit.trace(model, torch.zeros(INPUT_SHAPE)))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        torch.jit.save(traced, self.path)
+
+    def __call__(self, faces):
+        with torch.no_grad():
+            return self.module(faces.cpu()).numpy()
+
+
+class ONNXEmbedder:
+    """ONNX Runtime session, optionally with int8 dynamic-quantized weights.
+
+    onnxruntime (and onnx, for quantization) are only imported when this
+    backend is selected.
+    """
+
+    name = "onnx"
+
+    def __init__(self, load_model, model_dir=MODEL_DIR, quantize=False, threads=0):
+        import onnxruntime
+
+        self.path = os.path.join(model_dir, MODEL_NAME + ".onnx")
+        if not os.path.exists(self.path):
+            self._export(load_model())
+        if quantize:
+            self.path = self._quantize(self.path)
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            self.path, options, providers=["CPUExecutionProvider"]
+        )
+
+    def _export(self, model):
+        printt(f"Exporting ONNX embedding model to {self.path}...")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        torch.onnx.export(
+            model.eval().cpu(),
+            torch.zeros(INPUT_SHAPE),
+            self.path,
+            input_names=["faces"],
+            output_names=["embeddings"],
+            dynamic_axes={"faces": {0: "batch"}, "embeddings": {0: "batch"}},
+            dynamo=False,
+        )
+
+    def _quantize(self, path):
+        quantized = path.replace(".onnx", ".int8.onnx")
+        if not os.path.exists(quantized):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            printt(f"Quantizing ONNX embedding model to {quantized}...")
+            quantize_dynamic(path, quantized, weight_type=QuantType.QInt8)
+        return quantized
+
+    def __call__(self, faces):
+        faces = faces.detach().cpu().numpy()
+        return self.session.run(None, {"faces": faces})[0]
+
+
+def create_embedder(
+    load_model,
+    device,
+    backend=EMBEDDING_BACKEND,
+    quantize=EMBEDDING_QUANTIZE,
+    model_dir=MODEL_DIR,
+):
+    """Builds the configured embedding backend.
+
+    ``load_model`` returns the eager InceptionResnetV1; exported backends only
+    call it when their model file does not exist yet.
+    """
+    if backend == "torch":
+        return TorchEmbedder(load_model(), device)
+    if backend == "torchscript":
+        return TorchScriptEmbedder(load_model, model_dir, quantize)
+    if backend == "onnx":
+        return ONNXEmbedder(load_model, model_dir, quantize)
+    raise ValueError(f"Unknown embedding backend: {backend}")
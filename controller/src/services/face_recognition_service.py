@@ -1,12 +1,55 @@
 import os
+import queue
+import threading
+import time
 import cv2
 import torch
 import numpy as np
 from PIL import Image
+from concurrent.futures import Future
 from datetime import datetime
 from facenet_pytorch import InceptionResnetV1, MTCNN
 
+from src.services.artifact_writer import ArtifactWriter
+from src.services.embedding_backend import create_embedder
+from src.services.face_scoring import IdentityVote, plan_burst
+from src.services.gallery import grow_index, index_class, load_index
 from src.services.logging_service import printt
+from src.services.metrics import metrics
+
+GALLERY_INDEX = os.getenv("GALLERY_INDEX", "brute")
+SAVE_ANNOTATED_FRAMES = os.getenv("SAVE_ANNOTATED_FRAMES", "1") == "1"
+BATCH_MAX_SIZE = 8
+BATCH_MAX_WAIT = 0.05
+
+
+def annotate_frame(frame, box, identity, distance):
+    """Draws a labelled face box on a BGR frame in place and returns it."""
+    x1, y1, x2, y2 = [int(v) for v in box]
+    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+    cv2.putText(
+        frame,
+        f"{identity} ({distance:.2f})",
+        (x1, y1 - 10),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        0.5,
+        (0, 255, 0),
+        2,
+    )
+    return frame
+
+
+def resize_with_padding(image, target_size=(170, 240)):
+    """Fits an image into ``target_size`` (width, height) with black borders."""
+    h, w = image.shape[:2]
+    target_w, target_h = target_size
+    scale = min(target_w / w, target_h / h)
+    new_w, new_h = int(w * scale), int(h * scale)
+    resized = cv2.resize(image, (new_w, new_h))
+    padded = np.zeros((target_h, target_w, 3), dtype=np.uint8)
+    x_off, y_off = (target_w - new_w) // 2, (target_h - new_h) // 2
+    padded[y_off : y_off + new_h, x_off : x_off + new_w] = resized
+    return padded
 
 
 class FaceRecognitionService:
@@ -21,7 +64,9 @@ class FaceRecognitionService:
     def _initialize(self):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.mtcnn = MTCNN(keep_all=True, device=self.device)
-        self.resnet = InceptionResnetV1(pretrained="vggface2").eval().to(self.device)
+        self.embedder = create_embedder(
+            lambda: InceptionResnetV1(pretrained="vggface2"), self.device
+        )
 
         root_dir = os.path.abspath(
             os.path.join(os.path.dirname(__file__), "../../data")
@@ -29,6 +74,9 @@ class FaceRecognitionService:
         self.EMBEDDINGS_FILE = os.path.join(
             root_dir, "precomputed_data", "embeddings.npy"
         )
+        self.INDEX_FILE = os.path.join(
+            root_dir, "precomputed_data", f"gallery_{GALLERY_INDEX}.npz"
+        )
         self.RAW_PIC_DIR = os.path.join(root_dir, "RawPic")
         self.CAPTURED_PHOTO_DIR = os.path.join(root_dir, "captured_photo")
         self.FRED_PIC_DIR = os.path.join(root_dir, "FRedPic")
@@ -40,7 +88,10 @@ class FaceRecognitionService:
         if not os.path.exists(self.EMBEDDINGS_FILE):
             self._precompute_embeddings()
 
-        self.database_embeddings = self._load_or_generate_embeddings()
+        self.gallery_lock = threading.Lock()
+        self.gallery = self._load_or_generate_embeddings()
+        self.artifact_writer = ArtifactWriter(name="FR-Artifact-Writer")
+        self._start_inference_worker()
 
     def _load_or_generate_embeddings(self):
         if not os.path.exists(self.EMBEDDINGS_FILE):
@@ -49,13 +100,41 @@ class FaceRecognitionService:
         return self._load_embeddings()
 
     def _load_embeddings(self):
+        if os.path.exists(self.INDEX_FILE) and os.path.getmtime(
+            self.INDEX_FILE
+        ) >= os.path.getmtime(self.EMBEDDINGS_FILE):
+            gallery = load_index(self.INDEX_FILE)
+            grown = grow_index(gallery, GALLERY_INDEX)
+            if grown is not gallery:
+                grown.save(self.INDEX_FILE)
+            return grown
+
+        printt(f"Building {GALLERY_INDEX} gallery index...")
         embeddings = np.load(self.EMBEDDINGS_FILE, allow_pickle=True).item()
-        for name, emb in embeddings.items():
-            emb_tensor = torch.tensor(emb, dtype=torch.float).to(self.device)
-            if emb_tensor.dim() == 1:
-                emb_tensor = emb_tensor.unsqueeze(0)
-            embeddings[name] = emb_tensor
-        return embeddings
+        gallery = index_class(GALLERY_INDEX).from_dict(embeddings)
+        gallery.save(self.INDEX_FILE)
+        return gallery
+
+    def enroll(self, identity, embedding, persist=True):
+        """Adds or replaces one identity in the gallery without a rebuild."""
+        with self.gallery_lock:
+            self.gallery.add([identity], np.asarray(embedding).reshape(1, -1))
+            self._grow_gallery()
+            if persist:
+                self.gallery.save(self.INDEX_FILE)
+
+    def _grow_gallery(self):
+        grown = grow_index(self.gallery, GALLERY_INDEX)
+        if grown is not self.gallery:
+            printt(f"Gallery reached {len(grown)} faces, rebuilt as {grown.kind}")
+            self.gallery = grown
+
+    def unenroll(self, identity, persist=True):
+        """Removes one identity from the gallery without a rebuild."""
+        with self.gallery_lock:
+            self.gallery.remove([identity])
+            if persist:
+                self.gallery.save(self.INDEX_FILE)
 
     def _precompute_embeddings(self):
         root_dir = os.path.abspath(
@@ -87,107 +166,395 @@ class FaceRecognitionService:
             if face_cropped.dim() == 3:
                 face_cropped = face_cropped.unsqueeze(0)
 
-            face_cropped = face_cropped.to(self.device)
-
-            with torch.no_grad():
-                embedding = self.resnet(face_cropped)
-
-            embedding = embedding.squeeze(0).cpu().numpy()
-            database_embeddings[name] = embedding
+            database_embeddings[name] = self._embed(face_cropped)[0]
 
         os.makedirs(os.path.dirname(self.EMBEDDINGS_FILE), exist_ok=True)
         np.save(self.EMBEDDINGS_FILE, database_embeddings)
 
     def run_on_image(self, image_path: str):
-        frame = cv2.imread(image_path)
-        if frame is None:
-            raise ValueError(f"Could not read image at {image_path}")
-
-        timestamp = os.path.splitext(os.path.basename(image_path))[0]
-        img_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        boxes, _ = self.mtcnn.detect(img_pil)
-
-        results = []
-
-        if boxes is not None:
-            for box in boxes:
-                x1, y1, x2, y2 = box
-                w, h = x2 - x1, y2 - y1
-                if w < 80 or h < 100:
-                    continue
-
-                face_crop_pil = img_pil.crop((x1, y1, x2, y2)).resize((160, 160))
-                face_tensor = self.mtcnn(face_crop_pil)
-
-                if face_tensor is None:
+        return self.submit(image_path).result()
+
+    def run_on_array(self, frame, name=None):
+        """Recognizes an RGB frame held in memory, skipping the JPEG round-trip.
+
+        ``name`` is used in the artifact file names instead of an image path.
+        """
+        return self.submit(frame, name).result()
+
+    def run_on_images(self, image_paths):
+        """Recognizes several images; they share detection and embedding batches."""
+        futures = [self.submit(path) for path in image_paths]
+        return [future.result() for future in futures]
+
+    def run_on_frames(self, frames, name=None):
+        """Recognizes the student at the reader across a burst of RGB frames.
+
+        Frames may differ in resolution, e.g. low-resolution ring-buffer frames
+        plus the post-tap still. The faces of the best track are embedded in
+        order of quality until the vote is confident (see _vote_bursts); the
+        result adds its ``confidence`` and the ``frames`` embedded, and its
+        portrait is the best-quality face.
+        """
+        return self.submit(list(frames), name).result()
+
+    def warm_up(self):
+        """Runs detection and embedding once so the first scan pays no lazy init."""
+        self.mtcnn.detect(Image.new("RGB", (640, 480)))
+        self._embed(torch.zeros(1, 3, 160, 160))
+
+    def submit(self, image, name=None):
+        """Queues an image path, RGB array or burst of frames for inference.
+
+        Returns a Future resolving to the same result list as run_on_image.
+        Image files are deleted once processed; arrays are left untouched.
+        """
+        if name is None:
+            name = (
+                os.path.splitext(os.path.basename(image))[0]
+                if isinstance(image, str)
+                else f"capture_{int(time.time())}"
+            )
+        return self._enqueue("recognize", image, name)
+
+    def detect(self, frames):
+        """Queues face detection for a list of RGB frames.
+
+        Returns a Future resolving to each frame's face boxes, with faces
+        smaller than 80x100 px dropped. Frames of the same size share one
+        MTCNN call.
+        """
+        return self._enqueue("detect", list(frames))
+
+    def identify(self, frames, boxes):
+        """Queues embedding and matching of given faces in RGB frames.
+
+        ``boxes[k]`` holds the boxes to identify in ``frames[k]``. All faces
+        share one forward pass. Returns a Future resolving to an
+        ``(identity, distance)`` pair per box, in order.
+        """
+        return self._enqueue("identify", list(frames), boxes)
+
+    def _enqueue(self, op, *args):
+        future = Future()
+        self._requests.put((op, args, future))
+        return future
+
+    def _start_inference_worker(self):
+        """Starts the single thread that owns MTCNN and InceptionResnetV1."""
+        self._requests = queue.Queue()
+        self._inference_thread = threading.Thread(
+            target=self._inference_worker, name="FR-Inference", daemon=True
+        )
+        self._inference_thread.start()
+
+    def _inference_worker(self):
+        """Collects up to BATCH_MAX_SIZE requests for at most BATCH_MAX_WAIT s.
+
+        Recognition requests are run as one batch; detect and identify
+        requests each run on their own.
+        """
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + BATCH_MAX_WAIT
+            while len(batch) < BATCH_MAX_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            batch = [req for req in batch if req[2].set_running_or_notify_cancel()]
+            scans = []
+            for op, args, future in batch:
+                if op == "recognize":
+                    scans.append((*args, future))
                     continue
+                try:
+                    future.set_result(getattr(self, f"_run_{op}")(*args))
+                except Exception as e:
+                    future.set_exception(e)
+            if not scans:
+                continue
+            try:
+                self._run_batch(scans)
+            except Exception as e:
+                printt(f"Error in face recognition batch: {e}")
+                for _, _, future in scans:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _run_batch(self, batch):
+        """Runs detection, embedding and matching for (image, name, future) items.
+
+        An item's image may be a list of frames (a burst); only the face of
+        the student at the reader is reported for it.
+        """
+        requests = []
+        for image, name, future in batch:
+            try:
+                frames = image if isinstance(image, list) else [image]
+                candidates = [self._load_image(frame) for frame in frames]
+            except ValueError as e:
+                future.set_exception(e)
+                continue
+            requests.append((image, name, future, candidates))
+
+        images, scales = [], []
+        for *_, candidates in requests:
+            # Scale the minimum face size to low-resolution burst frames.
+            widest = max(img_pil.width for _, img_pil in candidates)
+            for _, img_pil in candidates:
+                images.append(img_pil)
+                scales.append(img_pil.width / widest)
+        with metrics.timer("detect"):
+            detections = iter(self._detect_faces_batch(images, scales))
+
+        selected, bursts = [], {}
+        for k, (*_, candidates) in enumerate(requests):
+            found = [next(detections) for _ in candidates]
+            if len(candidates) == 1:
+                selected.append((candidates[0], found[0], None, None))
+            else:
+                selected.append(None)
+                bursts[k] = (candidates, found)
+        for k, voted in zip(bursts, self._vote_bursts(list(bursts.values()))):
+            selected[k] = voted
+
+        # Voted bursts are embedded already; the rest share one forward pass.
+        face_tensors = [
+            detection[3]
+            for _, detection, _, vote in selected
+            if vote is None and detection[3] is not None
+        ]
+        with metrics.timer("embed"):
+            embeddings = self._embed(torch.cat(face_tensors) if face_tensors else None)
+        with metrics.timer("compare"):
+            matches = self._compare_batch(embeddings) if len(embeddings) else []
+
+        offset = 0
+        for (image, name, future, _), selection in zip(requests, selected):
+            (frame, img_pil), detection, match, vote = selection
+            boxes = detection[0]
+            if frame is None:
+                frame = cv2.cvtColor(np.asarray(img_pil), cv2.COLOR_RGB2BGR)
+            if vote is None:
+                face_matches = matches[offset : offset + len(boxes)]
+                offset += len(boxes)
+            else:
+                face_matches = [match]
+            results = self._build_results(frame, img_pil, boxes, face_matches, name)
+            if vote is not None:
+                results[0]["confidence"] = vote.confidence
+                results[0]["frames"] = vote.frames
+            if isinstance(image, str):
+                os.remove(image)
+            future.set_result(results)
+
+    def _run_detect(self, frames):
+        images = [Image.fromarray(frame) for frame in frames]
+        return [boxes for boxes, *_ in self._detect_faces_batch(images, extract=False)]
+
+    def _run_identify(self, frames, boxes):
+        faces = [
+            self.mtcnn.extract(Image.fromarray(frame), np.asarray(frame_boxes), None)
+            for frame, frame_boxes in zip(frames, boxes)
+            if len(frame_boxes)
+        ]
+        embeddings = self._embed(torch.cat(faces) if faces else None)
+        if not len(embeddings):
+            return []
+        return [
+            (identity, distance)
+            for identity, distance, _ in self._compare_batch(embeddings)
+        ]
+
+    def _vote_bursts(self, bursts):
+        """Embeds each burst's faces in quality order until its vote is confident.
+
+        ``bursts`` holds ``(candidates, detections)`` per request; plan_burst
+        picks the track of the student at the reader. Each round embeds the
+        next face of every unfinished burst in one forward pass. A burst is
+        finished once its IdentityVote reaches RECOGNITION_CONFIDENCE, after
+        RECOGNITION_MAX_FRAMES faces or when its track has no faces left.
+        Returns ``(candidate, detection, match, vote)`` per burst: the
+        detection holds the best-quality face and the match is the mean
+        embedding's. A burst without faces gets an empty detection.
+        """
+        plans = [plan_burst(candidates, found) for candidates, found in bursts]
+        votes = [IdentityVote() for _ in bursts]
+        voted = []
+        for (candidates, found), plan in zip(bursts, plans):
+            if not plan:
+                voted.append((candidates[-1], ([], [], [], None), None, None))
+                continue
+            _, i, j = plan[0]
+            boxes, probs, landmarks, faces = found[i]
+            detection = (
+                boxes[j : j + 1],
+                probs[j : j + 1],
+                landmarks[j : j + 1],
+                faces[j : j + 1],
+            )
+            voted.append((candidates[i], detection, None, None))
+
+        active = [k for k, plan in enumerate(plans) if plan]
+        while active:
+            picks = [(k, plans[k].pop(0)) for k in active]
+            faces = [bursts[k][1][i][3][j : j + 1] for k, (_, i, j) in picks]
+            with metrics.timer("embed"):
+                embeddings = self._embed(torch.cat(faces))
+            with metrics.timer("compare"):
+                matches = self._compare_batch(embeddings)
+            for (k, (quality, _, _)), embedding, match in zip(
+                picks, embeddings, matches
+            ):
+                votes[k].add(embedding, match[0], quality)
+            means = np.stack([votes[k].mean_embedding() for k, _ in picks])
+            for (k, _), match in zip(picks, self._compare_batch(means)):
+                votes[k].decide(match)
+                voted[k] = voted[k][:2] + (match, votes[k])
+            active = [k for k, _ in picks if not votes[k].done(plans[k])]
+        return voted
+
+    def _load_image(self, image):
+        """Returns ``(bgr_frame_or_None, rgb_pil)`` for an image path or RGB array."""
+        if isinstance(image, str):
+            frame = cv2.imread(image)
+            if frame is None:
+                raise ValueError(f"Could not read image at {image}")
+            return frame, Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        return None, Image.fromarray(image)
+
+    def _build_results(self, frame, img_pil, boxes, matches, timestamp):
+        """Assembles the result dicts and queues their artifacts for writing.
+
+        Only the small portrait is encoded here, because it is uploaded with
+        the attendance record (``croppedImage``). Annotated frames, portrait
+        files and the face log are written later by the artifact writer, so
+        ``annotatedPath`` and ``croppedPath`` may appear on disk after return.
+        ``annotatedPath`` is None when annotated frames are disabled.
+        """
+        results = []
 
-                if face_tensor.dim() == 3:
-                    face_tensor = face_tensor.unsqueeze(0)
-
-                face_tensor = face_tensor.to(self.device)
+        for box, (identity, distance, runner_up) in zip(boxes, matches):
+            x1, y1, x2, y2 = box
+            face_crop_pil = img_pil.crop((x1, y1, x2, y2)).resize((160, 160))
 
-                with torch.no_grad():
-                    embedding = self.resnet(face_tensor)
+            printt(f"Identified Photo as {identity}")
 
-                identity, distance = self._compare(embedding)
+            annotated_path = None
+            if SAVE_ANNOTATED_FRAMES:
+                annotated_path = self._save_annotated_frame(
+                    frame, box, identity, distance, timestamp
+                )
+            cropped_path, cropped_image = self._save_cropped_face(
+                face_crop_pil, identity, distance, timestamp
+            )
+
+            self._log(identity, distance, timestamp)
+
+            results.append(
+                {
+                    "identity": identity,
+                    "distance": distance,
+                    "runnerUpDistance": runner_up,
+                    "annotatedPath": annotated_path,
+                    "croppedPath": cropped_path,
+                    "croppedImage": cropped_image,
+                }
+            )
 
-                printt(f"Identified Photo as {identity}")
+        return results
 
-                annotated = self._annotate_frame(frame.copy(), box, identity, distance)
-                annotated_path = self._save_annotated_frame(
-                    annotated, identity, distance, timestamp
+    def _detect_faces_batch(self, images, scales=None, extract=True):
+        """Runs _detect_faces for several images, batching MTCNN per frame size.
+
+        ``scales`` shrinks the minimum face size per image (default 1.0).
+        Without ``extract`` no face tensors are cut (``faces`` is None).
+        """
+        scales = scales or [1.0] * len(images)
+        by_size = {}
+        for i, img_pil in enumerate(images):
+            by_size.setdefault(img_pil.size, []).append(i)
+
+        detections = [None] * len(images)
+        for indices in by_size.values():
+            group = [images[i] for i in indices]
+            if len(group) == 1:
+                detections[indices[0]] = self._detect_faces(
+                    group[0], scales[indices[0]], extract
                 )
-                cropped_path = self._save_cropped_face(
-                    face_crop_pil, identity, distance, timestamp
+                continue
+            boxes, probs, landmarks = self.mtcnn.detect(group, landmarks=True)
+            for i, img_pil, b, p, l in zip(indices, group, boxes, probs, landmarks):
+                detections[i] = self._filter_and_extract(
+                    img_pil, b, p, l, scales[i], extract
                 )
+        return detections
+
+    def _detect_faces(self, img_pil, scale=1.0, extract=True):
+        """Runs the MTCNN cascade once and extracts 160x160 face tensors.
+
+        The face tensors are cut from the detection boxes of that single pass,
+        so the cascade never runs again on the crops. Faces smaller than
+        80x100 px are dropped. Returns ``(boxes, probs, landmarks, faces)``
+        where ``faces`` is an (n, 3, 160, 160) tensor, or None when empty.
+        """
+        boxes, probs, landmarks = self.mtcnn.detect(img_pil, landmarks=True)
+        return self._filter_and_extract(
+            img_pil, boxes, probs, landmarks, scale, extract
+        )
 
-                self._log(identity, distance, timestamp)
+    def _filter_and_extract(
+        self, img_pil, boxes, probs, landmarks, scale=1.0, extract=True
+    ):
+        if boxes is None:
+            return [], [], [], None
 
-                results.append(
-                    {
-                        "identity": identity,
-                        "distance": distance,
-                        "annotatedPath": annotated_path,
-                        "croppedPath": cropped_path,
-                    }
-                )
+        widths, heights = boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]
+        keep = (widths >= 80 * scale) & (heights >= 100 * scale)
+        if not keep.any():
+            return [], [], [], None
 
-        os.remove(image_path)
-        return results
+        boxes, probs, landmarks = boxes[keep], probs[keep], landmarks[keep]
+        faces = self.mtcnn.extract(img_pil, boxes, None) if extract else None
+        return boxes, probs, landmarks, faces
+
+    def _embed(self, face_tensors):
+        """Embeds a batch of face tensors with one forward pass of the embedder."""
+        if face_tensors is None or len(face_tensors) == 0:
+            return np.empty((0, 512), dtype=np.float32)
+        return self.embedder(face_tensors)
 
     def _compare(self, embedding):
-        min_dist = float("inf")
-        identity = "Unknown"
-        for name, db_emb in self.database_embeddings.items():
-            dist = torch.norm(embedding - db_emb, p=2).item()
-            if dist < min_dist:
-                min_dist = dist
-                identity = name if dist < 0.9 else "Unknown"
-        return identity, min_dist
-
-    def _annotate_frame(self, frame, box, identity, distance):
-        x1, y1, x2, y2 = [int(v) for v in box]
-        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-        cv2.putText(
-            frame,
-            f"{identity} ({distance:.2f})",
-            (x1, y1 - 10),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.5,
-            (0, 255, 0),
-            2,
-        )
-        return frame
+        identity, distance, _ = self._compare_batch(embedding)[0]
+        return identity, distance
+
+    def _compare_batch(self, embeddings):
+        """Matches all embeddings of a frame against the gallery in one call.
 
-    def _save_annotated_frame(self, frame, identity, distance, ts):
+        Returns ``(identity, distance, runner_up_distance)`` per embedding.
+        """
+        if isinstance(embeddings, torch.Tensor):
+            embeddings = embeddings.detach().cpu().numpy()
+        with self.gallery_lock:
+            return self.gallery.match(np.asarray(embeddings))
+
+    def _save_annotated_frame(self, frame, box, identity, distance, ts):
         path = os.path.join(self.FRED_PIC_DIR, f"{identity} ({distance:.2f})_{ts}.jpg")
-        cv2.imwrite(path, frame)
+        # Only the shrunk copy waits in the queue, not the full-resolution frame.
+        small = self.artifact_writer.shrink(frame)
+        box = [v * small.shape[1] / frame.shape[1] for v in box]
+        self.artifact_writer.write_image(
+            path, lambda: annotate_frame(small, box, identity, distance)
+        )
         return path
 
     def _save_cropped_face(self, face_pil, identity, distance, ts):
         face_np = cv2.cvtColor(np.array(face_pil), cv2.COLOR_RGB2BGR)
-        resized = self._resize_with_padding(face_np)
+        resized = resize_with_padding(face_np)
         cv2.putText(
             resized,
             f"{identity} ({distance:.2f})",
@@ -203,21 +570,10 @@ class FaceRecognitionService:
         path = os.path.join(
             self.CAPTURED_PHOTO_DIR, f"{identity} ({distance:.2f})_{ts}.jpg"
         )
-        cv2.imwrite(path, resized)
-        return path
-
-    def _resize_with_padding(self, image, target_size=(170, 240)):
-        h, w = image.shape[:2]
-        target_w, target_h = target_size
-        scale = min(target_w / w, target_h / h)
-        new_w, new_h = int(w * scale), int(h * scale)
-        resized = cv2.resize(image, (new_w, new_h))
-        padded = np.zeros((target_h, target_w, 3), dtype=np.uint8)
-        x_off, y_off = (target_w - new_w) // 2, (target_h - new_h) // 2
-        padded[y_off : y_off + new_h, x_off : x_off + new_w] = resized
-        return padded
+        encoded = self.artifact_writer.encode_jpeg(resized)
+        self.artifact_writer.write_bytes(path, encoded)
+        return path, encoded
 
     def _log(self, identity, distance, ts):
         entry = f"{identity} ({distance:.2f}), {ts}\n"
-        with open(self.LOG_FILE, "a") as f:
-            f.write(entry)
+        self.artifact_writer.append_text(self.LOG_FILE, entry)
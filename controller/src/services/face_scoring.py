@@ -0,0 +1,127 @@
+import os
+
+import cv2
+import numpy as np
+
+from src.services.gallery import MATCH_THRESHOLD
+from src.services.tracking import IoUTracker
+
+RECOGNITION_CONFIDENCE = float(os.getenv("RECOGNITION_CONFIDENCE", "0.25"))
+RECOGNITION_MAX_FRAMES = int(os.getenv("RECOGNITION_MAX_FRAMES", "5"))
+# Laplacian variance of a 80x100 face crop that scores 0.5 for sharpness.
+BLUR_REFERENCE = 100.0
+# Share of the frame a face must cover to score 1 for size.
+FULL_FACE_FRACTION = 0.25
+
+
+def face_quality(img_pil, box, prob, landmarks=None):
+    """Scores how useful a detected face is for recognition, from 0 to 1.
+
+    The product of the detection probability, the box's share of the frame
+    (full marks from FULL_FACE_FRACTION), sharpness from the Laplacian
+    variance of the crop, and a frontal-pose score from how far the nose
+    sits from the middle of the eyes. Sharpness and pose are floored at 0.1
+    so that one poor measure alone does not rule a face out.
+    """
+    x1, y1, x2, y2 = (float(v) for v in box)
+    area = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    size = min(1.0, area / (img_pil.width * img_pil.height * FULL_FACE_FRACTION))
+
+    gray = np.asarray(img_pil.crop((x1, y1, x2, y2)).convert("L").resize((80, 100)))
+    variance = cv2.Laplacian(gray, cv2.CV_64F).var()
+    sharpness = max(0.1, variance / (variance + BLUR_REFERENCE))
+
+    pose = 1.0
+    if landmarks is not None:
+        left_eye, right_eye, nose = np.asarray(landmarks, dtype=float)[:3]
+        eye_distance = np.linalg.norm(right_eye - left_eye)
+        if eye_distance >= 1:
+            yaw = abs(nose[0] - (left_eye[0] + right_eye[0]) / 2) / eye_distance
+            pose = max(0.1, 1.0 - yaw)
+
+    return float(prob) * size * sharpness * pose
+
+
+def plan_burst(candidates, detections):
+    """Orders a burst's faces for embedding, best quality first.
+
+    ``candidates`` are ``(frame, rgb_pil)`` pairs and ``detections`` their
+    ``(boxes, probs, landmarks, faces)``. Faces are grouped into tracks by
+    IoU of their boxes relative to the frame, so frames of any resolution
+    can be compared, and only the track with the highest total quality is
+    kept: the student at the reader rather than someone passing behind.
+    Returns ``(quality, frame_index, face_index)`` tuples.
+    """
+    tracker = IoUTracker(limit=0)
+    faces = []
+    for i, ((_, img_pil), (boxes, probs, landmarks, _)) in enumerate(
+        zip(candidates, detections)
+    ):
+        w, h = img_pil.size
+        relative = [np.asarray(box, dtype=float) / (w, h, w, h) for box in boxes]
+        for j, track in enumerate(tracker.update(relative, i)):
+            quality = face_quality(img_pil, boxes[j], probs[j], landmarks[j])
+            faces.append((quality, track.id, i, j))
+    if not faces:
+        return []
+
+    totals = {}
+    for quality, track_id, _, _ in faces:
+        totals[track_id] = totals.get(track_id, 0.0) + quality
+    lead = max(totals, key=totals.get)
+    return sorted(((q, i, j) for q, t, i, j in faces if t == lead), reverse=True)
+
+
+class IdentityVote:
+    """Quality-weighted evidence about one face track across frames.
+
+    Keeps the quality-weighted mean of the track's embeddings and a
+    quality-weighted vote over the identity each frame matched. The track
+    is judged by matching the mean embedding, which averages out noise that
+    pushes single frames past the match threshold. Its confidence is the
+    vote share of that identity times how far its distance is below
+    MATCH_THRESHOLD (1 at distance 0, 0 at the threshold).
+    """
+
+    def __init__(self):
+        self.total = None
+        self.weight = 0.0
+        self.votes = {}
+        self.frames = 0
+        self.confidence = 0.0
+
+    def add(self, embedding, identity, quality):
+        quality = max(float(quality), 1e-3)
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        if self.total is None:
+            self.total = np.zeros_like(embedding)
+        self.total += quality * embedding
+        self.weight += quality
+        self.votes[identity] = self.votes.get(identity, 0.0) + quality
+        self.frames += 1
+
+    def mean_embedding(self):
+        mean = self.total / self.weight
+        norm = np.linalg.norm(mean)
+        return mean / norm if norm else mean
+
+    def decide(self, match):
+        """Scores the mean embedding's ``(identity, distance, runner_up)``."""
+        identity, distance, _ = match
+        if identity == "Unknown":
+            self.confidence = 0.0
+        else:
+            share = self.votes.get(identity, 0.0) / self.weight
+            self.confidence = share * max(0.0, 1.0 - distance / MATCH_THRESHOLD)
+        return self.confidence
+
+    def done(
+        self,
+        remaining,
+        threshold=RECOGNITION_CONFIDENCE,
+        max_frames=RECOGNITION_MAX_FRAMES,
+    ):
+        """True once confident, out of frames, or at the frame budget."""
+        return (
+            self.confidence >= threshold or not remaining or self.frames >= max_frames
+        )
@@ -0,0 +1,515 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+EMBEDDING_DIM = 512
+MATCH_THRESHOLD = 0.9
+
+
+class GalleryIndex(ABC):
+    """Common interface of the face gallery backends.
+
+    A backend maps identities to embeddings and answers nearest-neighbour
+    queries for a whole batch of faces at once. Identities can be added and
+    removed incrementally and the index can be persisted to a ``.npz`` file.
+    """
+
+    kind = None
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    @classmethod
+    def from_dict(cls, embeddings, **kwargs):
+        """Builds an index from the ``{identity: embedding}`` dict in embeddings.npy."""
+        ids = list(embeddings.keys())
+        rows = [np.asarray(embeddings[i], dtype=np.float32).reshape(-1) for i in ids]
+        index = cls(**kwargs)
+        if rows:
+            index.build(ids, np.stack(rows))
+        return index
+
+    def build(self, ids, vectors):
+        self.add(ids, vectors)
+
+    @abstractmethod
+    def __len__(self):
+        pass
+
+    @abstractmethod
+    def __contains__(self, identity):
+        pass
+
+    @abstractmethod
+    def add(self, ids, vectors):
+        pass
+
+    @abstractmethod
+    def remove(self, ids):
+        pass
+
+    @abstractmethod
+    def search(self, queries, k=2):
+        """Returns the ``k`` nearest distances and identities for every query.
+
+        Both arrays have shape (Q, k) and are sorted by ascending distance.
+        Missing neighbours are padded with an ``inf`` distance and "" identity.
+        """
+
+    @abstractmethod
+    def save(self, path):
+        pass
+
+    @classmethod
+    @abstractmethod
+    def load(cls, path):
+        pass
+
+    def match(self, queries, threshold=MATCH_THRESHOLD):
+        """Matches every query embedding against the gallery in one call.
+
+        Returns a list of ``(identity, distance, runner_up_distance)`` tuples.
+        ``identity`` is "Unknown" when the best distance is not below the
+        threshold; ``runner_up_distance`` is ``inf`` when fewer than two
+        identities are enrolled, so callers can reject ambiguous matches.
+        """
+        dist, ids = self.search(queries, k=2)
+        matches = []
+        for row_dist, row_ids in zip(dist, ids):
+            best, runner_up = float(row_dist[0]), float(row_dist[1])
+            identity = str(row_ids[0]) if best < threshold else "Unknown"
+            matches.append((identity, best, runner_up))
+        return matches
+
+    def _as_queries(self, queries):
+        return np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+
+    @staticmethod
+    def _pad(dist, ids, k):
+        """Pads (Q, n) results with fewer than ``k`` columns up to (Q, k)."""
+        missing = k - dist.shape[1]
+        if missing <= 0:
+            return dist, ids
+        dist = np.pad(dist, ((0, 0), (0, missing)), constant_values=np.inf)
+        ids = np.pad(ids, ((0, 0), (0, missing)), constant_values="")
+        return dist, ids
+
+
+class EmbeddingGallery(GalleryIndex):
+    """Exact (brute-force) backend holding one contiguous (N, D) matrix.
+
+    Row ``i`` of ``matrix`` belongs to ``ids[i]``. Matching a whole frame is a
+    single matrix product instead of a Python loop over every student.
+    """
+
+    kind = "brute"
+
+    def __init__(self, ids=None, matrix=None, dim=EMBEDDING_DIM):
+        super().__init__(dim)
+        self._size = 0
+        self._ids = np.empty(0, dtype=object)
+        self._matrix = np.empty((0, dim), dtype=np.float32)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+        self._rows = {}
+        if ids is not None:
+            self.add(ids, matrix)
+
+    @property
+    def ids(self):
+        return self._ids[: self._size]
+
+    @property
+    def matrix(self):
+        return self._matrix[: self._size]
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, identity):
+        return identity in self._rows
+
+    def add(self, ids, vectors):
+        """Adds identities, replacing the embedding of any that already exist."""
+        ids = [str(i) for i in ids]
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(ids) != len(vectors):
+            raise ValueError("ids and vectors must have the same length")
+
+        for identity, vector in zip(ids, vectors):
+            row = self._rows.get(identity)
+            if row is None:
+                self._reserve(self._size + 1)
+                row = self._size
+                self._size += 1
+                self._rows[identity] = row
+                self._ids[row] = identity
+            self._matrix[row] = vector
+            self._sq_norms[row] = vector @ vector
+
+    def remove(self, ids):
+        """Removes identities by moving the last row into the freed slot."""
+        for identity in ids:
+            row = self._rows.pop(str(identity), None)
+            if row is None:
+                continue
+            last = self._size - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._sq_norms[row] = self._sq_norms[last]
+                self._ids[row] = self._ids[last]
+                self._rows[self._ids[row]] = row
+            self._ids[last] = None
+            self._size = last
+
+    def _reserve(self, size):
+        capacity = len(self._matrix)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 16)
+        matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        matrix[: self._size] = self.matrix
+        sq_norms = np.empty(capacity, dtype=np.float32)
+        sq_norms[: self._size] = self._sq_norms[: self._size]
+        ids = np.empty(capacity, dtype=object)
+        ids[: self._size] = self.ids
+        self._matrix, self._sq_norms, self._ids = matrix, sq_norms, ids
+
+    def search(self, queries, k=2):
+        queries = self._as_queries(queries)
+        n = min(k, self._size)
+        if n == 0:
+            empty = np.empty((len(queries), 0))
+            return self._pad(empty, empty.astype(object), k)
+
+        q_sq = np.einsum("ij,ij->i", queries, queries)
+        sq_dist = (
+            q_sq[:, None]
+            + self._sq_norms[None, : self._size]
+            - 2.0 * queries @ self.matrix.T
+        )
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+
+        if n < self._size:
+            idx = np.argpartition(sq_dist, n - 1, axis=1)[:, :n]
+        else:
+            idx = np.broadcast_to(np.arange(self._size), sq_dist.shape)
+        part = np.take_along_axis(sq_dist, idx, axis=1)
+        order = np.argsort(part, axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+        dist = np.sqrt(np.take_along_axis(part, order, axis=1))
+        return self._pad(dist, self.ids[idx], k)
+
+    def save(self, path):
+        np.savez(
+            path,
+            kind=self.kind,
+            ids=np.array(list(self.ids), dtype=str),
+            matrix=self.matrix,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(list(data["ids"]), data["matrix"], dim=data["matrix"].shape[1])
+
+
+class IVFPQIndex(GalleryIndex):
+    """Approximate backend: inverted file lists with product-quantized residuals.
+
+    Embeddings are assigned to the nearest of ``n_lists`` coarse centroids and
+    only the residual is stored, as ``n_subvectors`` one-byte codes (64 bytes
+    per face instead of 2 KiB of float32). A query scans the ``n_probe``
+    closest lists with per-list distance lookup tables. Adding or removing an
+    identity only touches its list, so the index never has to be retrained.
+    ``n_lists`` defaults to about ``4 * sqrt(N)`` of the training set.
+
+    Training needs at least MIN_TRAIN_SIZE vectors and keeps MIN_LIST_SIZE
+    of them per list. With fewer, each identity gets its own centroid, the
+    residual codebooks are fitted to near-zero residuals and faces enrolled
+    later cannot be encoded. ``from_dict`` builds the exact backend instead.
+    """
+
+    kind = "ivfpq"
+    MIN_TRAIN_SIZE = 1000
+    MIN_LIST_SIZE = 39
+
+    def __init__(self, dim=EMBEDDING_DIM, n_lists=None, n_subvectors=64, n_probe=8):
+        super().__init__(dim)
+        if dim % n_subvectors:
+            raise ValueError("dim must be divisible by n_subvectors")
+        self.n_lists = n_lists
+        self.n_subvectors = n_subvectors
+        self.n_probe = n_probe
+        self.sub_dim = dim // n_subvectors
+        self.coarse = None
+        self.codebooks = None
+        self._list_codes = []
+        self._list_ids = []
+        self._where = {}
+
+    @property
+    def is_trained(self):
+        return self.coarse is not None
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, identity):
+        return identity in self._where
+
+    @classmethod
+    def from_dict(cls, embeddings, **kwargs):
+        """Builds an index, or an exact gallery if there is too little to train on."""
+        if len(embeddings) < cls.MIN_TRAIN_SIZE:
+            return EmbeddingGallery.from_dict(
+                embeddings, dim=kwargs.get("dim", EMBEDDING_DIM)
+            )
+        return super().from_dict(embeddings, **kwargs)
+
+    def build(self, ids, vectors):
+        self.train(vectors)
+        self.add(ids, vectors)
+
+    def train(self, vectors, iterations=10, max_samples=20_000, seed=0):
+        """Learns the coarse centroids and residual codebooks from ``vectors``."""
+        rng = np.random.default_rng(seed)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(vectors) < self.MIN_TRAIN_SIZE:
+            raise ValueError(
+                f"IVFPQIndex needs at least {self.MIN_TRAIN_SIZE} training "
+                f"vectors, got {len(vectors)}"
+            )
+        if len(vectors) > max_samples:
+            vectors = vectors[rng.choice(len(vectors), max_samples, replace=False)]
+
+        # Roughly 4 * sqrt(N) lists keeps every list short at campus scale.
+        n_lists = self.n_lists or int(4 * np.sqrt(len(vectors)))
+        self.n_lists = max(1, min(n_lists, len(vectors) // self.MIN_LIST_SIZE))
+        self.coarse = _kmeans(vectors, self.n_lists, iterations, rng)
+        residuals = vectors - self.coarse[_nearest(vectors, self.coarse)]
+
+        n_codes = min(256, len(vectors))
+        sub = residuals.reshape(len(vectors), self.n_subvectors, self.sub_dim)
+        self.codebooks = np.stack(
+            [
+                _kmeans(sub[:, m], n_codes, iterations, rng)
+                for m in range(self.n_subvectors)
+            ]
+        )
+        self._prepare()
+        self._list_codes = [
+            np.empty((0, self.n_subvectors), dtype=np.uint8)
+            for _ in range(self.n_lists)
+        ]
+        self._list_ids = [np.empty(0, dtype=object) for _ in range(self.n_lists)]
+        self._where = {}
+
+    def add(self, ids, vectors):
+        """Encodes and appends identities; existing identities are re-encoded."""
+        if not self.is_trained:
+            raise RuntimeError("IVFPQIndex must be trained before adding vectors")
+        ids = [str(i) for i in ids]
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(ids) != len(vectors):
+            raise ValueError("ids and vectors must have the same length")
+        self.remove([i for i in ids if i in self._where])
+
+        lists = _nearest(vectors, self.coarse)
+        codes = self._encode(vectors - self.coarse[lists])
+        ids = np.array(ids, dtype=object)
+        order = np.argsort(lists, kind="stable")
+        bounds = np.flatnonzero(np.diff(lists[order])) + 1
+        for rows in np.split(order, bounds):
+            lst = int(lists[rows[0]])
+            self._list_codes[lst] = np.concatenate([self._list_codes[lst], codes[rows]])
+            self._list_ids[lst] = np.concatenate([self._list_ids[lst], ids[rows]])
+            self._where.update(dict.fromkeys(ids[rows], lst))
+
+    def remove(self, ids):
+        by_list = {}
+        for identity in ids:
+            lst = self._where.pop(str(identity), None)
+            if lst is not None:
+                by_list.setdefault(lst, set()).add(str(identity))
+        for lst, removed in by_list.items():
+            keep = np.array([i not in removed for i in self._list_ids[lst]], dtype=bool)
+            self._list_codes[lst] = self._list_codes[lst][keep]
+            self._list_ids[lst] = self._list_ids[lst][keep]
+
+    def _encode(self, residuals):
+        sub = residuals.reshape(len(residuals), self.n_subvectors, self.sub_dim)
+        codes = np.empty((len(residuals), self.n_subvectors), dtype=np.uint8)
+        for m in range(self.n_subvectors):
+            codes[:, m] = _nearest(sub[:, m], self.codebooks[m])
+        return codes
+
+    def search(self, queries, k=2):
+        queries = self._as_queries(queries)
+        dists, ids = [], []
+        for query in queries:
+            dist, found = self._search_one(query, k)
+            dists.append(dist)
+            ids.append(found)
+        if not queries.size:
+            return np.empty((0, k)), np.empty((0, k), dtype=object)
+        return np.concatenate(dists), np.concatenate(ids)
+
+    def _search_one(self, query, k):
+        if not self.is_trained or not self._where:
+            return self._pad(np.empty((1, 0)), np.empty((1, 0), dtype=object), k)
+
+        coarse_sq = self._coarse_sq - 2.0 * (self.coarse @ query)
+        n_probe = min(self.n_probe, self.n_lists)
+        probe = np.argpartition(coarse_sq, n_probe - 1)[:n_probe]
+        probe = [lst for lst in probe if len(self._list_ids[lst])]
+        if not probe:
+            return self._pad(np.empty((1, 0)), np.empty((1, 0), dtype=object), k)
+
+        # Lookup table of squared distances from each probed residual's
+        # sub-vectors to every codeword, laid out as (M, P, n_codes).
+        residual = (query - self.coarse[probe]).reshape(
+            len(probe), self.n_subvectors, self.sub_dim
+        )
+        residual = residual.transpose(1, 0, 2)
+        tables = np.matmul(residual, self._cb_t)
+        tables *= -2.0
+        tables += np.einsum("mpd,mpd->mp", residual, residual)[:, :, None]
+        tables += self._cb_sq[:, None, :]
+        n_codes = tables.shape[2]
+
+        codes = np.concatenate([self._list_codes[lst] for lst in probe])
+        list_pos = np.repeat(
+            np.arange(len(probe)), [len(self._list_ids[lst]) for lst in probe]
+        )
+        flat = np.arange(self.n_subvectors) * len(probe) + list_pos[:, None]
+        flat = flat * n_codes + codes
+        sq_dist = np.maximum(tables.reshape(-1)[flat].sum(axis=1), 0.0)
+        found = np.concatenate([self._list_ids[lst] for lst in probe])
+
+        n = min(k, len(sq_dist))
+        top = np.argpartition(sq_dist, n - 1)[:n]
+        top = top[np.argsort(sq_dist[top])]
+        return self._pad(np.sqrt(sq_dist[top])[None], found[top][None], k)
+
+    def _prepare(self):
+        """Caches norms and the transposed codebooks used by every search."""
+        self._coarse_sq = np.einsum("ij,ij->i", self.coarse, self.coarse)
+        self._cb_sq = np.einsum("mcd,mcd->mc", self.codebooks, self.codebooks)
+        self._cb_t = np.ascontiguousarray(self.codebooks.transpose(0, 2, 1))
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the codes, centroids and codebooks."""
+        total = self.coarse.nbytes + self.codebooks.nbytes if self.is_trained else 0
+        return total + sum(c.nbytes for c in self._list_codes)
+
+    def save(self, path):
+        ids = [i for lst in self._list_ids for i in lst]
+        # An untrained index is saved with empty centroids and codebooks.
+        coarse = self.coarse
+        codebooks = self.codebooks
+        if not self.is_trained:
+            coarse = np.empty((0, self.dim), dtype=np.float32)
+            codebooks = np.empty((self.n_subvectors, 0, self.sub_dim), np.float32)
+        np.savez(
+            path,
+            kind=self.kind,
+            params=np.array(
+                [self.dim, self.n_lists or 0, self.n_subvectors, self.n_probe]
+            ),
+            coarse=coarse,
+            codebooks=codebooks,
+            ids=np.array(ids, dtype=str),
+            codes=np.concatenate(
+                [np.empty((0, self.n_subvectors), dtype=np.uint8), *self._list_codes]
+            ),
+            lists=np.array([self._where[i] for i in ids], dtype=np.int32),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            dim, n_lists, n_subvectors, n_probe = (int(v) for v in data["params"])
+            index = cls(dim, n_lists or None, n_subvectors, n_probe)
+            if not len(data["coarse"]):
+                return index
+            index.coarse = data["coarse"]
+            index.codebooks = data["codebooks"]
+            ids, codes, lists = data["ids"], data["codes"], data["lists"]
+
+        index._prepare()
+        index._list_codes = [codes[lists == lst] for lst in range(n_lists)]
+        index._list_ids = [ids[lists == lst].astype(object) for lst in range(n_lists)]
+        index._where = {str(i): int(lst) for i, lst in zip(ids, lists)}
+        return index
+
+
+GALLERY_INDEXES = {cls.kind: cls for cls in (EmbeddingGallery, IVFPQIndex)}
+
+
+def index_class(kind):
+    """Returns the gallery backend for ``kind`` ("brute" or "ivfpq")."""
+    try:
+        return GALLERY_INDEXES[kind]
+    except KeyError:
+        allowed = ", ".join(sorted(GALLERY_INDEXES))
+        raise ValueError(
+            f"Unknown gallery index {kind!r}; expected one of: {allowed}"
+        ) from None
+
+
+def create_index(kind, **kwargs):
+    """Returns an empty gallery index of the given kind ("brute" or "ivfpq")."""
+    return index_class(kind)(**kwargs)
+
+
+def grow_index(gallery, kind):
+    """Rebuilds an exact gallery as ``kind`` once it has enough faces to train.
+
+    ``IVFPQIndex.from_dict`` stands in an exact gallery for one too small to
+    train on; this swaps it for the real index after enrollment reaches
+    MIN_TRAIN_SIZE. Any other gallery is returned unchanged.
+    """
+    cls = index_class(kind)
+    min_size = getattr(cls, "MIN_TRAIN_SIZE", None)
+    if (
+        isinstance(gallery, cls)
+        or not isinstance(gallery, EmbeddingGallery)
+        or min_size is None
+        or len(gallery) < min_size
+    ):
+        return gallery
+    return cls.from_dict(dict(zip(gallery.ids, gallery.matrix)), dim=gallery.dim)
+
+
+def load_index(path):
+    """Loads a gallery index saved with ``GalleryIndex.save``."""
+    with np.load(path, allow_pickle=False) as data:
+        kind = str(data["kind"])
+    return index_class(kind).load(path)
+
+
+def _nearest(vectors, centroids):
+    """Returns the index of the nearest centroid for every vector."""
+    sq = (
+        np.einsum("ij,ij->i", centroids, centroids)[None, :]
+        - 2.0 * vectors @ centroids.T
+    )
+    return np.argmin(sq, axis=1)
+
+
+def _kmeans(vectors, k, iterations, rng):
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=k)
+        filled = np.flatnonzero(counts)
+        starts = (np.cumsum(counts) - counts)[filled]
+        sums = np.add.reduceat(vectors[order], starts, axis=0)
+        centroids[filled] = sums / counts[filled, None]
+        # Re-seed empty clusters with random points so every list stays useful.
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = vectors[rng.choice(len(vectors), len(empty))]
+    return centroids.astype(np.float32)
@@ -1,13 +1,32 @@
+import os
+import queue
+import threading
 import time
 
+LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", "1000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "50"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "2"))
+
 
 class LoggingService:
+    """Ships controller logs to the API.
+
+    ``log()`` posts a single entry and waits for the response. ``printt``
+    instead calls ``enqueue()``, which only appends to a bounded buffer; a
+    background shipper posts the buffer to ``/log/batch`` every
+    LOG_FLUSH_INTERVAL seconds or once LOG_BATCH_SIZE entries are waiting.
+    Entries that do not fit in the buffer are counted in ``dropped``, and
+    batches the API rejects are counted in ``failed``. After ``use_outbox``
+    the entries are persisted in the outbox instead of the memory buffer.
+    """
+
     _instance = None
 
     def __new__(cls, api_service=None, *args, **kwargs):
         if cls._instance is None and api_service is not None:
             cls._instance = super().__new__(cls)
             cls._instance.api_service = api_service
+            cls._instance._start_shipper()
         return cls._instance
 
     def log(self, action, userId="Controller", entityType="", entityId=""):
@@ -18,13 +37,133 @@ class LoggingService:
             "entityId": entityId,
         }
         try:
+            return self.api_service.post("/log", json=log_entry)
+        except Exception as e:
+            # Printing with printt would queue this failure for the API again.
+            print(f"Logging failed: {e}")
+            return None, None
+
+    def enqueue(self, action, userId="Controller", entityType="", entityId=""):
+        """Buffers a log entry for the shipper without blocking the caller."""
+        log_entry = {
+            "userId": userId,
+            "action": action,
+            "entityType": entityType,
+            "entityId": entityId,
+            "timestamp": int(time.time() * 1000),
+        }
+        if self.outbox is not None:
+            if self.outbox.add("log", log_entry):
+                return True
+            with self.stats_lock:
+                self.dropped += 1
+            return False
+        try:
+            self.buffer.put_nowait(log_entry)
+        except queue.Full:
+            with self.stats_lock:
+                self.dropped += 1
+            return False
+        if self.buffer.qsize() >= LOG_BATCH_SIZE:
+            self.wakeup.set()
+        return True
+
+    def use_outbox(self, outbox):
+        """Persists buffered entries in ``outbox`` instead of memory.
+
+        The outbox sender then ships them in batches of LOG_BATCH_SIZE, and at
+        most LOG_BUFFER_SIZE entries are kept while the API is unreachable.
+        """
+        outbox.register(
+            "log",
+            lambda jobs: self._post_logs([job.payload for job in jobs]),
+            batch_size=LOG_BATCH_SIZE,
+            limit=LOG_BUFFER_SIZE,
+        )
+        self.outbox = outbox
+
+    def flush(self, timeout=None):
+        """Ships everything buffered so far, e.g. before shutting down."""
+        self.wakeup.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.stats_lock:
+            while self.buffer.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.idle.wait(remaining)
+        return True
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                "shipped": self.shipped,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "pending": self.buffer.qsize(),
+            }
+
+    def _start_shipper(self):
+        self.buffer = queue.Queue(maxsize=LOG_BUFFER_SIZE)
+        self.wakeup = threading.Event()
+        self.stats_lock = threading.Lock()
+        self.idle = threading.Condition(self.stats_lock)
+        self.shipped = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batch_supported = True
+        self.outbox = None
+        self.shipper = threading.Thread(
+            target=self._ship_logs, name="Log-Shipper", daemon=True
+        )
+        self.shipper.start()
+
+    def _ship_logs(self):
+        while True:
+            self.wakeup.wait(LOG_FLUSH_INTERVAL)
+            self.wakeup.clear()
+            while not self.buffer.empty():
+                batch = []
+                while len(batch) < LOG_BATCH_SIZE:
+                    try:
+                        batch.append(self.buffer.get_nowait())
+                    except queue.Empty:
+                        break
+                self._ship_batch(batch)
+
+    def _post_logs(self, batch):
+        if self.batch_supported:
+            try:
+                self.api_service.post("/log/batch", json={"logs": batch})
+                return
+            except Exception as e:
+                response = getattr(e, "response", None)
+                if response is None or response.status_code not in (404, 405):
+                    raise
+                self.batch_supported = False
+        for log_entry in batch:
             self.api_service.post("/log", json=log_entry)
+
+    def _ship_batch(self, batch):
+        ok = True
+        try:
+            self._post_logs(batch)
         except Exception as e:
-            printt(f"Logging failed: {e}")
+            ok = False
+            print(f"Shipping {len(batch)} logs failed: {e}")
+
+        with self.stats_lock:
+            if ok:
+                self.shipped += len(batch)
+            else:
+                self.failed += len(batch)
+            for _ in batch:
+                self.buffer.task_done()
+            self.idle.notify_all()
 
 
 def printt(message, *args, **kwargs):
     timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
     print(f"[{timestamp}]: {message}", *args, **kwargs)
     if LoggingService._instance:
-        LoggingService._instance.log(message)
+        LoggingService._instance.enqueue(message)
@@ -0,0 +1,220 @@
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_DUMP_PATH = os.getenv(
+    "METRICS_DUMP_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/metrics.json")),
+)
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "60"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Log-spaced buckets from 10 us to ~185 s, each 5% wider than the last.
+MIN_SECONDS = 1e-5
+GROWTH = 1.05
+BUCKETS = 343
+_LOG_GROWTH = math.log(GROWTH)
+
+
+class Histogram:
+    """Fixed-memory latency histogram with ~5% relative error on percentiles."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        if seconds <= MIN_SECONDS:
+            index = 0
+        else:
+            index = min(BUCKETS - 1, int(math.log(seconds / MIN_SECONDS) / _LOG_GROWTH))
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile, in seconds."""
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+            largest = self.max
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(largest, MIN_SECONDS * GROWTH ** (index + 1))
+        return largest
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max if self.count else None,
+        }
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Per-stage latency histograms for the tap-to-attendance pipeline.
+
+    Disabled unless METRICS_ENABLED=1; then ``timer`` returns a shared no-op
+    context manager and ``observe``/``since`` return immediately. When
+    enabled, summaries are written to METRICS_DUMP_PATH every
+    METRICS_DUMP_INTERVAL seconds and, if METRICS_PORT is set, served as JSON
+    from http://127.0.0.1:METRICS_PORT/metrics.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.server = None
+        self.dump_thread = None
+        self.stopped = threading.Event()
+
+    def timer(self, stage):
+        """Times a ``with`` block as ``stage``."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(stage, Histogram())
+        histogram.observe(seconds)
+
+    def since(self, stage, start):
+        """Records the time since ``start``, a ``time.perf_counter()`` value."""
+        if self.enabled and start is not None:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        with self.lock:
+            histograms = dict(self.histograms)
+        return {stage: h.summary() for stage, h in sorted(histograms.items())}
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+
+    def start(
+        self,
+        dump_path=METRICS_DUMP_PATH,
+        interval=METRICS_DUMP_INTERVAL,
+        port=METRICS_PORT,
+    ):
+        """Starts the periodic dump and the optional HTTP endpoint."""
+        if not self.enabled or self.dump_thread is not None:
+            return
+        self.stopped.clear()
+        self.dump_thread = threading.Thread(
+            target=self._dump_loop,
+            args=(dump_path, interval),
+            name="Metrics-Dump",
+            daemon=True,
+        )
+        self.dump_thread.start()
+        if port:
+            self.server = ThreadingHTTPServer(("127.0.0.1", port), _handler_for(self))
+            self.server.daemon_threads = True
+            threading.Thread(
+                target=self.server.serve_forever, name="Metrics-HTTP", daemon=True
+            ).start()
+
+    def stop(self):
+        """Stops the periodic dump and the HTTP endpoint.
+
+        Waits for a dump in progress, so a final ``dump`` does not race it.
+        """
+        self.stopped.set()
+        if self.dump_thread is not None:
+            self.dump_thread.join()
+            self.dump_thread = None
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def dump(self, path=METRICS_DUMP_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"time": time.time(), "stages": self.snapshot()}, f, indent=2)
+        os.replace(tmp, path)
+
+    def _dump_loop(self, path, interval):
+        while not self.stopped.wait(interval):
+            try:
+                self.dump(path)
+            except OSError as e:
+                print(f"Writing metrics failed: {e}")
+
+
+def _handler_for(metrics):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            data = json.dumps(metrics.snapshot()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return MetricsHandler
+
+
+metrics = Metrics()
@@ -0,0 +1,342 @@
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+import requests
+
+OUTBOX_PATH = os.getenv(
+    "OUTBOX_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/outbox.db")),
+)
+OUTBOX_SYNC = os.getenv("OUTBOX_SYNC", "NORMAL")
+OUTBOX_DRAIN_RATE = float(os.getenv("OUTBOX_DRAIN_RATE", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "20"))
+OUTBOX_BACKOFF = float(os.getenv("OUTBOX_BACKOFF", "1"))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "300"))
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "4"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    ordering_key TEXT,
+    payload TEXT NOT NULL,
+    blob BLOB,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    dead INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS outbox_ready ON outbox (dead, ordering_key, id);
+"""
+
+# Only the oldest live job of each ordering key may be sent.
+HEADS = (
+    "SELECT MIN(id) FROM outbox WHERE dead = 0 "
+    "GROUP BY COALESCE(ordering_key, 'id:' || id)"
+)
+
+
+class OutboxJob:
+    """A pending outbox entry handed to a kind's handler.
+
+    Handlers may update ``payload`` in place (for example with the URL of an
+    image they already uploaded); the change is persisted if the handler then
+    fails, so a retry does not repeat the finished step.
+    """
+
+    def __init__(self, row):
+        self.id, self.key, self.kind, self.ordering_key = row[:4]
+        self.payload = json.loads(row[4])
+        self.blob = row[5]
+        self.attempts = row[6]
+
+
+class Outbox:
+    """Write-ahead outbox for requests that must reach the API.
+
+    ``add()`` commits the job to SQLite and returns at once, so callers keep
+    going while the backend or Wi-Fi is down. A sender thread hands ready
+    jobs to the handler registered for their kind, oldest first. Jobs that
+    share an ``ordering_key`` are delivered strictly in order: a later job
+    waits until the earlier one has been sent or given up on.
+
+    Failed jobs are retried with jittered exponential backoff. A connection
+    error pauses the whole sender, because every other job would fail the
+    same way, and once the API is back the backlog drains at no more than
+    OUTBOX_DRAIN_RATE requests per second. After OUTBOX_MAX_ATTEMPTS
+    failures a job is kept in the table but marked dead.
+    """
+
+    def __init__(
+        self,
+        path=OUTBOX_PATH,
+        drain_rate=OUTBOX_DRAIN_RATE,
+        max_attempts=OUTBOX_MAX_ATTEMPTS,
+        backoff=OUTBOX_BACKOFF,
+        max_backoff=OUTBOX_MAX_BACKOFF,
+    ):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.drain_rate = drain_rate
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.handlers = {}
+        self.limits = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.on_wakeup = None
+        self.sent = 0
+        self.dropped = 0
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(f"PRAGMA synchronous={OUTBOX_SYNC}")
+        self.db.executescript(SCHEMA)
+        self.pending = dict(
+            self.db.execute(
+                "SELECT kind, COUNT(*) FROM outbox WHERE dead = 0 GROUP BY kind"
+            ).fetchall()
+        )
+
+    def register(self, kind, handler, batch_size=1, limit=None):
+        """Routes jobs of ``kind`` to ``handler(jobs)``.
+
+        ``handler`` receives a list of up to ``batch_size`` jobs that share no
+        ordering key, and raises to have all of them retried. ``limit`` caps
+        how many jobs of this kind may be pending; ``add`` rejects the rest.
+        """
+        self.handlers[kind] = (handler, batch_size)
+        self.limits[kind] = limit
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self._send_jobs, name="Outbox-Sender", daemon=True
+            )
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self._wake()
+        if self.thread is not None:
+            self.thread.join()
+
+    def add(self, kind, payload, blob=None, ordering_key=None, key=None):
+        """Persists a job and wakes the sender. Returns False if it was rejected."""
+        key = key or uuid.uuid4().hex
+        with self.lock:
+            limit = self.limits.get(kind)
+            if limit is not None and self.pending.get(kind, 0) >= limit:
+                self.dropped += 1
+                return False
+            with self.db:
+                inserted = self.db.execute(
+                    "INSERT OR IGNORE INTO outbox "
+                    "(key, kind, ordering_key, payload, blob, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, kind, ordering_key, json.dumps(payload), blob, time.time()),
+                ).rowcount
+            self.pending[kind] = self.pending.get(kind, 0) + inserted
+        self._wake()
+        return True
+
+    def stats(self):
+        with self.lock:
+            dead = self.db.execute(
+                "SELECT COUNT(*) FROM outbox WHERE dead = 1"
+            ).fetchone()[0]
+            return {
+                "pending": sum(self.pending.values()),
+                "sent": self.sent,
+                "dropped": self.dropped,
+                "dead": dead,
+            }
+
+    def drain(self, timeout=None):
+        """Waits until no job is pending or retrying, e.g. in tests."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                if not any(self.pending.values()):
+                    return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            self._wake()
+            time.sleep(0.01)
+
+    async def send_async(self, concurrency=OUTBOX_CONCURRENCY):
+        """Coroutine sender for the asyncio runtime, used instead of ``start``.
+
+        Up to ``concurrency`` handler calls run at once on the default
+        executor. Jobs that share an ordering key still go one at a time,
+        because only the oldest of them is ready. Returns after ``stop``
+        once the calls in flight have finished.
+        """
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        self.on_wakeup = lambda: loop.call_soon_threadsafe(wake.set)
+        slots = asyncio.Semaphore(concurrency)
+        interval = 1 / self.drain_rate if self.drain_rate else 0
+        in_flight, tasks = set(), set()
+        next_start = offline_until = pause = 0
+
+        async def deliver(handler, batch):
+            nonlocal offline_until, pause
+            try:
+                online = await loop.run_in_executor(None, self._deliver, handler, batch)
+            finally:
+                in_flight.difference_update(job.id for job in batch)
+                slots.release()
+                wake.set()
+            if online:
+                pause = 0
+            else:
+                pause = min(self.max_backoff, max(self.backoff, pause * 2))
+                offline_until = loop.time() + random.uniform(pause / 2, pause)
+
+        try:
+            while not self.stopped.is_set():
+                jobs = [
+                    job for job in self._ready_jobs(limit=64) if job.id not in in_flight
+                ]
+                if not jobs:
+                    timeout = None if in_flight else self._next_due()
+                    try:
+                        await asyncio.wait_for(wake.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    wake.clear()
+                    continue
+
+                for handler, batch in self._batches(jobs):
+                    await slots.acquire()
+                    delay = max(offline_until, next_start) - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    if self.stopped.is_set():
+                        slots.release()
+                        break
+                    next_start = loop.time() + interval
+                    in_flight.update(job.id for job in batch)
+                    task = asyncio.create_task(deliver(handler, batch))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        finally:
+            self.on_wakeup = None
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _wake(self):
+        self.wakeup.set()
+        if self.on_wakeup is not None:
+            self.on_wakeup()
+
+    def _batches(self, jobs):
+        """Yields ``(handler, batch)`` pairs for ready jobs, grouped by kind."""
+        by_kind = {}
+        for job in jobs:
+            by_kind.setdefault(job.kind, []).append(job)
+        for kind, kind_jobs in by_kind.items():
+            handler, batch_size = self.handlers.get(kind, (None, 1))
+            for i in range(0, len(kind_jobs), batch_size):
+                yield handler, kind_jobs[i : i + batch_size]
+
+    def _ready_jobs(self, limit):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT id, key, kind, ordering_key, payload, blob, attempts "
+                f"FROM outbox WHERE id IN ({HEADS}) AND next_attempt <= ? "
+                "ORDER BY id LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+        return [OutboxJob(row) for row in rows]
+
+    def _next_due(self):
+        with self.lock:
+            due = self.db.execute(
+                f"SELECT MIN(next_attempt) FROM outbox WHERE id IN ({HEADS})"
+            ).fetchone()[0]
+        return None if due is None else max(0.0, due - time.time())
+
+    def _send_jobs(self):
+        interval = 1 / self.drain_rate if self.drain_rate else 0
+        pause = 0
+        while not self.stopped.is_set():
+            jobs = self._ready_jobs(limit=64)
+            if not jobs:
+                self.wakeup.wait(self._next_due())
+                self.wakeup.clear()
+                continue
+
+            offline = False
+            for handler, batch in self._batches(jobs):
+                started = time.monotonic()
+                offline = not self._deliver(handler, batch)
+                if offline or self.stopped.is_set():
+                    break
+                time.sleep(max(0, interval - (time.monotonic() - started)))
+
+            if offline:
+                pause = min(self.max_backoff, max(self.backoff, pause * 2))
+                self.stopped.wait(random.uniform(pause / 2, pause))
+            else:
+                pause = 0
+
+    def _deliver(self, handler, jobs):
+        """Runs one handler call. Returns False if the API looked unreachable."""
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for {jobs[0].kind} jobs")
+            handler(jobs)
+        except Exception as e:
+            offline = isinstance(e, (requests.ConnectionError, requests.Timeout))
+            self._retry_later(jobs, e, count_attempt=not offline)
+            return not offline
+
+        with self.lock:
+            with self.db:
+                self.db.executemany(
+                    "DELETE FROM outbox WHERE id = ?", [(job.id,) for job in jobs]
+                )
+            for job in jobs:
+                self.pending[job.kind] -= 1
+            self.sent += len(jobs)
+        return True
+
+    def _retry_later(self, jobs, error, count_attempt=True):
+        # Being offline is handled by pausing the sender and does not count
+        # towards a job's attempts.
+        now = time.time()
+        with self.lock:
+            with self.db:
+                for job in jobs:
+                    attempts = job.attempts + int(count_attempt)
+                    delay = 0
+                    if count_attempt:
+                        delay = min(self.max_backoff, self.backoff * 2**attempts)
+                    dead = attempts >= self.max_attempts
+                    self.db.execute(
+                        "UPDATE outbox SET payload = ?, attempts = ?, "
+                        "next_attempt = ?, dead = ? WHERE id = ?",
+                        (
+                            json.dumps(job.payload),
+                            attempts,
+                            now + random.uniform(delay / 2, delay),
+                            int(dead),
+                            job.id,
+                        ),
+                    )
+                    if dead:
+                        self.pending[job.kind] -= 1
+                        print(f"Giving up on {job.kind} job {job.key}: {error}")
+        print(f"Sending {len(jobs)} {jobs[0].kind} job(s) failed: {error}")
@@ -0,0 +1,99 @@
+import importlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from src.services.logging_service import printt
+
+# With RECOGNITION_PROCESSES > 0 recognition runs in that many worker processes.
+if int(os.getenv("RECOGNITION_PROCESSES", "0")) > 0:
+    DEFAULT_SERVICE = (
+        "src.services.recognition_processes",
+        "ProcessRecognitionService",
+    )
+else:
+    DEFAULT_SERVICE = (
+        "src.services.face_recognition_service",
+        "FaceRecognitionService",
+    )
+
+
+class StartupReport:
+    """Timings of the deferred face recognition start-up, in seconds."""
+
+    def __init__(self):
+        self.import_time = None
+        self.model_load_time = None
+        self.first_inference_time = None
+
+    def __str__(self):
+        def fmt(value):
+            return "n/a" if value is None else f"{value:.2f}s"
+
+        return (
+            f"import {fmt(self.import_time)}, "
+            f"model load {fmt(self.model_load_time)}, "
+            f"first inference {fmt(self.first_inference_time)}"
+        )
+
+
+class RecognitionLoader:
+    """Imports and builds FaceRecognitionService on a background thread.
+
+    torch, facenet_pytorch and cv2 are only imported by the loader thread, so
+    the hardware threads and state machine can start immediately; the
+    camera and artifact writer import cv2 on first use for the same reason.
+    Only numpy, for the frame buffer, is loaded at start. Callers
+    that need the service block in ``get()`` until it is ready, which keeps
+    scans that arrive early queued instead of dropped.
+    """
+
+    def __init__(self, module=DEFAULT_SERVICE[0], attribute=DEFAULT_SERVICE[1]):
+        self.module = module
+        self.attribute = attribute
+        self.report = StartupReport()
+        self._future = Future()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._load, name="FR-Loader", daemon=True
+                )
+                self._thread.start()
+
+    @property
+    def ready(self):
+        return self._future.done() and self._future.exception() is None
+
+    def get(self, timeout=None):
+        """Returns the service, starting the load if needed and waiting for it."""
+        self.start()
+        return self._future.result(timeout)
+
+    def add_ready_callback(self, callback):
+        """Calls ``callback(report)`` once loading has finished or failed."""
+        self._future.add_done_callback(lambda _: callback(self.report))
+
+    def _load(self):
+        try:
+            start = time.perf_counter()
+            service_cls = getattr(importlib.import_module(self.module), self.attribute)
+            self.report.import_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            service = service_cls()
+            self.report.model_load_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            service.warm_up()
+            self.report.first_inference_time = time.perf_counter() - start
+        except Exception as e:
+            printt(f"Face recognition failed to load: {e}")
+            self._future.set_exception(e)
+            return
+
+        self._future.set_result(service)
@@ -0,0 +1,383 @@
+import importlib
+import itertools
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.controllers.frame_buffer import (
+    BUFFER_FPS,
+    BUFFER_SECONDS,
+    LORES_SIZE,
+    STILL_SIZE,
+)
+from src.services.logging_service import printt
+
+RECOGNITION_PROCESSES = int(os.getenv("RECOGNITION_PROCESSES", "0"))
+RECOGNITION_TORCH_THREADS = int(os.getenv("RECOGNITION_TORCH_THREADS", "0"))
+# 0 sizes the slots for one tap: the buffered lores frames plus the still.
+RECOGNITION_SLOT_MB = int(os.getenv("RECOGNITION_SLOT_MB", "0"))
+SERVICE_FACTORY = "src.services.face_recognition_service:FaceRecognitionService"
+ALIGNMENT = 64
+TAP_FRAMES = BUFFER_SECONDS * BUFFER_FPS + 1
+TAP_BURST_BYTES = (
+    (TAP_FRAMES - 1) * LORES_SIZE[0] * LORES_SIZE[1] + STILL_SIZE[0] * STILL_SIZE[1]
+) * 3 + TAP_FRAMES * ALIGNMENT
+
+
+class FrameSlots:
+    """Fixed shared-memory buffers that carry frames to the worker processes.
+
+    A request's frames are copied once into a free slot and the worker maps
+    them as numpy arrays, so pixels are never pickled. A slot stays taken
+    until the request's result comes back.
+    """
+
+    def __init__(self, count, size):
+        self.size = size
+        self.blocks = [
+            shared_memory.SharedMemory(create=True, size=size) for _ in range(count)
+        ]
+        self.free = queue.SimpleQueue()
+        for slot in range(count):
+            self.free.put(slot)
+
+    def pack(self, frames):
+        """Copies ``frames`` into a free slot.
+
+        Returns ``(slot, shared_frames)``, or None when every slot is taken or
+        the frames do not fit in one.
+        """
+        layout, offset = [], 0
+        for frame in frames:
+            layout.append((offset, frame.shape, frame.dtype.str))
+            offset += -(-frame.nbytes // ALIGNMENT) * ALIGNMENT
+        if offset > self.size:
+            return None
+        try:
+            slot = self.free.get_nowait()
+        except queue.Empty:
+            return None
+
+        block = self.blocks[slot]
+        for frame, (start, shape, dtype) in zip(frames, layout):
+            np.ndarray(shape, dtype, block.buf, start)[...] = frame
+        return slot, (block.name, layout)
+
+    def release(self, slot):
+        self.free.put(slot)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+
+class ProcessRecognitionService:
+    """Runs face recognition in worker processes instead of threads.
+
+    Each worker process builds its own FaceRecognitionService, so the
+    Python-heavy image handling around the models runs outside the
+    controller's GIL. Frames travel through FrameSlots; image paths are sent
+    as they are. Requests go to the worker with the fewest outstanding
+    requests, where they still share detection and embedding batches.
+
+    Each worker's torch uses RECOGNITION_TORCH_THREADS threads, by default
+    the CPU count divided by the number of workers. The detect, embed and
+    compare latency histograms are recorded inside the workers and are not
+    part of the controller's metrics.
+    """
+
+    def __init__(
+        self,
+        workers=RECOGNITION_PROCESSES or 2,
+        torch_threads=RECOGNITION_TORCH_THREADS,
+        factory=SERVICE_FACTORY,
+        slot_size=(RECOGNITION_SLOT_MB << 20) or TAP_BURST_BYTES,
+    ):
+        self.factory = factory
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+        # Spawned workers start without the controller's threads and devices.
+        self.context = multiprocessing.get_context("spawn")
+        self.results = self.context.Queue()
+        self.slots = FrameSlots(2 * workers, slot_size)
+        self.lock = threading.Lock()
+        self.task_ids = itertools.count()
+        self.pending = {}
+        self.processes = [None] * workers
+        self.tasks = [None] * workers
+        self.load = [0] * workers
+        self.counters = {"shared": 0, "pickled": 0, "restarted": 0}
+        self.closed = False
+
+        # The first worker builds any missing embeddings or gallery index on
+        # its own, so the others only load them.
+        self._start_worker(0)
+        self._wait_ready(1)
+        for index in range(1, workers):
+            self._start_worker(index)
+        self._wait_ready(workers - 1)
+
+        self.collector = threading.Thread(
+            target=self._collect_results, name="FR-Results", daemon=True
+        )
+        self.collector.start()
+
+    def run_on_image(self, image_path: str):
+        return self.submit(image_path).result()
+
+    def run_on_array(self, frame, name=None):
+        return self.submit(frame, name).result()
+
+    def run_on_images(self, image_paths):
+        futures = [self.submit(path) for path in image_paths]
+        return [future.result() for future in futures]
+
+    def run_on_frames(self, frames, name=None):
+        return self.submit(list(frames), name).result()
+
+    def detect(self, frames):
+        """Queues face detection on a worker; see FaceRecognitionService.detect."""
+        return self._send_frames("detect", list(frames))
+
+    def identify(self, frames, boxes):
+        """Queues embedding and matching on a worker; see FaceRecognitionService."""
+        return self._send_frames("identify", list(frames), boxes)
+
+    def warm_up(self):
+        for future in self._broadcast("warm_up"):
+            future.result()
+
+    def enroll(self, identity, embedding):
+        for future in self._broadcast("enroll", identity, embedding):
+            future.result()
+
+    def unenroll(self, identity):
+        for future in self._broadcast("unenroll", identity):
+            future.result()
+
+    def submit(self, image, name=None):
+        """Queues an image path, RGB array or burst of frames on a worker.
+
+        Returns a Future resolving to the same result list as
+        FaceRecognitionService.submit.
+        """
+        if name is None:
+            name = (
+                os.path.splitext(os.path.basename(image))[0]
+                if isinstance(image, str)
+                else f"capture_{int(time.time())}"
+            )
+        return self._send_frames("recognize", image, name)
+
+    def stats(self):
+        with self.lock:
+            return {"load": list(self.load), **self.counters}
+
+    def close(self, timeout=5):
+        """Stops the workers and frees the shared memory."""
+        self.closed = True
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.collector.join(timeout)
+        self.slots.close()
+
+    def _start_worker(self, index):
+        self.tasks[index] = self.context.Queue()
+        self.processes[index] = self.context.Process(
+            target=_worker_main,
+            args=(
+                index,
+                self.factory,
+                self.torch_threads,
+                self.tasks[index],
+                self.results,
+            ),
+            name=f"FR-Process-{index + 1}",
+            daemon=True,
+        )
+        self.processes[index].start()
+
+    def _wait_ready(self, count):
+        for _ in range(count):
+            index, _, ok, error = self.results.get()
+            if not ok:
+                self._abort()
+                raise RuntimeError(f"Recognition worker {index + 1} failed: {error}")
+
+    def _abort(self):
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        self.slots.close()
+
+    def _send_frames(self, op, image, *args):
+        """Sends ``op`` to the least loaded worker, with ``image``'s frames in a slot."""
+        slot, payload = None, image
+        if not isinstance(image, str):
+            frames = image if isinstance(image, list) else [image]
+            packed = self.slots.pack([np.ascontiguousarray(f) for f in frames])
+            if packed is not None:
+                slot, (block, layout) = packed
+                payload = ("shared", block, layout, isinstance(image, list))
+        with self.lock:
+            self.counters["pickled" if slot is None else "shared"] += 1
+            index = min(range(len(self.load)), key=self.load.__getitem__)
+        return self._send(index, op, payload, *args, slot=slot)
+
+    def _broadcast(self, op, *args):
+        return [self._send(index, op, *args) for index in range(len(self.tasks))]
+
+    def _send(self, index, op, *args, slot=None):
+        future = Future()
+        with self.lock:
+            task_id = next(self.task_ids)
+            self.pending[task_id] = (index, future, slot)
+            self.load[index] += 1
+            self.tasks[index].put((op, task_id, *args))
+        return future
+
+    def _collect_results(self):
+        while not self.closed:
+            try:
+                index, task_id, ok, value = self.results.get(timeout=1)
+            except queue.Empty:
+                self._restart_dead_workers()
+                continue
+            if task_id is None:
+                if not ok:
+                    printt(f"Recognition worker {index + 1} failed to restart: {value}")
+                continue
+            with self.lock:
+                entry = self.pending.pop(task_id, None)
+                if entry is not None:
+                    self.load[entry[0]] -= 1
+            if entry is not None:
+                self._finish(entry, ok, value)
+
+    def _restart_dead_workers(self):
+        for index, process in enumerate(self.processes):
+            if self.closed or process.is_alive():
+                continue
+            printt(f"Recognition worker {index + 1} exited, restarting it")
+            with self.lock:
+                lost = {
+                    task_id: entry
+                    for task_id, entry in self.pending.items()
+                    if entry[0] == index
+                }
+                for task_id in lost:
+                    del self.pending[task_id]
+                self.load[index] = 0
+                self.counters["restarted"] += 1
+                # Replace the queue too, as the dead worker may hold its lock.
+                self._start_worker(index)
+            for entry in lost.values():
+                self._finish(entry, False, RuntimeError("Recognition worker exited"))
+
+    def _finish(self, entry, ok, value):
+        _, future, slot = entry
+        if slot is not None:
+            self.slots.release(slot)
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+
+def _worker_main(index, factory, threads, tasks, results):
+    """Entry point of a worker process: builds the service and serves tasks."""
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    try:
+        module, attribute = factory.split(":")
+        service = getattr(importlib.import_module(module), attribute)()
+    except Exception as e:
+        results.put((index, None, False, _picklable(e)))
+        return
+    results.put((index, None, True, None))
+
+    blocks = {}
+    while True:
+        message = tasks.get()
+        if message is None:
+            break
+        op, task_id, *args = message
+        if op in ("recognize", "detect", "identify"):
+            image, *rest = args
+            method = service.submit if op == "recognize" else getattr(service, op)
+            try:
+                future = method(_unpack(image, blocks), *rest)
+            except Exception as e:
+                results.put((index, task_id, False, _picklable(e)))
+                continue
+            future.add_done_callback(
+                lambda done, task_id=task_id: results.put(
+                    (index, task_id, *_outcome(done))
+                )
+            )
+            continue
+
+        try:
+            if op in ("enroll", "unenroll"):
+                # Every worker updates its gallery; only the first saves it.
+                value = getattr(service, op)(*args, persist=index == 0)
+            else:
+                value = getattr(service, op)(*args)
+            results.put((index, task_id, True, value))
+        except Exception as e:
+            results.put((index, task_id, False, _picklable(e)))
+
+    for block in blocks.values():
+        try:
+            block.close()
+        except BufferError:
+            pass
+    # The service's threads may still be inside torch, whose teardown aborts
+    # if they are running, so flush the results and skip it.
+    results.close()
+    results.join_thread()
+    os._exit(0)
+
+
+def _unpack(image, blocks):
+    """Maps shared frames as arrays; other images are returned unchanged."""
+    if not (isinstance(image, tuple) and image[0] == "shared"):
+        return image
+    _, name, layout, burst = image
+    if name not in blocks:
+        blocks[name] = shared_memory.SharedMemory(name=name)
+    buf = blocks[name].buf
+    frames = [np.ndarray(shape, dtype, buf, start) for start, shape, dtype in layout]
+    return frames if burst else frames[0]
+
+
+def _outcome(future):
+    error = future.exception()
+    if error is not None:
+        return False, _picklable(error)
+    return True, future.result()
+
+
+def _picklable(error):
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(repr(error))
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+TAP_CACHE_SIZE = int(os.getenv("TAP_CACHE_SIZE", "1024"))
+TAP_DEBOUNCE_WINDOW = float(os.getenv("TAP_DEBOUNCE_WINDOW", "10"))
+# A student recognised with RECOGNITION_CONFIDENCE in a session stays recorded
+# until it ends.
+TAP_RECOGNIZED_TTL = float(os.getenv("TAP_RECOGNIZED_TTL", str(4 * 3600)))
+
+
+class TapCache:
+    """Thread-safe LRU map whose entries expire ``ttl`` seconds after set.
+
+    All operations are O(1): entries live in an OrderedDict in recency order,
+    expired ones are dropped when looked up, and the least recently used is
+    evicted once ``maxsize`` entries are held. Lookups count hits and misses.
+    """
+
+    def __init__(self, maxsize=TAP_CACHE_SIZE, ttl=TAP_DEBOUNCE_WINDOW):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key, now):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] <= now:
+            del self.entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, value, ttl, now):
+        self.entries[key] = (now + (self.ttl if ttl is None else ttl), value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        """Returns the live value for ``key``, or ``default``."""
+        with self.lock:
+            entry = self._lookup(key, time.monotonic())
+            return default if entry is None else entry[1]
+
+    def set(self, key, value=True, ttl=None):
+        """Stores ``value`` for ``ttl`` seconds (the cache's ttl by default)."""
+        with self.lock:
+            self._store(key, value, ttl, time.monotonic())
+
+    def add(self, key, value=True, ttl=None):
+        """Stores ``value`` unless ``key`` is live; returns True if stored."""
+        with self.lock:
+            now = time.monotonic()
+            if self._lookup(key, now) is not None:
+                return False
+            self._store(key, value, ttl, now)
+            return True
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
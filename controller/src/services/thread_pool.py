@@ -1,12 +1,71 @@
+import heapq
+import itertools
+import os
 import threading
-import queue
+import time
+from concurrent.futures import Future
 from src.services.logging_service import printt
+from src.services.metrics import metrics
+
+POOL_QUEUE_SIZE = int(os.getenv("POOL_QUEUE_SIZE", "32"))
+POOL_OVERFLOW = os.getenv("POOL_OVERFLOW", "drop_lowest")
+
+# Lower values run first.
+CRITICAL = 0
+NORMAL = 1
+BACKGROUND = 2
+
+REJECT = "reject"
+DROP_LOWEST = "drop_lowest"
+BLOCK = "block"
+
+
+class PoolFull(RuntimeError):
+    """Raised through a task's future when the queue has no room for it."""
 
 
 class ThreadPool:
-    def __init__(self, num_workers=3):
-        self.queue = queue.Queue()
-        self.shutdown_flag = threading.Event()
+    """Bounded worker pool with priority lanes that returns futures.
+
+    Tasks wait in a heap ordered by priority (CRITICAL, NORMAL, BACKGROUND)
+    and then submission order. When ``max_pending`` tasks are already
+    waiting the ``overflow`` policy decides:
+
+    - ``reject``: fail the new task's future with PoolFull.
+    - ``drop_lowest``: cancel the newest waiting task of the lowest priority
+      to make room, if it is less important than the new task; otherwise
+      reject the new task.
+    - ``block``: wait up to ``block_timeout`` seconds for room, then reject.
+    """
+
+    def __init__(
+        self,
+        num_workers=3,
+        max_pending=POOL_QUEUE_SIZE,
+        overflow=POOL_OVERFLOW,
+        block_timeout=1.0,
+    ):
+        if overflow not in (REJECT, DROP_LOWEST, BLOCK):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.max_pending = max_pending
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.heap = []
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        self.accepting = True
+        self.running = 0
+        self.counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "dropped": 0,
+        }
+        self.wait_time = 0.0
+        self.run_time = 0.0
         self.threads = []
 
         for i in range(num_workers):
@@ -16,23 +75,104 @@ class ThreadPool:
             t.start()
             self.threads.append(t)
 
+    def submit(self, func, *args, **kwargs):
+        """Queues ``func(*args, **kwargs)`` with NORMAL priority."""
+        return self.submit_with_priority(NORMAL, func, *args, **kwargs)
+
+    def submit_with_priority(self, priority, func, *args, **kwargs):
+        """Queues ``func(*args, **kwargs)`` and returns its Future."""
+        future = Future()
+        with self.lock:
+            if not self.accepting:
+                raise RuntimeError("ThreadPool is shut down")
+            if not self._make_room(priority):
+                self.counters["rejected"] += 1
+                future.set_exception(PoolFull("ThreadPool queue is full"))
+                return future
+            entry = (priority, next(self.sequence), time.perf_counter())
+            heapq.heappush(self.heap, (*entry, func, args, kwargs, future))
+            self.counters["submitted"] += 1
+            self.not_empty.notify()
+        return future
+
+    def stats(self):
+        """Returns queue depth per priority and task counters."""
+        with self.lock:
+            depth = {CRITICAL: 0, NORMAL: 0, BACKGROUND: 0}
+            for entry in self.heap:
+                depth[entry[0]] = depth.get(entry[0], 0) + 1
+            finished = self.counters["completed"] + self.counters["failed"]
+            return {
+                "depth": depth,
+                "running": self.running,
+                **self.counters,
+                "mean_wait": self.wait_time / finished if finished else None,
+                "mean_run": self.run_time / finished if finished else None,
+            }
+
+    def shutdown(self, wait=True, drain=True):
+        """Stops accepting tasks.
+
+        With ``drain`` the queued tasks still run; otherwise they are
+        cancelled. With ``wait`` this returns once the workers have exited.
+        """
+        with self.lock:
+            self.accepting = False
+            if not drain:
+                for *_, future in self.heap:
+                    future.cancel()
+                self.heap.clear()
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+        if wait:
+            for t in self.threads:
+                t.join()
+
+    def _make_room(self, priority):
+        if len(self.heap) < self.max_pending:
+            return True
+        if self.overflow == BLOCK:
+            self.not_full.wait_for(
+                lambda: len(self.heap) < self.max_pending or not self.accepting,
+                timeout=self.block_timeout,
+            )
+            return len(self.heap) < self.max_pending and self.accepting
+        if self.overflow == DROP_LOWEST:
+            victim = max(self.heap, key=lambda entry: (entry[0], entry[1]))
+            if victim[0] > priority:
+                self.heap.remove(victim)
+                heapq.heapify(self.heap)
+                victim[-1].cancel()
+                self.counters["dropped"] += 1
+                return True
+        return False
+
     def _worker(self):
-        while not self.shutdown_flag.is_set():
-            try:
-                func, args, kwargs = self.queue.get(timeout=1)
+        while True:
+            with self.lock:
+                self.not_empty.wait_for(lambda: self.heap or not self.accepting)
+                if not self.heap:
+                    return
+                _, _, queued_at, func, args, kwargs, future = heapq.heappop(self.heap)
+                self.running += 1
+                self.not_full.notify()
+
+            started = time.perf_counter()
+            metrics.since("pool_wait", queued_at)
+            outcome = "completed"
+            if not future.set_running_or_notify_cancel():
+                outcome = None
+            else:
                 try:
-                    func(*args, **kwargs)
+                    future.set_result(func(*args, **kwargs))
                 except Exception as e:
+                    outcome = "failed"
                     printt(f"Error in face recognition worker task: {e}")
-                finally:
-                    self.queue.task_done()
-            except queue.Empty:
-                continue
-
-    def submit(self, func, *args, **kwargs):
-        self.queue.put((func, args, kwargs))
+                    future.set_exception(e)
 
-    def shutdown(self):
-        self.shutdown_flag.set()
-        for t in self.threads:
-            t.join()
+            with self.lock:
+                self.running -= 1
+                if outcome:
+                    self.counters[outcome] += 1
+                    self.wait_time += started - queued_at
+                    self.run_time += time.perf_counter() - started
@@ -0,0 +1,103 @@
+import itertools
+import os
+
+import numpy as np
+
+TRACK_IOU_THRESHOLD = float(os.getenv("TRACK_IOU_THRESHOLD", "0.3"))
+
+
+def iou(a, b):
+    """Intersection over union of two ``(x1, y1, x2, y2)`` boxes."""
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union
+
+
+class Track:
+    """One face followed across frames, with the identities voted for it."""
+
+    def __init__(self, track_id, box, frame_index):
+        self.id = track_id
+        self.box = np.asarray(box, dtype=float)
+        self.velocity = np.zeros(4)
+        self.frame_index = frame_index
+        self.missed = 0
+        self.votes = {}
+        self.distances = {}
+
+    def predict(self, frame_index, limit):
+        """Box at ``frame_index``, extrapolated for at most ``limit`` frames."""
+        return self.box + self.velocity * min(frame_index - self.frame_index, limit)
+
+    def update(self, box, frame_index):
+        box = np.asarray(box, dtype=float)
+        if frame_index > self.frame_index:
+            self.velocity = (box - self.box) / (frame_index - self.frame_index)
+        self.box = box
+        self.frame_index = frame_index
+        self.missed = 0
+
+    def vote(self, identity, distance):
+        self.votes[identity] = self.votes.get(identity, 0) + 1
+        self.distances[identity] = min(distance, self.distances.get(identity, distance))
+
+    @property
+    def identity(self):
+        return max(self.votes, key=self.votes.get) if self.votes else None
+
+
+class IoUTracker:
+    """Associates detections with tracks by greedy IoU matching.
+
+    Each track's box is extrapolated to the detection frame before
+    matching. Detections matching no track start a new one, and tracks
+    unmatched for more than ``max_missed`` detection rounds are dropped.
+    """
+
+    def __init__(self, threshold=TRACK_IOU_THRESHOLD, max_missed=2, limit=1):
+        self.threshold = threshold
+        self.max_missed = max_missed
+        self.limit = limit
+        self.tracks = []
+        self.ids = itertools.count()
+
+    def update(self, boxes, frame_index):
+        """Returns the track of each box detected at ``frame_index``."""
+        predicted = [t.predict(frame_index, self.limit) for t in self.tracks]
+        pairs = sorted(
+            (
+                (iou(p, box), ti, bi)
+                for ti, p in enumerate(predicted)
+                for bi, box in enumerate(boxes)
+            ),
+            key=lambda pair: pair[0],
+            reverse=True,
+        )
+
+        assigned = [None] * len(boxes)
+        for score, ti, bi in pairs:
+            if score < self.threshold:
+                break
+            track = self.tracks[ti]
+            if assigned[bi] is None and track.frame_index != frame_index:
+                track.update(boxes[bi], frame_index)
+                assigned[bi] = track
+
+        for track in self.tracks:
+            if track.frame_index != frame_index:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+        for bi, box in enumerate(boxes):
+            if assigned[bi] is None:
+                assigned[bi] = Track(next(self.ids), box, frame_index)
+                self.tracks.append(assigned[bi])
+        return assigned
+
+    def boxes(self, frame_index):
+        """Returns ``(track, box)`` for every live track at ``frame_index``."""
+        return [(t, t.predict(frame_index, self.limit)) for t in self.tracks]
@@ -0,0 +1,253 @@
+import itertools
+import os
+
+import cv2
+
+from src.services.artifact_writer import ArtifactWriter
+from src.services.face_recognition_service import annotate_frame, resize_with_padding
+from src.services.logging_service import printt
+from src.services.tracking import IoUTracker
+
+VIDEO_DETECT_STRIDE = int(os.getenv("VIDEO_DETECT_STRIDE", "10"))
+VIDEO_DETECT_BATCH = int(os.getenv("VIDEO_DETECT_BATCH", "4"))
+VIDEO_VERIFY_MATCHES = int(os.getenv("VIDEO_VERIFY_MATCHES", "3"))
+VIDEO_OUTPUT_DIR = os.getenv(
+    "VIDEO_OUTPUT_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/video")),
+)
+
+# Verdicts, as appended to processed clip names.
+VERIFIED = "VV"
+FAILED = "VF"
+
+
+def read_frames(capture):
+    """Yields the BGR frames of an opened cv2.VideoCapture, then releases it."""
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                return
+            yield frame
+    finally:
+        capture.release()
+
+
+class VideoRecognitionEngine:
+    """Verifies a clipped video against an expected identity in one pass.
+
+    The clip is decoded once, as a stream. Faces are detected on every
+    ``stride``-th frame, ``batch`` detection frames per MTCNN call, and the
+    IoU tracker carries boxes across the frames in between. Faces are only
+    embedded while their track is unresolved, in one forward pass per
+    batch. The clip is verified once ``verify_matches`` faces match
+    ``expected`` (any known identity if None), after which detection stops.
+
+    The overlay video, verdict and best-frame artifacts come out of the same
+    pass. The best frame is the closest match to ``expected``, or the
+    closest match overall if none.
+
+    Detection and embedding go through the service's ``detect`` and
+    ``identify`` requests, so ``service`` may be a FaceRecognitionService
+    (its inference thread runs them) or a ProcessRecognitionService.
+    """
+
+    def __init__(
+        self,
+        service=None,
+        stride=VIDEO_DETECT_STRIDE,
+        batch=VIDEO_DETECT_BATCH,
+        verify_matches=VIDEO_VERIFY_MATCHES,
+        output_dir=VIDEO_OUTPUT_DIR,
+        artifact_writer=None,
+    ):
+        if service is None:
+            from src.services.face_recognition_service import FaceRecognitionService
+
+            service = FaceRecognitionService()
+        self.service = service
+        self.artifact_writer = artifact_writer or ArtifactWriter(
+            name="Video-Artifact-Writer"
+        )
+        self.stride = stride
+        self.batch = batch
+        self.verify_matches = verify_matches
+        self.clip_dir = os.path.join(output_dir, "ClipVideo_V")
+        self.annotated_dir = os.path.join(output_dir, "FRedPic_V")
+        self.portrait_dir = os.path.join(output_dir, "captured_photo_V")
+
+    def process(self, path, expected=None, write_video=True):
+        """Recognizes a clip and returns its verdict and artifact paths."""
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise ValueError(f"Could not open video {path}")
+        fps = capture.get(cv2.CAP_PROP_FPS) or 20
+        base = os.path.splitext(os.path.basename(path))[0]
+
+        state = {
+            "expected": expected,
+            "tracker": IoUTracker(limit=self.stride),
+            "matches": 0,
+            "best": None,
+            "frames": 0,
+            "detections": 0,
+            "embeddings": 0,
+        }
+        writer, temp_path = None, None
+        frames = read_frames(capture)
+        while True:
+            chunk = list(itertools.islice(frames, self.stride * self.batch))
+            if not chunk:
+                break
+            overlays = self._process_chunk(chunk, state)
+
+            if write_video:
+                if writer is None:
+                    os.makedirs(self.clip_dir, exist_ok=True)
+                    temp_path = os.path.join(self.clip_dir, f"{base}.part.mp4")
+                    height, width = chunk[0].shape[:2]
+                    writer = cv2.VideoWriter(
+                        temp_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)
+                    )
+                for frame, boxes in zip(chunk, overlays):
+                    for track, box in boxes:
+                        self._draw(frame, track, box)
+                    writer.write(frame)
+
+        verdict = VERIFIED if state["matches"] >= self.verify_matches else FAILED
+        video_path = None
+        if writer is not None:
+            writer.release()
+            video_path = os.path.join(self.clip_dir, f"{base} {verdict}.mp4")
+            os.replace(temp_path, video_path)
+
+        best = state["best"]
+        result = {
+            "verdict": verdict,
+            "identity": best["identity"] if best else None,
+            "distance": best["distance"] if best else None,
+            "matches": state["matches"],
+            "frames": state["frames"],
+            "detections": state["detections"],
+            "embeddings": state["embeddings"],
+            "annotatedPath": None,
+            "croppedPath": None,
+            "videoPath": video_path,
+        }
+        if best:
+            # Renamed clips are "<identity> (<distance>)_<trigger timestamp>".
+            ts = base.split(")_")[-1]
+            result.update(self._save_best(best, ts))
+        printt(
+            f"Video {base}: {verdict}, {state['matches']} matches in "
+            f"{state['frames']} frames"
+        )
+        return result
+
+    def _process_chunk(self, chunk, state):
+        """Detects, tracks and embeds one chunk; returns each frame's boxes."""
+        start = state["frames"]
+        state["frames"] += len(chunk)
+        detect_at = []
+        if state["matches"] < self.verify_matches:
+            detect_at = [i for i in range(len(chunk)) if (start + i) % self.stride == 0]
+        detections, rgb = {}, {}
+        if detect_at:
+            rgb = {i: cv2.cvtColor(chunk[i], cv2.COLOR_BGR2RGB) for i in detect_at}
+            found = self.service.detect(list(rgb.values())).result()
+            detections = dict(zip(detect_at, found))
+            state["detections"] += len(detect_at)
+
+        tracker = state["tracker"]
+        overlays, pending, queued = [], [], {}
+        for i in range(len(chunk)):
+            if i not in detections:
+                overlays.append(tracker.boxes(start + i))
+                continue
+            boxes = detections[i]
+            tracks = tracker.update(list(boxes), start + i)
+            overlays.append(list(zip(tracks, boxes)))
+            for track, box in zip(tracks, boxes):
+                if not self._resolved(track, queued.get(track.id, 0)):
+                    queued[track.id] = queued.get(track.id, 0) + 1
+                    pending.append((track, i, box))
+
+        if pending:
+            # Pending faces are in frame order, as are the identify results.
+            frames = sorted({i for _, i, _ in pending})
+            matches = self.service.identify(
+                [rgb[i] for i in frames],
+                [[box for _, k, box in pending if k == i] for i in frames],
+            ).result()
+            state["embeddings"] += len(pending)
+            for (track, i, box), (identity, distance) in zip(pending, matches):
+                track.vote(identity, distance)
+                if self._is_match(identity, state["expected"]):
+                    state["matches"] += 1
+                self._consider(state, chunk[i], box, identity, distance)
+        return overlays
+
+    def _resolved(self, track, queued=0):
+        # Embeddings queued in this batch count as votes for the leading
+        # identity; a track that is still Unknown keeps being embedded.
+        identity = track.identity
+        if identity == "Unknown":
+            return False
+        return track.votes.get(identity, 0) + queued >= self.verify_matches
+
+    def _is_match(self, identity, expected):
+        return identity == expected if expected else identity != "Unknown"
+
+    def _consider(self, state, frame, box, identity, distance):
+        # Matches to the expected identity rank first, then by distance.
+        rank = (not self._is_match(identity, state["expected"]), distance)
+        best = state["best"]
+        if best is None or rank < best["rank"]:
+            state["best"] = {
+                "rank": rank,
+                "frame": frame.copy(),
+                "box": [int(v) for v in box],
+                "identity": identity,
+                "distance": distance,
+            }
+
+    def _draw(self, frame, track, box):
+        identity = track.identity
+        if identity is None:
+            return
+        annotate_frame(frame, box, identity, track.distances[identity])
+
+    def _save_best(self, best, ts):
+        writer = self.artifact_writer
+        frame, box = best["frame"], best["box"]
+        label = f"{best['identity']} ({best['distance']:.2f})"
+        name = f"{label}_{ts} V.jpg"
+        os.makedirs(self.annotated_dir, exist_ok=True)
+        os.makedirs(self.portrait_dir, exist_ok=True)
+
+        annotated_path = os.path.join(self.annotated_dir, name)
+        writer.write_image(
+            annotated_path,
+            lambda: annotate_frame(
+                frame.copy(), box, best["identity"], best["distance"]
+            ),
+        )
+
+        cropped_path = None
+        x1, y1, x2, y2 = (max(0, v) for v in box)
+        face = frame[y1:y2, x1:x2]
+        if face.size:
+            portrait = resize_with_padding(face)
+            for text, y in ((label, 20), (ts, 40)):
+                cv2.putText(
+                    portrait,
+                    text,
+                    (10, y),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    0.5,
+                    (0, 255, 0),
+                    2,
+                )
+            cropped_path = os.path.join(self.portrait_dir, name)
+            writer.write_image(cropped_path, portrait)
+        return {"annotatedPath": annotated_path, "croppedPath": cropped_path}
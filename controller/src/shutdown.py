@@ -0,0 +1,23 @@
+from src.services.attendance_service import face_recognition
+from src.services.logging_service import printt
+from src.services.metrics import metrics
+
+
+def shutdown_services(thread_pool, attendance_service, logger, outbox):
+    """Drains and closes everything behind the state machine.
+
+    Shared by the thread and asyncio runtimes. Call it once the sensors and
+    the state machine have stopped: queued recognition finishes, recognition
+    worker processes and their shared memory are released, and queued log
+    batches, outbox jobs and metrics are written out.
+    """
+    thread_pool.shutdown(drain=True)
+    printt(f"Worker pool: {thread_pool.stats()}")
+    printt(f"Tap cache: {attendance_service.tap_cache.stats()}")
+    if face_recognition.ready and hasattr(face_recognition.get(), "close"):
+        face_recognition.get().close()
+    logger.flush(timeout=5)
+    outbox.stop()
+    metrics.stop()
+    if metrics.enabled:
+        metrics.dump()
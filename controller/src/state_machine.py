@@ -1,15 +1,28 @@
+import heapq
+import itertools
 import queue
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from src.services.logging_service import printt
+from src.services.metrics import metrics
 
-LOOP_DELAY = 0.5
 ACTIVE_TIMEOUT = 20
 STREAMING_TIMEOUT = 60
 
 
 class StateMachine:
+    """IDLE/ACTIVE/STREAMING controller state driven by sensor events.
+
+    The event thread blocks until an event arrives or the earliest timer in
+    a deadline heap is due, so it does not wake at all while IDLE and
+    timeouts fire at their deadline. Hardware side effects of a transition
+    (camera boot, NFC power mode) and attendance handling run in order on a
+    separate action thread, so events queued behind a 2 s camera boot are
+    still handled at once.
+    """
+
     states = ["IDLE", "ACTIVE", "STREAMING"]
 
     def __init__(
@@ -23,25 +36,37 @@ class StateMachine:
         self.nfc_controller = nfc_controller
         self.camera_controller = camera_controller
         self.state = "IDLE"
-        self.event_queue = queue.Queue()
         self.running = True
-        self.last_motion_time = None
-        self.last_streaming_time = None
+        self.state_timer = None
         self.logging_service = logging_service
         self.api_service = api_service
         self.attendance_service = attendance_service
+        self.actions = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SM-Action")
+        self._start_event_loop()
 
+    def _start_event_loop(self):
+        """Sets up the event queue and timers and starts handling events."""
+        self.event_queue = queue.Queue()
+        self.timers = []
+        self.timer_ids = itertools.count()
+        self.timer_lock = threading.Lock()
         self.event_thread = threading.Thread(target=self.process_events, daemon=True)
         self.event_thread.start()
 
     def process_events(self):
-        """Continuously processes events from the queue."""
+        """Processes queued events and due timers until stopped."""
         while self.running:
             try:
-                event, data = self.event_queue.get(timeout=LOOP_DELAY)
-                self.handle_event(event, data)
+                event, data, queued_at = self.event_queue.get(
+                    timeout=self._time_to_next_timer()
+                )
             except queue.Empty:
                 pass
+            else:
+                # A None event only wakes the thread to re-read the timers.
+                if event is not None:
+                    metrics.since("event_queue_wait", queued_at)
+                    self.handle_event(event, data)
 
             self.check_timeouts()
 
@@ -49,6 +74,14 @@ class StateMachine:
         """Handles state transitions based on events."""
         printt(f"Event received: {event_name}")
 
+        if event_name == "nfc_scanned" and isinstance(event_data, dict):
+            # Tap-to-capture latency is reported per camera state at the tap.
+            camera_state = self.camera_controller.power_state
+            event_data = {**event_data, "camera_state": camera_state}
+
+        if event_name == "motion_detected":
+            self.nfc_controller.note_motion()
+
         if event_name in ["motion_detected", "nfc_scanned"] and self.state == "IDLE":
             self.transition_to("ACTIVE")
 
@@ -56,46 +89,93 @@ class StateMachine:
             self.state == "ACTIVE" or self.state == "STREAMING"
         ):
             self.transition_to("STREAMING")
-            self.attendance_service.handle_attendance_event(event_data)
+            self._run(self.attendance_service.handle_attendance_event, event_data)
 
     def transition_to(self, new_state):
-        """Executes the transition between states."""
+        """Switches state at once and queues the transition's side effects."""
         if self.state != new_state:
             printt(f"Transitioning from {self.state} to {new_state}")
             self.state = new_state
+            self.cancel(self.state_timer)
+            self.state_timer = None
 
             if new_state == "IDLE":
-                self.nfc_controller.enter_low_power_mode()
-                self.camera_controller.turn_off()
+                self._run(self.nfc_controller.enter_low_power_mode)
+                self._run(self.camera_controller.turn_off)
 
             elif new_state == "ACTIVE":
-                self.nfc_controller.exit_low_power_mode()
-                self.camera_controller.turn_on()
-                self.last_motion_time = time.time()
+                self._run(self.nfc_controller.exit_low_power_mode)
+                self._run(self.camera_controller.turn_on)
+                self.state_timer = self.schedule(ACTIVE_TIMEOUT, self._active_timeout)
 
             elif new_state == "STREAMING":
-                self.camera_controller.turn_on()
-                self.last_streaming_time = time.time()
+                self._run(self.camera_controller.turn_on)
+                self.state_timer = self.schedule(
+                    STREAMING_TIMEOUT, self._streaming_timeout
+                )
+
+    def schedule(self, delay, callback):
+        """Calls ``callback()`` on the event thread in ``delay`` seconds.
+
+        Returns a timer that can be passed to ``cancel``.
+        """
+        timer = [time.monotonic() + delay, next(self.timer_ids), callback]
+        with self.timer_lock:
+            heapq.heappush(self.timers, timer)
+        if threading.current_thread() is not self.event_thread:
+            self.event_queue.put((None, None, None))
+        return timer
+
+    def cancel(self, timer):
+        if timer is not None:
+            timer[2] = None
 
     def check_timeouts(self):
-        """Handles automatic time-based transitions."""
-        current_time = time.time()
-
-        if self.state == "ACTIVE" and self.last_motion_time:
-            if current_time - self.last_motion_time > ACTIVE_TIMEOUT:
-                printt("Timeout: No motion for 20s. Returning to IDLE.")
-                self.transition_to("IDLE")
-
-        elif self.state == "STREAMING" and self.last_streaming_time:
-            if current_time - self.last_streaming_time > STREAMING_TIMEOUT:
-                printt("Timeout: No NFC scan for 1 min. Returning to ACTIVE.")
-                self.transition_to("ACTIVE")
+        """Runs the timers that are due."""
+        current_time = time.monotonic()
+        while True:
+            with self.timer_lock:
+                if not self.timers or self.timers[0][0] > current_time:
+                    return
+                _, _, callback = heapq.heappop(self.timers)
+            if callback is not None:
+                callback()
 
     def send_event(self, event_name, event_data=None):
         """Adds an event to the queue for processing."""
-        self.event_queue.put((event_name, event_data))
+        self.event_queue.put((event_name, event_data, time.perf_counter()))
 
     def stop(self):
-        """Stops the state machine."""
+        """Stops the state machine once queued side effects have run."""
         self.running = False
+        self.event_queue.put((None, None, None))
         self.event_thread.join()
+        self.actions.shutdown(wait=True)
+
+    def _active_timeout(self):
+        printt(f"Timeout: No motion for {ACTIVE_TIMEOUT}s. Returning to IDLE.")
+        self.transition_to("IDLE")
+
+    def _streaming_timeout(self):
+        printt(f"Timeout: No NFC scan for {STREAMING_TIMEOUT}s. Returning to ACTIVE.")
+        self.transition_to("ACTIVE")
+
+    def _time_to_next_timer(self):
+        """Seconds until the earliest live timer, or None to wait for events."""
+        with self.timer_lock:
+            while self.timers and self.timers[0][2] is None:
+                heapq.heappop(self.timers)
+            if not self.timers:
+                return None
+            return max(0.0, self.timers[0][0] - time.monotonic())
+
+    def _run(self, func, *args):
+        """Queues a side effect on the action thread, logging its failure."""
+
+        def run():
+            try:
+                func(*args)
+            except Exception as e:
+                printt(f"Error in {getattr(func, '__name__', func)}: {e}")
+
+        return self.actions.submit(run)
@@ -1,8 +1,41 @@
 import sys
+import threading
 from unittest.mock import MagicMock
 
+import pytest
+
 sys.modules["busio"] = MagicMock()
 sys.modules["RPi"] = MagicMock()
 sys.modules["RPi.GPIO"] = MagicMock()
 sys.modules["adafruit_pn532.i2c"] = MagicMock()
 sys.modules["adafruit_pn532"] = MagicMock()
+sys.modules["picamera2"] = MagicMock()
+
+
+@pytest.fixture
+def stub_recognition_service(tmp_path):
+    """Returns a factory of FaceRecognitionServices with the given stub models.
+
+    The singleton is bypassed, so no weights or gallery files are loaded.
+    Artifacts go to tmp_path and the inference worker is running.
+    """
+
+    def make(mtcnn=None, embedder=None, gallery=None):
+        import torch
+        from src.services.artifact_writer import ArtifactWriter
+        from src.services.face_recognition_service import FaceRecognitionService
+        from src.services.gallery import EmbeddingGallery
+
+        service = object.__new__(FaceRecognitionService)
+        service.device = torch.device("cpu")
+        service.mtcnn = mtcnn
+        service.embedder = embedder
+        service.gallery_lock = threading.Lock()
+        service.gallery = gallery if gallery is not None else EmbeddingGallery()
+        service.CAPTURED_PHOTO_DIR = service.FRED_PIC_DIR = str(tmp_path)
+        service.LOG_FILE = str(tmp_path / "face_log.txt")
+        service.artifact_writer = ArtifactWriter()
+        service._start_inference_worker()
+        return service
+
+    return make
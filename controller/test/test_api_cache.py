@@ -0,0 +1,94 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from src.services.api_cache import APICache
+
+SCHEDULE = [{"id": "class-1", "startTime": "10:00:00", "endTime": "11:15:00"}]
+
+
+@pytest.fixture
+def api_service():
+    api_service = MagicMock()
+    api_service.get_if_changed.return_value = (SCHEDULE, 'W/"1"')
+    return api_service
+
+
+def test_fresh_entries_skip_the_api(api_service, tmp_path):
+    """Test that an entry younger than the TTL is served without a request."""
+    cache = APICache(api_service, str(tmp_path / "cache.json"), ttl=60)
+
+    assert cache.get("/schedule/PRLTA201") == SCHEDULE
+    assert cache.get("/schedule/PRLTA201") == SCHEDULE
+    api_service.get_if_changed.assert_called_once_with("/schedule/PRLTA201", etag=None)
+
+
+def test_stale_entries_are_revalidated(api_service, tmp_path):
+    """Test that a stale entry is revalidated with its ETag and kept on 304."""
+    cache = APICache(api_service, str(tmp_path / "cache.json"), ttl=0)
+    cache.get("/schedule/PRLTA201")
+    api_service.get_if_changed.return_value = (None, 'W/"1"')
+
+    assert cache.get("/schedule/PRLTA201") == SCHEDULE
+    cache.wait(timeout=5)
+    api_service.get_if_changed.assert_called_with("/schedule/PRLTA201", etag='W/"1"')
+
+
+def test_stale_entries_never_block_the_caller(api_service, tmp_path):
+    """Test that a stale entry is served while the API hangs or fails."""
+    cache = APICache(api_service, str(tmp_path / "cache.json"), ttl=60)
+    cache.get("/schedule/PRLTA201")
+    cache.entries["/schedule/PRLTA201"]["fetched"] -= 120
+    release = threading.Event()
+
+    def hang(endpoint, etag=None):
+        release.wait(timeout=5)
+        raise requests.ConnectionError("offline")
+
+    api_service.get_if_changed.side_effect = hang
+    start = time.perf_counter()
+    assert cache.get("/schedule/PRLTA201") == SCHEDULE
+    assert cache.get("/schedule/PRLTA201") == SCHEDULE
+    assert time.perf_counter() - start < 1
+    release.set()
+    cache.wait(timeout=5)
+
+    # The failure pushed the retry out by a TTL instead of retrying every call.
+    assert cache.get("/schedule/PRLTA201") == SCHEDULE
+    cache.wait(timeout=5)
+    assert api_service.get_if_changed.call_count == 2
+
+
+def test_listeners_only_see_changes(api_service, tmp_path):
+    """Test that listeners are called for new bodies but not for a 304."""
+    cache = APICache(api_service, str(tmp_path / "cache.json"), ttl=0)
+    changes = []
+    cache.add_listener(lambda endpoint, body: changes.append(endpoint))
+
+    cache.refresh("/schedule/PRLTA201")
+    api_service.get_if_changed.return_value = (None, 'W/"1"')
+    cache.refresh("/schedule/PRLTA201")
+
+    assert changes == ["/schedule/PRLTA201"]
+
+
+def test_boots_offline_from_disk(api_service, tmp_path):
+    """Test that a new cache serves the stored copy when the API is down."""
+    path = str(tmp_path / "cache.json")
+    APICache(api_service, path, ttl=0).get("/schedule/PRLTA201")
+
+    api_service.get_if_changed.side_effect = requests.ConnectionError("offline")
+    cache = APICache(api_service, path, ttl=0)
+
+    assert cache.get("/schedule/PRLTA201") == SCHEDULE
+
+
+def test_raises_without_a_cached_copy(api_service, tmp_path):
+    """Test that a miss with the API down raises the request error."""
+    api_service.get_if_changed.side_effect = requests.ConnectionError("offline")
+    cache = APICache(api_service, str(tmp_path / "cache.json"))
+
+    with pytest.raises(requests.ConnectionError):
+        cache.get("/schedule/PRLTA201")
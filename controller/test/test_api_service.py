@@ -4,90 +4,143 @@ from src.services.api_service import APIService
 import requests
 
 
+def _response(status_code, body=None, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = body
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(str(status_code))
+    return response
+
+
 class TestAPIService(unittest.TestCase):
     def setUp(self):
         self.base_url = "https://api.example.com"
         self.api_key = "test_api_key"
-        self.api_service = APIService(base_url=self.base_url, api_key=self.api_key)
+        APIService._instance = None
+        self.api_service = APIService(
+            base_url=self.base_url, api_key=self.api_key, backoff=0
+        )
+        patcher = patch.object(self.api_service.session, "request")
+        self.mock_request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, APIService, "_instance", None)
 
-    @patch("requests.get")
-    def test_get_success(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"message": "success"}
-        mock_get.return_value = mock_response
+    def test_get_success(self):
+        self.mock_request.return_value = _response(200, {"message": "success"})
 
         response = self.api_service.get("test-endpoint", params={"key": "value"})
         self.assertEqual(response, {"message": "success"})
-        mock_get.assert_called_once_with(
+        self.mock_request.assert_called_once_with(
+            "GET",
             f"{self.base_url}/test-endpoint",
+            timeout=self.api_service.timeout,
             headers=self.api_service.headers,
             params={"key": "value"},
         )
 
-    @patch("requests.post")
-    def test_post_success(self, mock_post):
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"message": "created"}
-        mock_post.return_value = mock_response
+    def test_post_success(self):
+        self.mock_request.return_value = _response(201, {"message": "created"})
 
         response = self.api_service.post("test-endpoint", json={"key": "value"})
         self.assertEqual(response, {"message": "created"})
-        mock_post.assert_called_once_with(
+        self.mock_request.assert_called_once_with(
+            "POST",
             f"{self.base_url}/test-endpoint",
+            timeout=self.api_service.timeout,
             headers=self.api_service.headers,
             json={"key": "value"},
         )
 
-    @patch("requests.put")
-    def test_put_success(self, mock_put):
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"message": "updated"}
-        mock_put.return_value = mock_response
+    def test_put_success(self):
+        self.mock_request.return_value = _response(200, {"message": "updated"})
 
         response = self.api_service.put("test-endpoint", json={"key": "value"})
         self.assertEqual(response, {"message": "updated"})
-        mock_put.assert_called_once_with(
+        self.mock_request.assert_called_once_with(
+            "PUT",
             f"{self.base_url}/test-endpoint",
+            timeout=self.api_service.timeout,
             headers=self.api_service.headers,
             json={"key": "value"},
         )
 
-    @patch("requests.delete")
-    def test_delete_success(self, mock_delete):
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"message": "deleted"}
-        mock_delete.return_value = mock_response
+    def test_delete_success(self):
+        self.mock_request.return_value = _response(200, {"message": "deleted"})
 
-        response = self.api_service.delete("test-endpoint")
+        response = self.api_service.delete("/test-endpoint")
         self.assertEqual(response, {"message": "deleted"})
-        mock_delete.assert_called_once_with(
+        self.mock_request.assert_called_once_with(
+            "DELETE",
             f"{self.base_url}/test-endpoint",
+            timeout=self.api_service.timeout,
             headers=self.api_service.headers,
         )
 
-    @patch("requests.get")
-    def test_get_failure(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.status_code = 404
-        mock_response.raise_for_status.side_effect = requests.HTTPError("Not Found")
-        mock_get.return_value = mock_response
+    def test_get_failure(self):
+        self.mock_request.return_value = _response(404)
 
         with self.assertRaises(requests.HTTPError):
             self.api_service.get("invalid-endpoint")
 
-    @patch("requests.post")
-    def test_post_failure(self, mock_post):
-        mock_response = MagicMock()
-        mock_response.status_code = 500
-        mock_response.raise_for_status.side_effect = requests.HTTPError("Server Error")
-        mock_post.return_value = mock_response
+    def test_post_failure(self):
+        self.mock_request.return_value = _response(500)
+
+        with self.assertRaises(requests.HTTPError):
+            self.api_service.post("test-endpoint", json={"key": "value"})
+
+    def test_per_call_timeout(self):
+        self.mock_request.return_value = _response(200, {})
+
+        self.api_service.get("test-endpoint", timeout=(1, 2))
+        self.assertEqual(self.mock_request.call_args.kwargs["timeout"], (1, 2))
+
+    def test_idempotent_requests_are_retried(self):
+        self.mock_request.side_effect = [
+            requests.ConnectionError("reset"),
+            _response(503),
+            _response(200, {"message": "updated"}),
+        ]
+
+        response = self.api_service.put("test-endpoint", json={"key": "value"})
+        self.assertEqual(response, {"message": "updated"})
+        self.assertEqual(self.mock_request.call_count, 3)
+
+    def test_retries_give_up(self):
+        self.mock_request.side_effect = requests.Timeout("slow")
+
+        with self.assertRaises(requests.Timeout):
+            self.api_service.get("test-endpoint")
+        self.assertEqual(self.mock_request.call_count, self.api_service.retries + 1)
+
+    @patch("src.services.api_service.time.sleep")
+    def test_retry_after_is_honored(self, sleep):
+        self.mock_request.side_effect = [
+            _response(429, headers={"Retry-After": "2"}),
+            _response(200, {"message": "ok"}),
+        ]
+
+        self.assertEqual(self.api_service.get("test-endpoint"), {"message": "ok"})
+        sleep.assert_called_once_with(2.0)
+
+    @patch("src.services.api_service.time.sleep")
+    def test_long_retry_after_is_not_waited_out(self, sleep):
+        self.mock_request.return_value = _response(
+            429, headers={"Retry-After": "Wed, 21 Oct 2099 07:28:00 GMT"}
+        )
 
         with self.assertRaises(requests.HTTPError):
+            self.api_service.get("test-endpoint")
+        self.assertEqual(self.mock_request.call_count, 1)
+        sleep.assert_not_called()
+
+    def test_post_is_not_retried(self):
+        self.mock_request.side_effect = requests.ConnectionError("reset")
+
+        with self.assertRaises(requests.ConnectionError):
             self.api_service.post("test-endpoint", json={"key": "value"})
+        self.assertEqual(self.mock_request.call_count, 1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+import pytest
+from src.services.artifact_writer import ArtifactWriter
+
+
+def _image(width=8, height=8):
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+
+def _blocked_writer(**kwargs):
+    """Creates a writer whose thread is stuck on a first render job."""
+    started = threading.Event()
+    release = threading.Event()
+    writer = ArtifactWriter(**kwargs)
+
+    def render():
+        started.set()
+        release.wait(timeout=5)
+        return _image()
+
+    writer.write_image(os.devnull, render)
+    started.wait(timeout=5)
+    return writer, release
+
+
+def test_writes_images_in_background(tmp_path):
+    """Test that queued images end up on disk."""
+    writer = ArtifactWriter()
+    path = tmp_path / "frame.jpg"
+
+    assert writer.write_image(str(path), _image())
+    writer.flush()
+
+    assert path.exists()
+    assert writer.written == 1
+
+
+def test_renders_callables_on_writer_thread(tmp_path):
+    """Test that a render callable runs on the writer thread, not the caller."""
+    writer = ArtifactWriter()
+    threads = []
+
+    def render():
+        threads.append(threading.current_thread().name)
+        return _image()
+
+    writer.write_image(str(tmp_path / "annotated.jpg"), render)
+    writer.flush()
+
+    assert threads == ["Artifact-Writer"]
+
+
+def test_appends_text_and_writes_bytes(tmp_path):
+    """Test that log lines are appended and encoded bytes written as-is."""
+    writer = ArtifactWriter()
+    log = tmp_path / "face_log.txt"
+    writer.append_text(str(log), "a\n")
+    writer.append_text(str(log), "b\n")
+    writer.write_bytes(str(tmp_path / "raw.bin"), b"\x01\x02")
+    writer.flush()
+
+    assert log.read_text() == "a\nb\n"
+    assert (tmp_path / "raw.bin").read_bytes() == b"\x01\x02"
+
+
+def test_limits_resolution_and_quality(tmp_path):
+    """Test that images wider than max_width are scaled down when encoded."""
+    writer = ArtifactWriter(max_width=100, jpeg_quality=50)
+    path = tmp_path / "frame.jpg"
+    writer.write_image(str(path), _image(400, 200))
+    writer.flush()
+
+    assert cv2.imread(str(path)).shape == (50, 100, 3)
+
+
+def test_drop_newest_rejects_jobs_when_full(tmp_path):
+    """Test that a full queue drops new jobs instead of blocking the caller."""
+    writer, release = _blocked_writer(max_pending=1)
+    accepted = [writer.write_bytes(str(tmp_path / f"{i}"), b"x") for i in range(3)]
+    release.set()
+    writer.flush()
+
+    assert accepted == [True, False, False]
+    assert writer.dropped == 2
+    assert (tmp_path / "0").exists()
+
+
+def test_drop_oldest_keeps_newest_job(tmp_path):
+    """Test that drop_oldest evicts queued jobs to make room for new ones."""
+    writer, release = _blocked_writer(max_pending=1, overflow="drop_oldest")
+    accepted = [writer.write_bytes(str(tmp_path / f"{i}"), b"x") for i in range(3)]
+    release.set()
+    writer.flush()
+
+    assert accepted == [True, True, True]
+    assert writer.dropped == 2
+    assert not (tmp_path / "0").exists()
+    assert (tmp_path / "2").exists()
+
+
+def test_block_applies_back_pressure_then_drops(tmp_path):
+    """Test that the block policy waits for room before giving up."""
+    writer, release = _blocked_writer(
+        max_pending=1, overflow="block", block_timeout=0.05
+    )
+    assert writer.write_bytes(str(tmp_path / "0"), b"x") is True
+    assert writer.write_bytes(str(tmp_path / "1"), b"x") is False
+    release.set()
+    writer.flush()
+    assert writer.dropped == 1
+
+
+def test_rejects_unknown_policy():
+    """Test that an unknown overflow policy is rejected."""
+    with pytest.raises(ValueError):
+        ArtifactWriter(overflow="drop_everything")
+
+
+def test_queues_a_shrunk_copy_of_arrays(tmp_path):
+    """Test that a queued image is copied and scaled down when it is queued."""
+    writer, release = _blocked_writer(max_width=100)
+    image = _image(400, 200)
+    writer.write_image(str(tmp_path / "frame.jpg"), image)
+    image[:] = 255
+
+    _, _, queued = writer.queue.queue[-1]
+    assert queued.shape == (50, 100, 3)
+    assert not queued.any()
+    release.set()
+    writer.flush()
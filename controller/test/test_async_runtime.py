@@ -0,0 +1,75 @@
+import asyncio
+import threading
+from unittest.mock import Mock
+
+from src import shutdown as shutdown_module
+from src import state_machine as state_machine_module
+from src.async_runtime import AsyncStateMachine
+
+
+def _state_machine():
+    return AsyncStateMachine(Mock(), Mock(), Mock(), Mock(), Mock())
+
+
+def test_events_from_threads_drive_transitions():
+    """Test that events sent from sensor threads are handled on the loop."""
+
+    async def run():
+        sm = _state_machine()
+        task = asyncio.create_task(sm.process_events())
+        sender = threading.Thread(
+            target=lambda: (
+                sm.send_event("motion_detected"),
+                sm.send_event("nfc_scanned", {"card_id": "A"}),
+            )
+        )
+        sender.start()
+        sender.join()
+        await asyncio.sleep(0.05)
+        state = sm.state
+        await sm.stop()
+        await task
+        return sm, state
+
+    sm, state = asyncio.run(run())
+
+    assert state == "STREAMING"
+    sm.camera_controller.turn_on.assert_called()
+    [event], _ = sm.attendance_service.handle_attendance_event.call_args
+    assert event["card_id"] == "A"
+
+
+def test_timeouts_fire_on_the_loop(monkeypatch):
+    """Test that the ACTIVE timeout is a loop timer returning to IDLE."""
+    monkeypatch.setattr(state_machine_module, "ACTIVE_TIMEOUT", 0.1)
+
+    async def run():
+        sm = _state_machine()
+        task = asyncio.create_task(sm.process_events())
+        sm.send_event("motion_detected")
+        await asyncio.sleep(0.05)
+        states = [sm.state]
+        await asyncio.sleep(0.1)
+        states.append(sm.state)
+        await sm.stop()
+        await task
+        return sm, states
+
+    sm, states = asyncio.run(run())
+
+    assert states == ["ACTIVE", "IDLE"]
+    sm.camera_controller.turn_off.assert_called_once()
+
+
+def test_shutdown_flushes_logs_and_closes_recognition(monkeypatch):
+    """Test that both runtimes' shutdown flushes logs and closes worker processes."""
+    recognizer = Mock(ready=True)
+    monkeypatch.setattr(shutdown_module, "face_recognition", recognizer)
+    thread_pool, attendance_service, logger, outbox = Mock(), Mock(), Mock(), Mock()
+
+    shutdown_module.shutdown_services(thread_pool, attendance_service, logger, outbox)
+
+    thread_pool.shutdown.assert_called_once_with(drain=True)
+    recognizer.get.return_value.close.assert_called_once()
+    logger.flush.assert_called_once_with(timeout=5)
+    outbox.stop.assert_called_once()
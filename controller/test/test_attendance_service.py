@@ -0,0 +1,415 @@
+import json
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from src.services import attendance_service as attendance_module
+from src.services.api_service import APIService
+from src.services.attendance_service import AttendanceService, ClassSchedule
+from src.services.outbox import Outbox
+from src.services.tap_cache import TapCache
+from src.services.thread_pool import PoolFull, ThreadPool
+
+ROUND_TRIP = 0.02
+STUDENTS = [f"student-{i}" for i in range(500)]
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Local stand-in for the attendance API with a fixed per-request latency."""
+
+    daemon_threads = True
+
+    def __init__(self, bulk=True):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.bulk = bulk
+        self.lock = threading.Lock()
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(ROUND_TRIP)
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path.endswith("/attendance/bulk"):
+                if not server.bulk:
+                    self.send_error(404)
+                    return
+                payload = [
+                    {"id": f"att-{s}", "studentId": s} for s in body["studentIds"]
+                ]
+            else:
+                payload = {"id": f"att-{body['studentId']}"}
+            data = json.dumps(payload).encode()
+            self.send_response(201)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+def _serve(bulk):
+    server = StandInServer(bulk)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def api_service():
+    previous = APIService._instance
+    APIService._instance = None
+    service = APIService(base_url="", api_key="test_api_key")
+    yield service
+    APIService._instance = previous
+
+
+def _attendance_service(api_service):
+    service = object.__new__(AttendanceService)
+    service.api_service = api_service
+    service.bulk_attendance_supported = True
+    service.sessions = {}
+    service.session_locks = {}
+    service.session_thread = None
+    service.session_retry_at = 0.0
+    return service
+
+
+def _create_roster(api_service, bulk):
+    server = _serve(bulk)
+    api_service.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    service = _attendance_service(api_service)
+    try:
+        start = time.perf_counter()
+        ids = service.create_attendance_records("session-1", STUDENTS)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+    return service, server, ids, elapsed
+
+
+def test_bulk_roster_uses_one_request(api_service):
+    """Test that a 500 student roster is created with a single bulk request."""
+    _, server, ids, elapsed = _create_roster(api_service, bulk=True)
+
+    assert ids == {s: f"att-{s}" for s in STUDENTS}
+    assert server.requests == ["/session/session-1/attendance/bulk"]
+    assert elapsed < len(STUDENTS) * ROUND_TRIP / 10
+
+
+def test_falls_back_to_bounded_parallel_posts(api_service):
+    """Test the per-student fallback when the bulk endpoint is missing."""
+    service, server, ids, elapsed = _create_roster(api_service, bulk=False)
+
+    assert ids == {s: f"att-{s}" for s in STUDENTS}
+    assert len(server.requests) == len(STUDENTS) + 1
+    assert 1 < server.max_in_flight <= 8
+    assert elapsed < len(STUDENTS) * ROUND_TRIP / 2
+    assert service.bulk_attendance_supported is False
+
+
+CLASS_1 = {"id": "class-1", "startTime": "09:00:00", "endTime": "09:50:00"}
+CLASS_2 = {"id": "class-2", "startTime": "10:00:00", "endTime": "10:50:00"}
+
+
+def test_scans_are_queued_while_offline(tmp_path):
+    """Test that a scan made offline is uploaded once and logged when back."""
+    outbox = Outbox(str(tmp_path / "outbox.db"), drain_rate=0, backoff=0.01)
+    api = MagicMock()
+    api.post.side_effect = [
+        requests.ConnectionError("offline"),
+        {"message": {"fileUrl": "https://example.com/portrait.jpg"}},
+    ]
+    api.put.side_effect = [requests.ConnectionError("offline"), {}]
+
+    service = _attendance_service(api)
+    service.outbox = outbox
+    service.current_class = CLASS_1
+    service.current_session = {"id": "session-1"}
+    session_key = service._session_key(service._session_data(CLASS_1, date.today()))
+    service.sessions = {session_key: ({"id": "session-1"}, {"card-1": "att-1"})}
+    outbox.register("attendance", service._send_attendance)
+
+    service.record_attendance("card-1", "Jane Doe", "portrait.jpg", b"jpeg")
+    outbox.start()
+    assert outbox.drain(timeout=5)
+    outbox.stop()
+
+    assert api.post.call_count == 2
+    _, kwargs = api.put.call_args
+    assert api.put.call_args.args == ("/attendance/att-1",)
+    assert kwargs["json"]["portraitUrl"] == "https://example.com/portrait.jpg"
+    assert kwargs["json"]["FRIdentifiedId"] == "Jane Doe"
+    assert kwargs["headers"]["Idempotency-Key"]
+
+
+def test_offline_scan_is_sent_to_the_session_of_its_tap(tmp_path):
+    """Test that a scan queued without a session is attributed to its own class."""
+    outbox = Outbox(str(tmp_path / "outbox.db"), drain_rate=0, backoff=0.01)
+    api = MagicMock()
+    api.post.side_effect = lambda endpoint, json=None, **kwargs: {
+        "id": f"session-{json['classId']}"
+    }
+    service = _attendance_service(api)
+    service.api_cache = MagicMock()
+    service.api_cache.get.return_value = ["card-1"]
+    service.create_attendance_records = lambda session_id, ids: {
+        s: f"{session_id}:{s}" for s in ids
+    }
+    service.outbox = outbox
+    service.current_class = CLASS_1
+    service.studentId_to_attendanceId = {}
+    outbox.register("attendance", service._send_attendance)
+
+    # Tapped offline during class 1, delivered once class 2 has started.
+    service.record_attendance("card-1", "Jane Doe", "portrait.jpg", None)
+    service.current_class = CLASS_2
+    assert service.create_session() == {"id": "session-class-2"}
+    outbox.start()
+    assert outbox.drain(timeout=5)
+    outbox.stop()
+
+    assert api.put.call_args.args == ("/attendance/session-class-1:card-1",)
+    assert service.studentId_to_attendanceId == {"card-1": "session-class-2:card-1"}
+    assert api.post.call_count == 2
+
+
+def test_class_schedule_matches_end_time_scan():
+    """Test that the bisect lookup agrees with scanning the sorted schedule."""
+    schedule = [
+        {"id": "c", "endTime": "15:00:00"},
+        {"id": "a", "endTime": "09:15:00"},
+        {"id": "b", "endTime": "11:45:00"},
+    ]
+    lookup = ClassSchedule(schedule)
+    by_end = sorted(schedule, key=lambda x: x["endTime"])
+
+    for hour in range(24):
+        for minute in range(0, 60, 5):
+            now = f"{hour:02d}:{minute:02d}"
+            expected = next((c for c in by_end if now < c["endTime"]), by_end[0])
+            assert lookup.current(now) == expected
+    assert ClassSchedule(None).current("10:00") is None
+
+
+def test_class_schedule_near_boundary():
+    """Test that times close to a class start or end count as near a boundary."""
+    lookup = ClassSchedule(
+        [
+            {"id": "a", "startTime": "09:00:00", "endTime": "09:50:00"},
+            {"id": "b", "startTime": "11:00:00", "endTime": "12:15:00"},
+        ]
+    )
+    assert lookup.near_boundary("08:55:00", 600)
+    assert lookup.near_boundary("09:58:00", 600)
+    assert lookup.near_boundary("12:20", 600)
+    assert not lookup.near_boundary("10:20:00", 600)
+    assert not lookup.near_boundary("13:00:00", 600)
+    assert not ClassSchedule(None).near_boundary("09:00:00", 600)
+
+
+def _tapping_service():
+    service = _attendance_service(MagicMock())
+    service.tap_cache = TapCache(ttl=10)
+    service.camera_controller = MagicMock()
+    service.camera_controller.recent_frames.return_value = []
+    service.thread_pool = MagicMock()
+    service.current_class = CLASS_1
+    service.current_session = {"id": "session-1"}
+    service.get_current_class = lambda: service.current_class
+    return service
+
+
+def test_repeat_taps_skip_the_camera():
+    """Test that a repeat tap within the window never reaches the camera."""
+    service = _tapping_service()
+
+    service.handle_attendance_event({"card_id": "card-1"})
+    service.handle_attendance_event({"card_id": "card-1"})
+    service.handle_attendance_event({"card_id": "card-2"})
+
+    assert service.camera_controller.capture_array.call_count == 2
+    assert service.thread_pool.submit_with_priority.call_count == 2
+    assert service.tap_cache.stats()["hits"] == 1
+
+
+def test_recognised_student_is_skipped_for_the_session(monkeypatch):
+    """Test that a recognised student's later taps are dropped for the session."""
+    service = _tapping_service()
+    service.record_attendance = MagicMock()
+    recognizer = MagicMock()
+    recognizer.get.return_value.run_on_frames.return_value = [
+        {
+            "identity": "Jane Doe",
+            "croppedPath": "a/jane.jpg",
+            "croppedImage": b"x",
+            "confidence": 0.8,
+            "frames": 2,
+        }
+    ]
+    monkeypatch.setattr(attendance_module, "face_recognition", recognizer)
+
+    service.handle_attendance_event({"card_id": "card-1"})
+    args = service.thread_pool.submit_with_priority.call_args.args
+    args[1](*args[2:])
+
+    # Past the debounce window, within the session.
+    later = time.monotonic() + 60
+    with patch("src.services.tap_cache.time.monotonic", return_value=later):
+        service.handle_attendance_event({"card_id": "card-1"})
+        service.current_class = CLASS_2
+        service.current_session = {"id": "session-2"}
+        service.handle_attendance_event({"card_id": "card-1"})
+
+    assert service.camera_controller.capture_array.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "identity, confidence",
+    [("Jane Doe", 0.1), ("Jane Doe", None), ("Unknown", 0.0)],
+)
+def test_untrusted_recognition_only_debounces(monkeypatch, identity, confidence):
+    """Test that a weak or unknown match does not block the card for the session."""
+    pytest.importorskip("cv2")
+    service = _tapping_service()
+    service.record_attendance = MagicMock()
+    recognizer = MagicMock()
+    recognizer.get.return_value.run_on_frames.return_value = [
+        {
+            "identity": identity,
+            "croppedPath": "a/jane.jpg",
+            "croppedImage": b"x",
+            "confidence": confidence,
+            "frames": 5,
+        }
+    ]
+    monkeypatch.setattr(attendance_module, "face_recognition", recognizer)
+
+    service.handle_attendance_event({"card_id": "card-1"})
+    args = service.thread_pool.submit_with_priority.call_args.args
+    args[1](*args[2:])
+
+    later = time.monotonic() + 60
+    with patch("src.services.tap_cache.time.monotonic", return_value=later):
+        service.handle_attendance_event({"card_id": "card-1"})
+
+    assert service.camera_controller.capture_array.call_count == 2
+
+
+def test_taps_do_not_wait_for_an_unreachable_api():
+    """Test that taps offline are captured at once and the session is retried later."""
+    service = _tapping_service()
+    service.current_session = None
+    service.api_cache = MagicMock()
+
+    def post(endpoint, json=None, **kwargs):
+        time.sleep(0.5)
+        raise requests.ConnectionError("offline")
+
+    service.api_service.post.side_effect = post
+
+    start = time.perf_counter()
+    for i in range(5):
+        service.handle_attendance_event({"card_id": f"card-{i}"})
+    elapsed = time.perf_counter() - start
+    service.session_thread.join(timeout=5)
+    service.handle_attendance_event({"card_id": "card-5"})
+
+    assert elapsed < 0.2
+    assert service.camera_controller.capture_array.call_count == 6
+    # One attempt for the class, then none until the retry interval passes.
+    assert service.api_service.post.call_count == 1
+    assert service.current_session is None
+
+
+def test_session_is_opened_in_the_background():
+    """Test that the session opened after a tap is used by later taps."""
+    service = _tapping_service()
+    service.current_session = None
+    service.api_cache = MagicMock()
+    service.api_cache.get.return_value = ["card-1"]
+    service.api_service.post.return_value = {"id": "session-1"}
+    service.create_attendance_records = lambda session_id, ids: {
+        s: f"att-{s}" for s in ids
+    }
+
+    service.handle_attendance_event({"card_id": "card-1"})
+    service.session_thread.join(timeout=5)
+
+    assert service.current_session == {"id": "session-1"}
+    assert service.studentId_to_attendanceId == {"card-1": "att-card-1"}
+
+
+def test_failed_capture_allows_another_tap():
+    """Test that a tap whose capture failed can be retried at once."""
+    service = _tapping_service()
+    service.camera_controller.capture_array.side_effect = [RuntimeError("busy"), 0]
+
+    service.handle_attendance_event({"card_id": "card-1"})
+    service.handle_attendance_event({"card_id": "card-1"})
+
+    assert service.thread_pool.submit_with_priority.call_count == 1
+
+
+def test_scan_rejected_by_a_full_pool_is_recorded():
+    """Test that a scan the pool has no room for is recorded and can be retried."""
+    service = _tapping_service()
+    service.record_attendance = MagicMock()
+    service.thread_pool = ThreadPool(num_workers=0, max_pending=0, overflow="reject")
+
+    future = service.handle_attendance_event({"card_id": "card-1", "tapped_at": 5.0})
+
+    assert isinstance(future.exception(), PoolFull)
+    service.record_attendance.assert_called_once()
+    student_id, identity, _, portrait, tapped_at = (
+        service.record_attendance.call_args.args
+    )
+    assert (student_id, identity, portrait, tapped_at) == (
+        "card-1",
+        "Unknown",
+        None,
+        5.0,
+    )
+    session = service._session_data(CLASS_1, date.today())
+    assert service.tap_cache.get(service._tap_key("card-1", session)) is None
+
+
+def test_late_recognition_keeps_the_class_and_time_of_its_tap(monkeypatch):
+    """Test that a scan recognised after the class changed is recorded for its tap."""
+    service = _tapping_service()
+    service.outbox = MagicMock()
+    recognizer = MagicMock()
+    recognizer.get.return_value.run_on_frames.return_value = [
+        {"identity": "Jane Doe", "croppedPath": "a/jane.jpg", "croppedImage": b"x"}
+    ]
+    monkeypatch.setattr(attendance_module, "face_recognition", recognizer)
+
+    with patch.object(attendance_module.time, "strftime", return_value="09:49:59"):
+        service.handle_attendance_event({"card_id": "card-1"})
+    # The recognition only runs once the next class has started.
+    service.current_class = CLASS_2
+    args = service.thread_pool.submit_with_priority.call_args.args
+    args[1](*args[2:])
+
+    payload = service.outbox.add.call_args.args[1]
+    assert payload["session"]["classId"] == "class-1"
+    assert payload["checkIn"] == "09:49:59"
+    assert service.outbox.add.call_args.kwargs["ordering_key"].startswith("class-1:")
@@ -1,11 +1,44 @@
+import numpy as np
 import pytest
+import time
+from unittest.mock import MagicMock
+from src.controllers import camera as camera_module
 from src.controllers.camera import CameraController
 
 
+class YUVMappedArray:
+    """Stands in for picamera2's MappedArray over a 640x480 YUV420 lores frame."""
+
+    def __init__(self, request, stream):
+        # A Y plane of 480 rows followed by the quarter-size U and V planes.
+        self.array = np.full((720, 640), 128, dtype=np.uint8)
+        self.array[:480] = np.arange(640, dtype=np.uint8)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture(autouse=True)
+def no_warmup(monkeypatch):
+    """Skips the auto exposure wait in boot()."""
+    monkeypatch.setattr(camera_module, "CAMERA_WARMUP", 0)
+
+
+@pytest.fixture(autouse=True)
+def yuv_frames(monkeypatch):
+    """Maps every lores request as a realistic YUV420 frame."""
+    monkeypatch.setattr(camera_module, "MappedArray", YUVMappedArray)
+
+
 @pytest.fixture
 def camera():
-    """Creates a CameraController instance."""
-    return CameraController()
+    """Creates a CameraController instance that turns off without delay."""
+    camera = CameraController(idle_off=0)
+    yield camera
+    camera.stop_buffering()
 
 
 def test_camera_initial_state(camera):
@@ -31,3 +64,136 @@ def test_camera_turn_off(camera):
     camera.turn_on()
     camera.turn_off()
     assert camera.active is False
+
+
+def test_capture_array_returns_frame_without_saving(camera):
+    """Test that capture_array hands back the frame and writes nothing."""
+    camera.boot()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    camera.camera.switch_mode_and_capture_array.return_value = frame
+
+    assert camera.capture_array(filename="capture_1.jpg") is frame
+    camera.camera.switch_mode_and_capture_array.assert_called_once_with(
+        camera.still_config, "main"
+    )
+    camera.camera.switch_mode_and_capture_file.assert_not_called()
+    assert camera.writer is None
+
+
+def test_capture_array_saves_in_background_when_enabled():
+    """Test that raw frames are handed to the background writer when enabled."""
+    camera = CameraController(save_captures=True)
+    camera.writer = MagicMock()
+    camera.writer.shrink.side_effect = lambda image: image.copy()
+    camera.boot()
+    frame = np.zeros((4, 4, 3), dtype=np.uint8)
+    camera.camera.switch_mode_and_capture_array.return_value = frame
+
+    camera.capture_array(filename="capture_1.jpg")
+    frame[:] = 255
+
+    path, render = camera.writer.write_image.call_args[0]
+    assert path.endswith("capture_1.jpg")
+    assert render().shape == (4, 4, 3)
+    assert not render().any()
+
+
+def test_capture_writer_has_its_own_settings():
+    """Test that raw captures do not inherit the recognition artifact limits."""
+    camera = CameraController(save_captures=True)
+    assert camera.writer.max_width == camera_module.CAPTURE_MAX_WIDTH
+    assert camera.writer.jpeg_quality == camera_module.CAPTURE_JPEG_QUALITY
+    assert camera.writer.queue.maxsize == camera_module.CAPTURE_QUEUE_SIZE
+
+
+def test_capture_array_requires_camera_on(camera):
+    """Test that capturing with the camera off raises."""
+    with pytest.raises(Exception):
+        camera.capture_array()
+
+
+def test_turn_on_starts_and_turn_off_stops_buffering(camera):
+    """Test that the ring buffer only fills while the camera is on."""
+    camera.turn_on()
+    assert camera.buffering.is_set()
+    camera.turn_off()
+    assert not camera.buffering.is_set()
+    assert camera.buffer_thread is None
+
+
+def test_recent_frames_returns_buffered_frames(camera):
+    """Test that recent_frames returns the frames pushed into the buffer."""
+    camera.frame_buffer.push(np.full((480, 640, 3), 7, dtype=np.uint8))
+    frames = camera.recent_frames()
+    assert len(frames) == 1
+    assert frames[0][0, 0, 0] == 7
+
+
+def test_lores_frames_are_converted_into_preallocated_slots(camera, monkeypatch):
+    """Test that buffering converts YUV420 frames in place without errors."""
+    cv2 = pytest.importorskip("cv2")
+    monkeypatch.setattr(camera_module, "BUFFER_FPS", 200)
+    log = MagicMock()
+    monkeypatch.setattr(camera_module, "printt", log)
+    convert = cv2.cvtColor
+    targets = []
+
+    def spy(src, code, dst=None):
+        targets.append(dst)
+        return convert(src, code, dst=dst)
+
+    monkeypatch.setattr(cv2, "cvtColor", spy)
+    slots = camera.frame_buffer.frames
+
+    camera.turn_on()
+    deadline = time.monotonic() + 5
+    while len(targets) <= camera.frame_buffer.capacity:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    camera.stop_buffering()
+
+    frames = camera.recent_frames()
+    expected = convert(YUVMappedArray(None, "lores").array, cv2.COLOR_YUV420p2RGB)
+    assert len(frames) == camera.frame_buffer.capacity
+    assert all(frame.shape == (480, 640, 3) for frame in frames)
+    assert all(np.array_equal(frame, expected) for frame in frames)
+    # Every frame was written into a slot of the one preallocated array.
+    assert camera.frame_buffer.frames is slots
+    assert all(
+        target is not None and np.shares_memory(target, slots) for target in targets
+    )
+    assert not [c for c in log.call_args_list if "Error" in str(c.args[0])]
+
+
+def test_standby_keeps_camera_open_until_idle_period():
+    """Test that turn_off() keeps the stream warm and closes it later."""
+    camera = CameraController(idle_off=0.2)
+    camera.turn_on()
+    picamera = camera.camera
+    picamera.reset_mock()
+    camera.turn_off()
+
+    assert camera.power_state == "standby"
+    picamera.close.assert_not_called()
+    time.sleep(0.3)
+    assert camera.power_state == "off"
+    picamera.close.assert_called_once()
+
+
+def test_turn_on_from_standby_skips_boot(monkeypatch):
+    """Test that waking from standby reuses the open camera."""
+    camera = CameraController(idle_off=0.2)
+    camera.turn_on()
+    picamera = camera.camera
+    picamera.reset_mock()
+    camera.turn_off()
+    monkeypatch.setattr(camera, "boot", MagicMock())
+
+    camera.turn_on()
+    time.sleep(0.3)
+
+    camera.boot.assert_not_called()
+    assert camera.camera is picamera
+    assert camera.power_state == "warm"
+    picamera.close.assert_not_called()
+    camera.stop_buffering()
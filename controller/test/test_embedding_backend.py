@@ -0,0 +1,108 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+facenet_pytorch = pytest.importorskip("facenet_pytorch")
+
+from PIL import Image
+from src.services.embedding_backend import create_embedder
+
+PHOTO_DIRS = [
+    os.path.join(os.path.dirname(__file__), "../data/registered_photos"),
+    os.path.join(
+        os.path.dirname(__file__), "../../poc/Facial Recognition/registered_photo"
+    ),
+]
+
+# Max L2 distance between reference and backend embeddings. The match
+# threshold is 0.9, so these leave identities unchanged.
+FLOAT_TOLERANCE = 1e-4
+INT8_TOLERANCE = 0.05
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+# The ONNX backend is optional and installed from requirements-onnx.txt.
+needs_onnx = pytest.mark.skipif(onnxruntime is None, reason="onnxruntime not installed")
+
+
+def _load_model():
+    # Random weights would make the int8 tolerance meaningless, so the
+    # parity tests only run against the real model.
+    try:
+        return facenet_pytorch.InceptionResnetV1(pretrained="vggface2")
+    except Exception:
+        pytest.skip("pretrained weights unavailable")
+
+
+@pytest.fixture(scope="module")
+def model():
+    return _load_model().eval()
+
+
+@pytest.fixture(scope="module")
+def faces():
+    """Aligned face tensors cropped from the registered photos."""
+    paths = [p for d in PHOTO_DIRS for p in sorted(glob.glob(os.path.join(d, "*.jpg")))]
+    if not paths:
+        pytest.skip("No registered photos available")
+    mtcnn = facenet_pytorch.MTCNN(keep_all=False)
+    crops = [mtcnn(Image.open(p).convert("RGB")) for p in paths]
+    return torch.stack([c for c in crops if c is not None])
+
+
+@pytest.fixture(scope="module")
+def reference(model, faces):
+    return create_embedder(lambda: model, torch.device("cpu"), backend="torch")(faces)
+
+
+@pytest.mark.parametrize(
+    "backend, quantize, tolerance",
+    [
+        ("torchscript", False, FLOAT_TOLERANCE),
+        ("torchscript", True, INT8_TOLERANCE),
+        pytest.param("onnx", False, FLOAT_TOLERANCE, marks=needs_onnx),
+        pytest.param("onnx", True, INT8_TOLERANCE, marks=needs_onnx),
+    ],
+)
+def test_backend_matches_reference(
+    backend, quantize, tolerance, model, faces, reference, tmp_path_factory
+):
+    """Test that exported backends stay within tolerance of the eager model."""
+    model_dir = tmp_path_factory.mktemp(backend)
+    embedder = create_embedder(
+        lambda: model,
+        torch.device("cpu"),
+        backend=backend,
+        quantize=quantize,
+        model_dir=str(model_dir),
+    )
+
+    embeddings = embedder(faces)
+
+    assert embeddings.shape == reference.shape
+    drift = np.linalg.norm(embeddings - reference, axis=1)
+    assert drift.max() < tolerance
+
+
+@needs_onnx
+def test_exported_model_is_reused(model, faces, tmp_path):
+    """Test that an exported model file is loaded instead of re-exported."""
+    create_embedder(lambda: model, None, backend="onnx", model_dir=str(tmp_path))
+
+    def fail():
+        raise AssertionError("model should not be rebuilt")
+
+    embedder = create_embedder(fail, None, backend="onnx", model_dir=str(tmp_path))
+    assert embedder(faces[:1]).shape == (1, 512)
+
+
+def test_unknown_backend_raises(model):
+    """Test that an unknown backend name is rejected."""
+    with pytest.raises(ValueError):
+        create_embedder(lambda: model, None, backend="tensorrt")
@@ -0,0 +1,208 @@
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("facenet_pytorch")
+pytest.importorskip("cv2")
+
+from src.services import face_recognition_service
+from src.services.gallery import EmbeddingGallery, IVFPQIndex, load_index
+
+
+class StubMTCNN:
+    """Detects one face per frame at a box set per frame width."""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+    def detect(self, images, landmarks=False):
+        batch = isinstance(images, list)
+        found = [self._detect(img) for img in (images if batch else [images])]
+        boxes, probs, points = (list(x) for x in zip(*found))
+        if not batch:
+            return boxes[0], probs[0], points[0]
+        return boxes, probs, points
+
+    def _detect(self, img):
+        box, prob = self.boxes.get(img.width, (None, None))
+        if box is None:
+            return None, None, None
+        return np.array([box], dtype=float), np.array([prob]), np.zeros((1, 5, 2))
+
+    def extract(self, img, boxes, save_path):
+        # Encode the frame width in the face tensor so embeddings identify it.
+        return torch.full((len(boxes), 3, 160, 160), float(img.width))
+
+
+class StubEmbedder:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, faces):
+        self.batches.append(len(faces))
+        embeddings = np.zeros((len(faces), 512), dtype=np.float32)
+        for i, face in enumerate(faces):
+            embeddings[i, int(face[0, 0, 0]) % 512] = 1.0
+        return embeddings
+
+
+@pytest.fixture
+def service(stub_recognition_service):
+    """Creates a service whose gallery knows the lores and still frame widths."""
+    return stub_recognition_service(
+        embedder=StubEmbedder(),
+        gallery=EmbeddingGallery(
+            ["lores", "still"], np.eye(512, dtype=np.float32)[[320 % 512, 1280 % 512]]
+        ),
+    )
+
+
+def _frame(width, height):
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+
+def test_burst_picks_face_with_best_score(service):
+    """Test that the largest, most confident face across a burst wins."""
+    service.mtcnn = StubMTCNN(
+        {
+            320: ([0, 0, 200, 220], 0.99),  # fills most of the lores frame
+            1280: ([0, 0, 300, 400], 0.99),  # small in the full-res still
+        }
+    )
+
+    results = service.run_on_frames([_frame(320, 240), _frame(1280, 960)], "tap")
+
+    assert [r["identity"] for r in results] == ["lores"]
+    assert service.embedder.batches == [1]
+
+
+def test_burst_scales_size_filter_to_lores_frames(service):
+    """Test that small boxes in low-resolution frames are not filtered out."""
+    service.mtcnn = StubMTCNN({320: ([0, 0, 30, 40], 0.9), 1280: (None, None)})
+
+    results = service.run_on_frames([_frame(320, 240), _frame(1280, 960)], "tap")
+
+    assert [r["identity"] for r in results] == ["lores"]
+
+
+def test_burst_without_faces_returns_no_results(service):
+    """Test that a burst with no detections produces an empty result list."""
+    service.mtcnn = StubMTCNN({})
+    assert service.run_on_frames([_frame(320, 240), _frame(1280, 960)]) == []
+
+
+def test_single_array_keeps_size_filter(service):
+    """Test that a single frame still drops faces smaller than 80x100."""
+    service.mtcnn = StubMTCNN({1280: ([0, 0, 60, 90], 0.99)})
+    assert service.run_on_array(_frame(1280, 960), "tap") == []
+
+
+class NoisyEmbedder:
+    """Returns embeddings near the "still" identity, too noisy to match alone."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, faces):
+        self.batches.append(len(faces))
+        embeddings = np.zeros((len(faces), 512), dtype=np.float32)
+        for i in range(len(faces)):
+            noise = (len(self.batches) * 7 + i) % 512
+            embeddings[i, 1280 % 512] = 1.0
+            embeddings[i, noise] = 1.5
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def test_burst_stops_once_confident(service):
+    """Test that a clear face is embedded once even with more frames buffered."""
+    box = ([0, 0, 200, 220], 0.99)
+    service.mtcnn = StubMTCNN({320: box, 640: box, 1280: box})
+
+    results = service.run_on_frames(
+        [_frame(320, 240), _frame(640, 480), _frame(1280, 960)], "tap"
+    )
+
+    assert service.embedder.batches == [1]
+    assert results[0]["frames"] == 1
+    assert results[0]["confidence"] == pytest.approx(1.0)
+
+
+def test_burst_votes_across_noisy_frames(service):
+    """Test that frames too noisy to match alone are recognised together."""
+    service.embedder = NoisyEmbedder()
+    service.mtcnn = StubMTCNN(
+        {
+            320: ([40, 30, 240, 210], 0.99),
+            640: ([80, 60, 480, 420], 0.99),
+            1280: ([160, 120, 960, 840], 0.99),
+        }
+    )
+
+    frames = [_frame(320, 240), _frame(640, 480), _frame(1280, 960)]
+    results = service.run_on_frames(frames, "tap")
+
+    assert [r["identity"] for r in results] == ["still"]
+    assert results[0]["frames"] == 3
+    assert service.embedder.batches == [1, 1, 1]
+
+
+def test_bursts_in_one_batch_share_forward_passes(service):
+    """Test that concurrent bursts are embedded together, round by round."""
+    box = ([0, 0, 200, 220], 0.99)
+    service.mtcnn = StubMTCNN({320: box, 1280: box})
+    burst = [_frame(320, 240), _frame(1280, 960)]
+    futures = [Future(), Future()]
+
+    service._run_batch([(burst, "a", futures[0]), (list(burst), "b", futures[1])])
+
+    assert service.embedder.batches == [2]
+    assert all(f.result()[0]["frames"] == 1 for f in futures)
+
+
+def test_detect_and_identify_run_on_the_inference_thread(service):
+    """Test that video requests are served by the inference worker in batches."""
+    service.mtcnn = StubMTCNN(
+        {320: ([0, 0, 200, 220], 0.99), 1280: ([0, 0, 40, 40], 0.99)}
+    )
+    threads = []
+    embedder = service.embedder
+    service.embedder = lambda faces: (
+        threads.append(threading.current_thread().name) or embedder(faces)
+    )
+    frames = [_frame(320, 240), _frame(1280, 960)]
+
+    boxes = service.detect(frames).result(timeout=5)
+    matches = service.identify(frames, [boxes[0], [[0, 0, 300, 400]]]).result(timeout=5)
+
+    # The small face in the still is dropped by the size filter.
+    assert [len(b) for b in boxes] == [1, 0]
+    assert [identity for identity, _ in matches] == ["lores", "still"]
+    assert embedder.batches == [2]
+    assert threads == ["FR-Inference"]
+
+
+def test_enrolling_past_the_training_size_builds_the_ivfpq_index(
+    stub_recognition_service, monkeypatch, tmp_path
+):
+    """Test that an exact stand-in gallery is rebuilt as IVF-PQ when it fills up."""
+    monkeypatch.setattr(face_recognition_service, "GALLERY_INDEX", "ivfpq")
+    size = IVFPQIndex.MIN_TRAIN_SIZE
+    rng = np.random.default_rng(5)
+    vectors = rng.normal(size=(size, 512)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    service = stub_recognition_service(
+        gallery=IVFPQIndex.from_dict(
+            {f"S{i:04d}": v for i, v in enumerate(vectors[:-1])}
+        )
+    )
+    service.INDEX_FILE = str(tmp_path / "gallery_ivfpq.npz")
+    assert isinstance(service.gallery, EmbeddingGallery)
+
+    service.enroll("Ada", vectors[-1])
+
+    assert isinstance(service.gallery, IVFPQIndex)
+    assert isinstance(load_index(service.INDEX_FILE), IVFPQIndex)
+    assert service._compare_batch(vectors[-1:])[0][0] == "Ada"
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+from PIL import Image
+
+from src.services.face_scoring import IdentityVote, face_quality, plan_burst
+
+FRONTAL = [[30, 40], [70, 40], [50, 60], [35, 80], [65, 80]]
+TURNED = [[30, 40], [70, 40], [75, 60], [35, 80], [65, 80]]
+
+
+def _textured(width=200, height=200, blur=0):
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    if blur:
+        image = cv2.GaussianBlur(image, (0, 0), blur)
+    return Image.fromarray(image)
+
+
+def _unit(*weights):
+    vector = np.zeros(512, dtype=np.float32)
+    vector[: len(weights)] = weights
+    return vector / np.linalg.norm(vector)
+
+
+def test_quality_prefers_sharp_large_frontal_faces():
+    """Test that blur, a small box and a turned head each lower the score."""
+    sharp, blurred = _textured(), _textured(blur=4)
+    box = [0, 0, 100, 120]
+
+    best = face_quality(sharp, box, 0.99, FRONTAL)
+    assert 0 < best <= 1
+    assert face_quality(blurred, box, 0.99, FRONTAL) < best
+    assert face_quality(sharp, [0, 0, 50, 60], 0.99, FRONTAL) < best
+    assert face_quality(sharp, box, 0.99, TURNED) < best
+    assert face_quality(sharp, box, 0.80, FRONTAL) < best
+
+
+def test_plan_keeps_the_main_track():
+    """Test that a passer-by's face is left out and the rest sorted by quality."""
+    frame = _textured(400, 300)
+    main = np.array([[100, 50, 300, 290]], dtype=float)
+    both = np.array([[100, 50, 300, 290], [0, 0, 40, 50]], dtype=float)
+    candidates = [(None, frame)] * 3
+    detections = [
+        (main, np.array([0.90]), np.zeros((1, 5, 2)), None),
+        (both, np.array([0.99, 0.99]), np.zeros((2, 5, 2)), None),
+        (main, np.array([0.95]), np.zeros((1, 5, 2)), None),
+    ]
+
+    plan = plan_burst(candidates, detections)
+
+    assert [(i, j) for _, i, j in plan] == [(1, 0), (2, 0), (0, 0)]
+    assert plan_burst(candidates, [([], [], [], None)] * 3) == []
+
+
+def test_mean_embedding_recovers_noisy_frames():
+    """Test that two frames each too far to match average into a match."""
+    target = _unit(1)
+    frames = [_unit(1, 1.5), _unit(1, 0, 1.5)]
+    assert all(np.linalg.norm(f - target) > 0.9 for f in frames)
+
+    vote = IdentityVote()
+    for frame in frames:
+        vote.add(frame, "Unknown", 0.5)
+    distance = float(np.linalg.norm(vote.mean_embedding() - target))
+
+    assert distance < 0.9
+    assert vote.decide(("Jane Doe", distance, np.inf)) == 0.0
+    assert vote.done(remaining=[]) and not vote.done(remaining=[1])
+
+
+def test_confident_vote_is_done():
+    """Test that confidence weighs the vote share by the match distance."""
+    vote = IdentityVote()
+    vote.add(_unit(1), "Jane Doe", 0.9)
+    vote.add(_unit(0, 1), "John Roe", 0.3)
+
+    confidence = vote.decide(("Jane Doe", 0.3, 1.2))
+
+    assert confidence == pytest.approx(0.75 * (1 - 0.3 / 0.9))
+    assert vote.done(remaining=[1], threshold=0.4)
+    assert not vote.done(remaining=[1], threshold=0.6)
+    assert vote.done(remaining=[1], threshold=0.6, max_frames=2)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from src.controllers.frame_buffer import FrameRingBuffer
+
+
+@pytest.fixture
+def buffer():
+    """Creates a ring buffer holding three 4x6 RGB frames."""
+    return FrameRingBuffer(capacity=3, height=4, width=6)
+
+
+def _frame(value):
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+
+def test_buffer_starts_empty(buffer):
+    """Test that a new buffer has no frames."""
+    assert len(buffer) == 0
+    assert buffer.snapshot().shape == (0, 4, 6, 3)
+
+
+def test_buffer_keeps_newest_frames_in_order(buffer):
+    """Test that the buffer overwrites the oldest frame once full."""
+    for value in range(5):
+        buffer.push(_frame(value), timestamp=value)
+
+    snapshot = buffer.snapshot()
+    assert len(buffer) == 3
+    assert [frame[0, 0, 0] for frame in snapshot] == [2, 3, 4]
+
+
+def test_buffer_does_not_reallocate(buffer):
+    """Test that writing frames reuses the preallocated storage."""
+    storage = buffer.frames
+    for value in range(10):
+        buffer.write(lambda slot: slot.fill(value))
+
+    assert buffer.frames is storage
+    assert buffer.nbytes == 3 * 4 * 6 * 3 + 3 * 8
+
+
+def test_snapshot_is_a_copy(buffer):
+    """Test that later writes do not change a snapshot already taken."""
+    buffer.push(_frame(1))
+    snapshot = buffer.snapshot()
+    buffer.push(_frame(9))
+    buffer.push(_frame(9))
+    buffer.push(_frame(9))
+    assert snapshot[0, 0, 0, 0] == 1
+
+
+def test_snapshot_since_filters_by_timestamp(buffer):
+    """Test that only frames newer than the cut-off are returned."""
+    for value in range(3):
+        buffer.push(_frame(value), timestamp=10.0 + value)
+
+    snapshot = buffer.snapshot(since=11.0)
+    assert [frame[0, 0, 0] for frame in snapshot] == [1, 2]
+
+
+def test_clear_empties_buffer(buffer):
+    """Test that clear drops buffered frames."""
+    buffer.push(_frame(1))
+    buffer.clear()
+    assert len(buffer) == 0
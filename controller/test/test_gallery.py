@@ -0,0 +1,200 @@
+import numpy as np
+import pytest
+from src.services.gallery import (
+    EmbeddingGallery,
+    IVFPQIndex,
+    create_index,
+    grow_index,
+    load_index,
+)
+
+
+def _unit(rows):
+    rows = np.asarray(rows, dtype=np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def gallery():
+    """Creates a gallery with three random unit embeddings."""
+    rng = np.random.default_rng(0)
+    embeddings = _unit(rng.normal(size=(3, 512)))
+    return EmbeddingGallery.from_dict(
+        {"Alice": embeddings[0], "Bob": embeddings[1], "E2EEC801": embeddings[2]}
+    )
+
+
+def test_gallery_is_contiguous_matrix(gallery):
+    """Test that the gallery stores one (N, 512) float32 matrix."""
+    assert gallery.matrix.shape == (3, 512)
+    assert gallery.matrix.dtype == np.float32
+    assert gallery.matrix.flags["C_CONTIGUOUS"]
+    assert list(gallery.ids) == ["Alice", "Bob", "E2EEC801"]
+
+
+def test_match_matches_python_loop(gallery):
+    """Test that batched matching agrees with a per-identity loop."""
+    rng = np.random.default_rng(1)
+    queries = gallery.matrix[[2, 0]] + 0.01 * rng.normal(size=(2, 512))
+
+    matches = gallery.match(queries)
+
+    for query, (identity, distance, runner_up) in zip(queries, matches):
+        dists = sorted(
+            (float(np.linalg.norm(query - emb)), name)
+            for name, emb in zip(gallery.ids, gallery.matrix)
+        )
+        assert identity == dists[0][1]
+        assert distance == pytest.approx(dists[0][0], abs=1e-4)
+        assert runner_up == pytest.approx(dists[1][0], abs=1e-4)
+
+
+def test_match_unknown_above_threshold(gallery):
+    """Test that a distant face is reported as Unknown."""
+    query = -gallery.matrix[0]
+    identity, distance, _ = gallery.match(query)[0]
+    assert identity == "Unknown"
+    assert distance > 0.9
+
+
+def test_search_top_k_sorted(gallery):
+    """Test that search returns k sorted neighbours per query."""
+    dist, ids = gallery.search(gallery.matrix, k=3)
+    assert dist.shape == (3, 3)
+    assert list(ids[:, 0]) == ["Alice", "Bob", "E2EEC801"]
+    assert np.all(np.diff(dist, axis=1) >= 0)
+
+
+def test_empty_gallery_returns_unknown():
+    """Test that matching against an empty gallery is safe."""
+    gallery = EmbeddingGallery.from_dict({})
+    assert gallery.match(np.zeros(512)) == [("Unknown", float("inf"), float("inf"))]
+
+
+def test_add_and_remove_identities(gallery):
+    """Test that identities can be added, replaced and removed in place."""
+    new = _unit(np.ones((1, 512)))
+    gallery.add(["Carol"], new)
+    assert gallery.match(new)[0][0] == "Carol"
+
+    gallery.remove(["Alice", "Carol"])
+    assert len(gallery) == 2
+    assert "Alice" not in gallery
+    assert gallery.match(gallery.matrix)[0][0] == gallery.ids[0]
+
+
+def test_brute_force_round_trip(gallery, tmp_path):
+    """Test that a saved gallery loads back with the same contents."""
+    path = tmp_path / "gallery_brute.npz"
+    gallery.save(path)
+    loaded = load_index(path)
+    assert isinstance(loaded, EmbeddingGallery)
+    assert list(loaded.ids) == list(gallery.ids)
+    np.testing.assert_allclose(loaded.matrix, gallery.matrix)
+
+
+@pytest.fixture
+def campus():
+    """Creates 2,000 identities with low intrinsic dimension, like face embeddings."""
+    rng = np.random.default_rng(2)
+    latent = rng.normal(size=(2000, 32)) @ rng.normal(size=(32, 512))
+    vectors = _unit(latent + 0.3 * rng.normal(size=latent.shape))
+    ids = [f"S{i:04d}" for i in range(len(vectors))]
+    return ids, vectors
+
+
+def test_ivfpq_recall_against_exact(campus):
+    """Test that the approximate index finds the same identity as the exact one."""
+    ids, vectors = campus
+    index = IVFPQIndex(n_lists=32, n_probe=8)
+    index.build(ids, vectors)
+
+    rng = np.random.default_rng(3)
+    picks = rng.choice(len(ids), 100, replace=False)
+    queries = _unit(vectors[picks] + 0.02 * rng.normal(size=(100, 512)))
+
+    _, found = index.search(queries, k=1)
+    assert found.shape == (100, 1)
+    recall = np.mean([found[i, 0] == ids[p] for i, p in enumerate(picks)])
+    assert recall >= 0.95
+    assert index.nbytes < vectors.astype(np.float32).nbytes / 4
+
+
+def test_ivfpq_incremental_updates_and_persistence(campus, tmp_path):
+    """Test that the approximate index supports add/remove and save/load."""
+    ids, vectors = campus
+    index = IVFPQIndex(n_lists=32, n_probe=32)
+    index.build(ids[:1500], vectors[:1500])
+
+    index.add(ids[1500:], vectors[1500:])
+    index.remove([ids[0]])
+    assert len(index) == 1999
+    assert index.search(vectors[0], k=1)[1][0, 0] != ids[0]
+    assert index.search(vectors[1800], k=1)[1][0, 0] == ids[1800]
+
+    path = tmp_path / "gallery_ivfpq.npz"
+    index.save(path)
+    loaded = load_index(path)
+    assert isinstance(loaded, IVFPQIndex)
+    assert len(loaded) == 1999
+    np.testing.assert_allclose(
+        loaded.search(vectors[:5], k=2)[0], index.search(vectors[:5], k=2)[0]
+    )
+
+
+def test_ivfpq_matches_faces_enrolled_after_training(campus):
+    """Test that a face added after training is encoded well enough to match."""
+    ids, vectors = campus
+    # Asking for one list per identity must not leave near-zero residuals.
+    index = IVFPQIndex(n_lists=1000)
+    index.build(ids[:1000], vectors[:1000])
+    assert index.n_lists <= 1000 // IVFPQIndex.MIN_LIST_SIZE
+
+    index.add(ids[1500:1510], vectors[1500:1510])
+    matches = index.match(vectors[1500:1510])
+    assert [identity for identity, _, _ in matches] == ids[1500:1510]
+
+
+def test_ivfpq_falls_back_to_exact_for_small_galleries():
+    """Test that a gallery too small to train on is built as an exact index."""
+    rng = np.random.default_rng(4)
+    vectors = _unit(rng.normal(size=(6, 512)))
+    index = IVFPQIndex.from_dict({f"S{i}": v for i, v in enumerate(vectors[:5])})
+    assert isinstance(index, EmbeddingGallery)
+
+    index.add(["S5"], vectors[5:])
+    assert index.match(vectors[5])[0][0] == "S5"
+    with pytest.raises(ValueError):
+        IVFPQIndex().train(vectors)
+
+
+def test_small_ivfpq_gallery_grows_into_an_index(campus):
+    """Test that an exact stand-in becomes an IVF-PQ index at MIN_TRAIN_SIZE."""
+    ids, vectors = campus
+    size = IVFPQIndex.MIN_TRAIN_SIZE
+    gallery = IVFPQIndex.from_dict(dict(zip(ids[: size - 1], vectors[: size - 1])))
+    assert grow_index(gallery, "ivfpq") is gallery
+
+    gallery.add(ids[size - 1 : size], vectors[size - 1 : size])
+    grown = grow_index(gallery, "ivfpq")
+    assert isinstance(grown, IVFPQIndex)
+    assert len(grown) == size
+    assert grown.search(vectors[size - 1], k=1)[1][0, 0] == ids[size - 1]
+    assert grow_index(grown, "ivfpq") is grown
+    assert grow_index(gallery, "brute") is gallery
+
+
+def test_empty_indexes_round_trip(tmp_path):
+    """Test that empty and untrained indexes can be saved and loaded."""
+    for kind in ("brute", "ivfpq"):
+        path = tmp_path / f"gallery_{kind}.npz"
+        create_index(kind).save(path)
+        loaded = load_index(path)
+        assert len(loaded) == 0
+        assert loaded.match(np.zeros(512))[0][0] == "Unknown"
+
+
+def test_unknown_index_kind_names_the_choices():
+    """Test that an unknown GALLERY_INDEX raises a ValueError listing the kinds."""
+    with pytest.raises(ValueError, match="brute, ivfpq"):
+        create_index("hnsw")
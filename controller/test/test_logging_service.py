@@ -1,8 +1,9 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from src.services.logging_service import LoggingService
+from src.services.logging_service import LoggingService, printt
 from src.services.api_service import APIService
 import requests
+import time
 
 
 class TestLoggingService(unittest.TestCase):
@@ -10,6 +11,7 @@ class TestLoggingService(unittest.TestCase):
         LoggingService._instance = None
         self.mock_api_service = MagicMock(spec=APIService)
         self.logging_service = LoggingService(self.mock_api_service)
+        self.addCleanup(setattr, LoggingService, "_instance", None)
 
     @patch("src.services.api_service.requests.post")
     def test_log_success(self, mock_post):
@@ -19,7 +21,7 @@ class TestLoggingService(unittest.TestCase):
         mock_response.json.return_value = {"message": "Log recorded"}
 
         mock_post.return_value = mock_response
-        self.mock_api_service.post.return_value = mock_response
+        self.mock_api_service.post.return_value = mock_response.json.return_value
 
         response_json = self.logging_service.log(
             action="TEST_ACTION",
@@ -93,6 +95,69 @@ class TestLoggingService(unittest.TestCase):
             },
         )
 
+    def test_printt_ships_batches(self):
+        """Test that printt entries are shipped together to the batch endpoint"""
+        for i in range(3):
+            printt(f"event {i}")
+        self.assertTrue(self.logging_service.flush(timeout=5))
+
+        self.mock_api_service.post.assert_called_once()
+        endpoint, kwargs = self.mock_api_service.post.call_args
+        self.assertEqual(endpoint, ("/log/batch",))
+        self.assertEqual(
+            [entry["action"] for entry in kwargs["json"]["logs"]],
+            ["event 0", "event 1", "event 2"],
+        )
+        self.assertEqual(self.logging_service.stats()["shipped"], 3)
+
+    def test_printt_does_not_wait_for_api(self):
+        """Test that printt returns while the API is still busy"""
+        self.mock_api_service.post.side_effect = lambda *a, **k: time.sleep(0.5)
+
+        start = time.perf_counter()
+        printt("slow API")
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertTrue(self.logging_service.flush(timeout=5))
+
+    @patch("src.services.logging_service.LOG_BUFFER_SIZE", 2)
+    def test_full_buffer_drops_entries(self):
+        """Test that entries beyond the buffer size are dropped and counted"""
+        LoggingService._instance = None
+        logging_service = LoggingService(self.mock_api_service)
+
+        accepted = [logging_service.enqueue(f"event {i}") for i in range(5)]
+
+        self.assertEqual(accepted, [True, True, False, False, False])
+        self.assertEqual(logging_service.stats()["dropped"], 3)
+
+    def test_falls_back_to_single_entries(self):
+        """Test that logs are posted one by one without the batch endpoint"""
+        not_found = requests.HTTPError("Not Found")
+        not_found.response = MagicMock(status_code=404)
+
+        def post(endpoint, json=None):
+            if endpoint == "/log/batch":
+                raise not_found
+            return {}
+
+        self.mock_api_service.post.side_effect = post
+        self.logging_service.enqueue("first")
+        self.logging_service.enqueue("second")
+        self.assertTrue(self.logging_service.flush(timeout=5))
+
+        endpoints = [c.args[0] for c in self.mock_api_service.post.call_args_list]
+        self.assertEqual(endpoints, ["/log/batch", "/log", "/log"])
+        self.assertEqual(self.logging_service.stats()["shipped"], 2)
+
+    def test_failed_batches_are_counted(self):
+        """Test that batches the API rejects are counted as failed"""
+        self.mock_api_service.post.side_effect = requests.RequestException("down")
+        self.logging_service.enqueue("lost")
+        self.assertTrue(self.logging_service.flush(timeout=5))
+
+        self.assertEqual(self.logging_service.stats()["failed"], 1)
+        self.mock_api_service.post.assert_called_once()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,82 @@
+import json
+import socket
+import time
+import urllib.request
+
+import numpy as np
+import pytest
+from src.services.metrics import Histogram, Metrics, _NULL_TIMER
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_histogram_percentiles_are_close():
+    """Test that percentiles are within the 5% bucket width of the exact values."""
+    samples = np.random.default_rng(0).lognormal(mean=-3, sigma=1, size=5000)
+    histogram = Histogram()
+    for sample in samples:
+        histogram.observe(float(sample))
+
+    for q in (0.5, 0.95, 0.99):
+        exact = np.quantile(samples, q)
+        assert histogram.percentile(q) == pytest.approx(exact, rel=0.06)
+    assert histogram.summary()["count"] == 5000
+
+
+def test_disabled_metrics_record_nothing():
+    """Test that disabled metrics hand out the shared no-op timer."""
+    metrics = Metrics(enabled=False)
+
+    with metrics.timer("detect"):
+        pass
+    metrics.observe("embed", 0.1)
+    metrics.since("pool_wait", 0.0)
+
+    assert metrics.timer("detect") is _NULL_TIMER
+    assert metrics.snapshot() == {}
+
+
+def test_timer_and_since_record_stages():
+    """Test that timers and queue-wait stamps feed per-stage histograms."""
+    metrics = Metrics(enabled=True)
+
+    with metrics.timer("detect"):
+        pass
+    metrics.since("pool_wait", None)
+    metrics.observe("embed", 0.05)
+
+    snapshot = metrics.snapshot()
+    assert set(snapshot) == {"detect", "embed"}
+    assert snapshot["embed"]["p99"] == pytest.approx(0.05, rel=0.06)
+
+
+def test_dump_and_endpoint(tmp_path):
+    """Test the dump file and the local HTTP endpoint."""
+    metrics = Metrics(enabled=True)
+    metrics.observe("capture", 0.02)
+    port = _free_port()
+    metrics.start(dump_path=str(tmp_path / "metrics.json"), interval=60, port=port)
+
+    metrics.dump(str(tmp_path / "metrics.json"))
+    with open(tmp_path / "metrics.json") as f:
+        assert f.read().count('"capture"') == 1
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        assert json.load(response)["capture"]["count"] == 1
+    metrics.stop()
+    assert metrics.dump_thread is None
+
+
+def test_stop_ends_the_dump_thread(tmp_path):
+    """Test that stop wakes the dump thread instead of waiting out its interval."""
+    metrics = Metrics(enabled=True)
+    metrics.start(dump_path=str(tmp_path / "metrics.json"), interval=3600, port=None)
+    thread = metrics.dump_thread
+
+    start = time.perf_counter()
+    metrics.stop()
+    assert time.perf_counter() - start < 1
+    assert not thread.is_alive()
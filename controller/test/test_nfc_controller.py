@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import Mock, patch
-from src.controllers.nfc import NFCController
+from src.controllers.nfc import NFCController, PollingScheduler
 
 
 @pytest.fixture
@@ -33,3 +33,73 @@ def test_nfc_exit_low_power_mode(mock_nfc):
 
     mock_nfc.exit_low_power_mode()
     assert mock_nfc.low_power is False
+
+
+def test_scheduler_backs_off_when_quiet():
+    """Test that the poll interval grows gradually up to the slow interval."""
+    scheduler = PollingScheduler(fast=0.2, slow=1.0, backoff=2, busy_window=30)
+    scheduler.note_activity()
+    assert scheduler.next_interval() == 0.2
+
+    scheduler.last_activity -= 60
+    assert [scheduler.next_interval() for _ in range(4)] == [0.4, 0.8, 1.0, 1.0]
+
+
+def test_scheduler_fast_when_active_or_near_class():
+    """Test that active mode and a nearby class boundary keep polling fast."""
+    near = Mock(return_value=False)
+    scheduler = PollingScheduler(fast=0.2, slow=1.0, class_window=600, near_class=near)
+    assert scheduler.next_interval() == 1.0
+
+    scheduler.active = True
+    assert scheduler.next_interval() == 0.2
+
+    scheduler.active = False
+    near.return_value = True
+    assert scheduler.next_interval() == 0.2
+    near.assert_called_with(600)
+
+    near.side_effect = RuntimeError("no schedule")
+    assert scheduler.next_interval() == pytest.approx(0.3)
+
+
+def test_nfc_motion_speeds_up_polling(mock_nfc):
+    """Test that motion switches the scheduler to the fast interval."""
+    assert not mock_nfc.scheduler.busy()
+    mock_nfc.note_motion()
+    assert mock_nfc.scheduler.next_interval() == mock_nfc.scheduler.fast
+
+
+def test_nfc_dedup_per_card(mock_nfc):
+    """Test that a held card is reported once but other cards are not held up."""
+    mock_nfc.recent_cards.ttl = 3
+    with patch("src.services.tap_cache.time.monotonic", return_value=100.0):
+        assert mock_nfc._is_new_tap("A") is True
+        assert mock_nfc._is_new_tap("A") is False
+        assert mock_nfc._is_new_tap("B") is True
+    with patch("src.services.tap_cache.time.monotonic", return_value=102.5):
+        assert mock_nfc._is_new_tap("A") is False
+    with patch("src.services.tap_cache.time.monotonic", return_value=106.0):
+        assert mock_nfc._is_new_tap("A") is True
+
+
+def test_nfc_reads_back_to_back_taps():
+    """Test that consecutive students are reported without a fixed pause."""
+    reads = iter([b"\x01", b"\x01", None, b"\x02", b"\x03", b"\x03"])
+    sm = Mock()
+    reader = Mock()
+    nfc = NFCController(
+        pn532=reader, scheduler=PollingScheduler(fast=0.001, slow=0.001)
+    )
+
+    def read_passive_target(timeout):
+        try:
+            return next(reads)
+        except StopIteration:
+            nfc.stopped.set()
+
+    reader.read_passive_target.side_effect = read_passive_target
+    nfc.read_nfc(sm)
+
+    cards = [c.args[1]["card_id"] for c in sm.send_event.call_args_list]
+    assert cards == ["01", "02", "03"]
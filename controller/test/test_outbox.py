@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+from src.services.outbox import Outbox
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"), drain_rate=0, backoff=0.01)
+    yield outbox
+    outbox.stop()
+
+
+def test_delivers_and_removes_jobs(outbox):
+    """Test that added jobs reach their handler and leave the table."""
+    sent = []
+    outbox.register("request", lambda jobs: sent.extend(j.payload for j in jobs))
+    outbox.start()
+
+    outbox.add("request", {"n": 1})
+    outbox.add("request", {"n": 2})
+
+    assert outbox.drain(timeout=5)
+    assert sent == [{"n": 1}, {"n": 2}]
+    assert outbox.stats()["sent"] == 2
+
+
+def test_jobs_survive_restart(tmp_path):
+    """Test that jobs added before a restart are delivered afterwards."""
+    path = str(tmp_path / "outbox.db")
+    Outbox(path).add("request", {"n": 1}, blob=b"jpeg")
+
+    outbox = Outbox(path, drain_rate=0)
+    received = []
+    outbox.register("request", lambda jobs: received.extend(jobs))
+    assert outbox.stats()["pending"] == 1
+    outbox.start()
+
+    assert outbox.drain(timeout=5)
+    assert received[0].payload == {"n": 1}
+    assert received[0].blob == b"jpeg"
+    outbox.stop()
+
+
+def test_duplicate_keys_are_ignored(outbox):
+    """Test that re-adding a job with the same idempotency key is a no-op."""
+    outbox.add("request", {"n": 1}, key="scan-1")
+    outbox.add("request", {"n": 1}, key="scan-1")
+
+    assert outbox.stats()["pending"] == 1
+
+
+def test_orders_jobs_with_the_same_key(outbox):
+    """Test that a failing job holds back later jobs with its ordering key."""
+    sent = []
+    failures = [ValueError("rejected")]
+
+    def handler(jobs):
+        for job in jobs:
+            if job.payload == "a1" and failures:
+                raise failures.pop()
+            sent.append(job.payload)
+
+    outbox.register("request", handler)
+    outbox.add("request", "a1", ordering_key="a")
+    outbox.add("request", "a2", ordering_key="a")
+    outbox.add("request", "b1", ordering_key="b")
+    outbox.start()
+
+    assert outbox.drain(timeout=5)
+    assert sent.index("a1") < sent.index("a2")
+    assert sent.index("b1") < sent.index("a1")
+
+
+def test_keeps_payload_changes_between_attempts(outbox):
+    """Test that progress saved in the payload survives a failed attempt."""
+    uploads = []
+
+    def handler(jobs):
+        job = jobs[0]
+        if job.payload["url"] is None:
+            uploads.append(job.key)
+            job.payload["url"] = "https://example.com/1.jpg"
+            raise requests.ConnectionError("offline")
+
+    outbox.register("attendance", handler)
+    outbox.add("attendance", {"url": None})
+    outbox.start()
+
+    assert outbox.drain(timeout=5)
+    assert len(uploads) == 1
+
+
+def test_offline_pauses_without_using_attempts(tmp_path):
+    """Test that connection errors are retried without counting attempts."""
+    outbox = Outbox(str(tmp_path / "outbox.db"), drain_rate=0, backoff=0.01)
+    online = threading.Event()
+    calls = []
+
+    def handler(jobs):
+        calls.append(time.monotonic())
+        if not online.is_set():
+            raise requests.ConnectionError("offline")
+
+    outbox.register("attendance", handler)
+    outbox.max_attempts = 2
+    outbox.add("attendance", {})
+    outbox.start()
+    time.sleep(0.3)
+    online.set()
+
+    assert outbox.drain(timeout=5)
+    assert len(calls) > 2
+    assert outbox.stats()["dead"] == 0
+    outbox.stop()
+
+
+def test_gives_up_after_max_attempts(outbox):
+    """Test that a job that keeps failing is marked dead."""
+    outbox.max_attempts = 2
+
+    def handler(jobs):
+        raise ValueError("rejected")
+
+    outbox.register("request", handler)
+    outbox.add("request", {})
+    outbox.start()
+
+    assert outbox.drain(timeout=5)
+    assert outbox.stats()["dead"] == 1
+
+
+def test_limit_rejects_jobs(outbox):
+    """Test that a kind's pending limit rejects and counts new jobs."""
+    outbox.register("log", lambda jobs: None, limit=2)
+
+    accepted = [outbox.add("log", {"n": i}) for i in range(4)]
+
+    assert accepted == [True, True, False, False]
+    assert outbox.stats()["dropped"] == 2
+
+
+def test_batches_and_rate_limits(tmp_path):
+    """Test that jobs are batched per kind and sent at the drain rate."""
+    outbox = Outbox(str(tmp_path / "outbox.db"), drain_rate=20)
+    batches = []
+    outbox.register("log", lambda jobs: batches.append(len(jobs)), batch_size=4)
+    for i in range(10):
+        outbox.add("log", {"n": i})
+
+    start = time.monotonic()
+    outbox.start()
+    assert outbox.drain(timeout=5)
+    elapsed = time.monotonic() - start
+    outbox.stop()
+
+    assert batches == [4, 4, 2]
+    assert elapsed >= 2 / 20
+
+
+def test_async_sender_is_concurrent_and_ordered(outbox):
+    """Test that the coroutine sender overlaps keys but keeps each key in order."""
+    lock = threading.Lock()
+    active, peak, sent = [0], [0], []
+
+    def handler(jobs):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+            sent.extend(job.payload for job in jobs)
+
+    outbox.register("request", handler)
+    for n in range(12):
+        outbox.add("request", {"key": n % 3, "n": n}, ordering_key=str(n % 3))
+
+    async def run():
+        sender = asyncio.create_task(outbox.send_async(concurrency=3))
+        while outbox.stats()["pending"]:
+            await asyncio.sleep(0.01)
+        outbox.stop()
+        await asyncio.wait_for(sender, timeout=5)
+
+    asyncio.run(run())
+
+    assert peak[0] == 3
+    for key in range(3):
+        assert [p["n"] for p in sent if p["key"] == key] == list(range(key, 12, 3))
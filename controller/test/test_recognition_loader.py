@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+import threading
+import types
+
+import pytest
+from src.services.recognition_loader import RecognitionLoader
+
+
+class FakeService:
+    release = threading.Event()
+
+    def __init__(self):
+        self.release.wait(timeout=5)
+        self.warmed_up = False
+
+    def warm_up(self):
+        self.warmed_up = True
+
+
+class BrokenService:
+    def __init__(self):
+        raise RuntimeError("model file missing")
+
+
+@pytest.fixture
+def fake_module():
+    """Registers a stand-in for the face recognition module."""
+    module = types.ModuleType("fake_face_recognition")
+    module.FakeService = FakeService
+    module.BrokenService = BrokenService
+    sys.modules[module.__name__] = module
+    FakeService.release.clear()
+    yield module.__name__
+    del sys.modules[module.__name__]
+
+
+def test_loader_does_not_block_start(fake_module):
+    """Test that start() returns before the service is built."""
+    loader = RecognitionLoader(fake_module, "FakeService")
+    loader.start()
+    assert loader.ready is False
+
+    FakeService.release.set()
+    service = loader.get(timeout=5)
+    assert service.warmed_up is True
+    assert loader.ready is True
+
+
+def test_early_callers_wait_for_service(fake_module):
+    """Test that callers arriving before the model is ready are served later."""
+    loader = RecognitionLoader(fake_module, "FakeService")
+    results = []
+    callers = [
+        threading.Thread(target=lambda: results.append(loader.get(timeout=5)))
+        for _ in range(3)
+    ]
+    for caller in callers:
+        caller.start()
+
+    FakeService.release.set()
+    for caller in callers:
+        caller.join()
+
+    assert len(results) == 3
+    assert all(result is results[0] for result in results)
+
+
+def test_report_records_timings(fake_module):
+    """Test that the startup report is filled in and passed to callbacks."""
+    loader = RecognitionLoader(fake_module, "FakeService")
+    reports = []
+    loader.add_ready_callback(reports.append)
+    FakeService.release.set()
+    loader.get(timeout=5)
+
+    report = loader.report
+    assert reports == [report]
+    assert report.import_time >= 0
+    assert report.model_load_time >= 0
+    assert report.first_inference_time >= 0
+    assert "model load" in str(report)
+
+
+def test_load_failure_is_raised_to_callers(fake_module):
+    """Test that a failed load surfaces the error instead of hanging."""
+    loader = RecognitionLoader(fake_module, "BrokenService")
+    with pytest.raises(RuntimeError, match="model file missing"):
+        loader.get(timeout=5)
+    assert loader.ready is False
+    assert "n/a" in str(loader.report)
+
+
+def test_controller_start_leaves_cv2_and_torch_to_the_loader():
+    """Test that importing main loads none of the modules the loader defers."""
+    code = (
+        "import sys\n"
+        "from unittest.mock import MagicMock\n"
+        "for name in ('board', 'busio', 'RPi', 'RPi.GPIO', 'adafruit_pn532',\n"
+        "             'adafruit_pn532.i2c', 'picamera2'):\n"
+        "    sys.modules[name] = MagicMock()\n"
+        "import main\n"
+        "print([m for m in ('cv2', 'torch', 'facenet_pytorch') if m in sys.modules])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.splitlines()[-1] == "[]"
@@ -0,0 +1,176 @@
+import os
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+from src.controllers.frame_buffer import (
+    BUFFER_FPS,
+    BUFFER_SECONDS,
+    LORES_SIZE,
+    STILL_SIZE,
+)
+from src.services.recognition_processes import FrameSlots, ProcessRecognitionService
+
+FACTORY = "test_recognition_processes:EchoService"
+
+
+class EchoService:
+    """Stands in for FaceRecognitionService inside the worker processes."""
+
+    def __init__(self):
+        self.enrolled = {}
+
+    def submit(self, image, name=None):
+        future = Future()
+        if name == "crash":
+            os._exit(1)
+        if name == "fail":
+            future.set_exception(ValueError("no face"))
+            return future
+        if name == "slow":
+            time.sleep(0.3)
+        frames = image if isinstance(image, list) else [image]
+        future.set_result(
+            [
+                {
+                    "identity": name,
+                    "pid": os.getpid(),
+                    "burst": isinstance(image, list),
+                    "shapes": [np.shape(f) for f in frames],
+                    "sums": [int(np.sum(f)) for f in frames],
+                    "enrolled": dict(self.enrolled),
+                }
+            ]
+        )
+        return future
+
+    def detect(self, frames):
+        future = Future()
+        future.set_result([[[0, 0, int(np.sum(f)), 1]] for f in frames])
+        return future
+
+    def identify(self, frames, boxes):
+        future = Future()
+        future.set_result(
+            [
+                (os.getpid(), int(np.sum(frame)) + box[2])
+                for frame, frame_boxes in zip(frames, boxes)
+                for box in frame_boxes
+            ]
+        )
+        return future
+
+    def warm_up(self):
+        pass
+
+    def enroll(self, identity, embedding, persist=True):
+        self.enrolled[identity] = persist
+
+
+@pytest.fixture(scope="module")
+def service():
+    """Starts two worker processes shared by the tests in this module."""
+    service = ProcessRecognitionService(workers=2, factory=FACTORY, slot_size=2 << 20)
+    yield service
+    service.close()
+
+
+def test_frames_pass_through_shared_memory(service):
+    """Test that a burst arrives intact without being pickled."""
+    lores = np.full((240, 320, 3), 2, dtype=np.uint8)
+    still = np.full((480, 640, 3), 1, dtype=np.uint8)
+
+    before = service.stats()
+
+    [result] = service.run_on_frames([lores, still], "scan")
+
+    assert result["burst"]
+    assert result["shapes"] == [(240, 320, 3), (480, 640, 3)]
+    assert result["sums"] == [int(lores.sum()), int(still.sum())]
+    assert service.stats()["shared"] == before["shared"] + 1
+    assert service.stats()["pickled"] == before["pickled"]
+
+
+def test_oversized_frames_are_pickled(service):
+    """Test that frames larger than a slot still reach the worker."""
+    frame = np.ones((720, 1280, 3), dtype=np.uint8)
+    before = service.stats()
+
+    [result] = service.run_on_array(frame, "big")
+
+    assert not result["burst"]
+    assert result["sums"] == [int(frame.sum())]
+    assert service.stats()["pickled"] == before["pickled"] + 1
+
+
+def test_tap_burst_fits_a_default_slot():
+    """Test that a tap's lores frames and 12 MP still go through shared memory."""
+    service = ProcessRecognitionService(workers=1, factory=FACTORY)
+    try:
+        lores = [
+            np.full((LORES_SIZE[1], LORES_SIZE[0], 3), i, dtype=np.uint8)
+            for i in range(BUFFER_SECONDS * BUFFER_FPS)
+        ]
+        still = np.full((STILL_SIZE[1], STILL_SIZE[0], 3), 3, dtype=np.uint8)
+
+        [result] = service.run_on_frames(lores + [still], "tap")
+
+        assert result["shapes"][-1] == still.shape
+        assert result["sums"] == [int(f.sum()) for f in lores + [still]]
+        assert service.stats()["shared"] == 1
+        assert service.stats()["pickled"] == 0
+    finally:
+        service.close()
+
+
+def test_requests_spread_over_workers(service):
+    """Test that concurrent requests are balanced across processes."""
+    frame = np.zeros((10, 10, 3), dtype=np.uint8)
+    futures = [service.submit(frame, "slow") for _ in range(4)]
+
+    pids = {future.result(timeout=10)[0]["pid"] for future in futures}
+
+    assert len(pids) == 2
+    assert service.stats()["load"] == [0, 0]
+
+
+def test_detect_and_identify_run_on_workers(service):
+    """Test that video detection and identification requests reach a worker."""
+    frames = [np.full((20, 20, 3), v, dtype=np.uint8) for v in (1, 2)]
+
+    boxes = service.detect(frames).result(timeout=10)
+    matches = service.identify(frames, boxes).result(timeout=10)
+
+    assert boxes == [[[0, 0, 1200, 1]], [[0, 0, 2400, 1]]]
+    assert [distance for _, distance in matches] == [2400, 4800]
+    assert all(pid != os.getpid() for pid, _ in matches)
+
+
+def test_errors_reach_the_caller(service):
+    """Test that a failed recognition fails the caller's future."""
+    with pytest.raises(ValueError, match="no face"):
+        service.run_on_image("fail.jpg")
+
+
+def test_enroll_updates_every_worker(service):
+    """Test that enrollment reaches all workers and only the first persists."""
+    service.enroll("Ada", np.zeros(512))
+    frame = np.zeros((10, 10, 3), dtype=np.uint8)
+
+    futures = [service.submit(frame, "slow") for _ in range(2)]
+    enrolled = sorted(f.result(timeout=10)[0]["enrolled"]["Ada"] for f in futures)
+
+    assert enrolled == [False, True]
+
+
+def test_dead_worker_is_restarted(service):
+    """Test that a crashed worker fails its request and is replaced."""
+    frame = np.zeros((10, 10, 3), dtype=np.uint8)
+
+    with pytest.raises(RuntimeError, match="exited"):
+        service.submit(frame, "crash").result(timeout=10)
+
+    results = [service.submit(frame, "ok").result(timeout=30) for _ in range(2)]
+    assert all(result[0]["identity"] == "ok" for result in results)
+    assert service.stats()["restarted"] == 1
@@ -1,6 +1,8 @@
 import pytest
+import threading
 import time
 from unittest.mock import Mock
+from src import state_machine as state_machine_module
 from src.state_machine import StateMachine
 
 
@@ -25,7 +27,7 @@ def state_machine(mock_nfc_camera, mock_logger_api):
     """Creates a StateMachine instance with mocks."""
     mock_nfc, mock_camera = mock_nfc_camera
     mock_logger, mock_api_service = mock_logger_api
-    sm = StateMachine(mock_nfc, mock_camera, mock_logger, mock_api_service)
+    sm = StateMachine(mock_nfc, mock_camera, mock_logger, mock_api_service, Mock())
     yield sm
     sm.stop()
 
@@ -42,6 +44,14 @@ def test_motion_detected_transition_to_active(state_machine):
     assert state_machine.state == "ACTIVE"
 
 
+def test_motion_detected_notifies_nfc(state_machine):
+    """Test that every motion event speeds up NFC polling."""
+    state_machine.send_event("motion_detected")
+    state_machine.send_event("motion_detected")
+    time.sleep(0.1)
+    assert state_machine.nfc_controller.note_motion.call_count == 2
+
+
 def test_nfc_scan_in_active_transitions_to_streaming(state_machine):
     """Test NFC scan in ACTIVE state transitions to STREAMING."""
     state_machine.send_event("motion_detected")
@@ -51,27 +61,56 @@ def test_nfc_scan_in_active_transitions_to_streaming(state_machine):
     assert state_machine.state == "STREAMING"
 
 
-def test_streaming_timeout_moves_to_active(state_machine):
-    """Test that after 60s in STREAMING, it transitions to ACTIVE."""
+def test_streaming_timeout_moves_to_active(state_machine, monkeypatch):
+    """Test that the STREAMING timeout returns to ACTIVE at its deadline."""
+    monkeypatch.setattr(state_machine_module, "STREAMING_TIMEOUT", 0.2)
     state_machine.send_event("motion_detected")
-    time.sleep(0.1)
     state_machine.send_event("nfc_scanned")
     time.sleep(0.1)
+    assert state_machine.state == "STREAMING"
 
-    state_machine.last_streaming_time = time.time() - 61
-    state_machine.check_timeouts()
-
+    time.sleep(0.2)
     assert state_machine.state == "ACTIVE"
 
 
-def test_active_timeout_moves_to_idle(state_machine):
-    """Test that after 20s in ACTIVE, it transitions to IDLE."""
+def test_active_timeout_moves_to_idle(state_machine, monkeypatch):
+    """Test that the ACTIVE timeout returns to IDLE at its deadline."""
+    monkeypatch.setattr(state_machine_module, "ACTIVE_TIMEOUT", 0.2)
     state_machine.send_event("motion_detected")
-    time.sleep(0.1)
-
-    state_machine.last_motion_time = time.time() - 21
-    state_machine.check_timeouts()
+    time.sleep(0.3)
 
     assert state_machine.state == "IDLE"
+    state_machine.stop()
     state_machine.nfc_controller.enter_low_power_mode.assert_called_once()
     state_machine.camera_controller.turn_off.assert_called_once()
+
+
+def test_idle_thread_does_not_poll(state_machine, monkeypatch):
+    """Test that the event thread sleeps until an event arrives while IDLE."""
+    calls = []
+    monkeypatch.setattr(state_machine, "check_timeouts", lambda: calls.append(1))
+    state_machine.send_event("noise")
+    time.sleep(1)
+
+    assert len(calls) == 1
+
+
+def test_camera_boot_does_not_block_events(state_machine):
+    """Test that events are handled while the camera is still booting."""
+    booted = threading.Event()
+    order = []
+    camera = state_machine.camera_controller
+    camera.turn_on.side_effect = lambda: order.append("on") or booted.wait(5)
+    attendance = state_machine.attendance_service
+    attendance.handle_attendance_event.side_effect = order.append
+
+    state_machine.send_event("motion_detected")
+    state_machine.send_event("nfc_scanned", {"card_id": "A"})
+    time.sleep(0.1)
+    assert state_machine.state == "STREAMING"
+    assert order == ["on"]
+
+    booted.set()
+    state_machine.stop()
+    assert order[:2] == ["on", "on"]
+    assert order[2]["card_id"] == "A"
@@ -0,0 +1,53 @@
+from unittest.mock import patch
+
+from src.services.tap_cache import TapCache
+
+
+def _at(now):
+    return patch("src.services.tap_cache.time.monotonic", return_value=now)
+
+
+def test_add_drops_repeats_until_expiry():
+    """Test that a key is only added again once its entry has expired."""
+    cache = TapCache(ttl=10)
+    with _at(100.0):
+        assert cache.add("card-1") is True
+        assert cache.add("card-1") is False
+    with _at(109.0):
+        assert cache.add("card-1") is False
+    with _at(110.0):
+        assert cache.add("card-1") is True
+    assert cache.stats() == {"size": 1, "hits": 2, "misses": 2, "evictions": 0}
+
+
+def test_set_overrides_ttl():
+    """Test that a per-entry ttl outlives the cache default."""
+    cache = TapCache(ttl=10)
+    with _at(100.0):
+        cache.set("card-1", "Jane Doe", ttl=3600)
+    with _at(200.0):
+        assert cache.get("card-1") == "Jane Doe"
+        assert cache.get("card-2", "missing") == "missing"
+
+
+def test_evicts_least_recently_used():
+    """Test that the least recently used key is evicted when full."""
+    cache = TapCache(maxsize=2, ttl=10)
+    cache.set("a")
+    cache.set("b")
+    assert cache.get("a") is True
+    cache.set("c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") is True
+    assert cache.get("c") is True
+    assert len(cache) == 2
+    assert cache.stats()["evictions"] == 1
+
+
+def test_discard_allows_retry():
+    """Test that a discarded key can be added again at once."""
+    cache = TapCache(ttl=10)
+    assert cache.add("card-1")
+    cache.discard("card-1")
+    assert cache.add("card-1")
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+from src.services.thread_pool import (
+    BACKGROUND,
+    CRITICAL,
+    NORMAL,
+    PoolFull,
+    ThreadPool,
+)
+
+
+def _blocked_pool(**kwargs):
+    """Creates a one-worker pool whose worker is busy until released."""
+    pool = ThreadPool(num_workers=1, **kwargs)
+    started = threading.Event()
+    release = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(timeout=5)
+
+    pool.submit(block)
+    started.wait(timeout=5)
+    return pool, release
+
+
+def test_returns_futures():
+    """Test that submitted tasks resolve their futures."""
+    pool = ThreadPool(num_workers=2)
+
+    assert pool.submit(lambda x: x * 2, 21).result(timeout=5) == 42
+    with pytest.raises(ZeroDivisionError):
+        pool.submit(lambda: 1 / 0).result(timeout=5)
+    pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["completed"] == 1
+    assert stats["failed"] == 1
+
+
+def test_runs_higher_priority_first():
+    """Test that critical tasks overtake queued background and normal ones."""
+    pool, release = _blocked_pool()
+    order = []
+    for priority, label in [(BACKGROUND, "video"), (NORMAL, "log"), (CRITICAL, "scan")]:
+        pool.submit_with_priority(priority, order.append, label)
+
+    assert pool.stats()["depth"] == {CRITICAL: 1, NORMAL: 1, BACKGROUND: 1}
+    release.set()
+    pool.shutdown()
+    assert order == ["scan", "log", "video"]
+
+
+def test_reject_policy():
+    """Test that a full queue fails new futures with PoolFull."""
+    pool, release = _blocked_pool(max_pending=1, overflow="reject")
+    pool.submit(time.sleep, 0)
+    future = pool.submit_with_priority(CRITICAL, time.sleep, 0)
+
+    with pytest.raises(PoolFull):
+        future.result(timeout=1)
+    release.set()
+    pool.shutdown()
+    assert pool.stats()["rejected"] == 1
+
+
+def test_drop_lowest_policy():
+    """Test that a critical task evicts a queued background task."""
+    pool, release = _blocked_pool(max_pending=1, overflow="drop_lowest")
+    background = pool.submit_with_priority(BACKGROUND, time.sleep, 0)
+    critical = pool.submit_with_priority(CRITICAL, lambda: "scan")
+    another = pool.submit_with_priority(BACKGROUND, time.sleep, 0)
+
+    assert background.cancelled()
+    with pytest.raises(PoolFull):
+        another.result(timeout=1)
+    release.set()
+    assert critical.result(timeout=5) == "scan"
+    pool.shutdown()
+    assert pool.stats()["dropped"] == 1
+
+
+def test_block_policy_waits_for_room():
+    """Test that the block policy waits for a worker to free a slot."""
+    pool, release = _blocked_pool(max_pending=1, overflow="block", block_timeout=5)
+    pool.submit(time.sleep, 0)
+    threading.Timer(0.1, release.set).start()
+
+    assert pool.submit(lambda: "done").result(timeout=5) == "done"
+    pool.shutdown()
+
+
+def test_shutdown_drains_or_cancels():
+    """Test that shutdown runs queued work by default and cancels it on request."""
+    pool, release = _blocked_pool()
+    queued = pool.submit(lambda: "queued")
+    release.set()
+    pool.shutdown(drain=True)
+    assert queued.result(timeout=1) == "queued"
+
+    pool, release = _blocked_pool()
+    queued = pool.submit(lambda: "queued")
+    pool.shutdown(wait=False, drain=False)
+    release.set()
+    assert queued.cancelled()
+    with pytest.raises(RuntimeError):
+        pool.submit(lambda: None)
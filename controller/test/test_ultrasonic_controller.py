@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import Mock, patch
-from src.controllers.ultrasonic import UltrasonicController
+from src.controllers.gpio_sim import SimulatedGPIO
+from src.controllers.ultrasonic import RangeFilter, UltrasonicController
 
 
 @pytest.fixture
@@ -36,3 +37,80 @@ def test_motion_detection_triggers_event(ultrasonic, mock_state_machine):
     mock_state_machine.send_event.assert_called_with(
         "motion_detected", {"distance": 30}
     )
+
+
+def _controller(state_machine, distance, sample_rate=50):
+    gpio = SimulatedGPIO(distance)
+    return UltrasonicController(state_machine, gpio=gpio, sample_rate=sample_rate)
+
+
+def _feed(controller, readings, interval=0.2):
+    """Runs detect_motion's per-sample step on fixed readings and times."""
+    for i, distance in enumerate(readings):
+        controller.process_reading(distance, 100.0 + i * interval)
+
+
+def test_get_distance_times_echo_edges():
+    """Test that the ping is timed from the rising and falling echo edges."""
+    ticks = iter([10.0, 10.0 + 120.0 / 17150])
+    controller = UltrasonicController(Mock(), gpio=Mock(), clock=lambda: next(ticks))
+
+    def output(pin, level):
+        # The sensor answers the end of the trigger pulse with both edges.
+        if not level:
+            controller._on_echo_edge(controller.echo_pin)
+            controller._on_echo_edge(controller.echo_pin)
+
+    controller.gpio.output.side_effect = output
+
+    assert controller.get_distance() == pytest.approx(120.0, abs=0.01)
+
+
+def test_get_distance_times_out_without_echo():
+    """Test that a lost echo returns None instead of hanging."""
+    controller = _controller(Mock(), lambda now: None)
+
+    assert controller.get_distance() is None
+
+
+def test_range_filter_ignores_single_spikes():
+    """Test that one spurious reading barely moves the filtered distance."""
+    range_filter = RangeFilter(window=5, alpha=0.5)
+    for distance in [100, 100, 100, 20, 100, 100]:
+        value = range_filter.update(distance)
+
+    assert value == 100
+
+
+def test_approach_sends_one_motion_event(mock_state_machine):
+    """Test that someone walking up sends a single motion event."""
+    with patch("src.controllers.ultrasonic.GPIO"):
+        controller = UltrasonicController(mock_state_machine)
+
+    _feed(controller, [150.0] * 5 + [30.0] * 20)
+
+    mock_state_machine.send_event.assert_called_once()
+    event, data = mock_state_machine.send_event.call_args.args
+    assert event == "motion_detected"
+    assert data["distance"] < controller.threshold
+
+
+def test_noisy_still_scene_sends_no_events(mock_state_machine):
+    """Test that occasional short echoes do not count as motion."""
+    with patch("src.controllers.ultrasonic.GPIO"):
+        controller = UltrasonicController(mock_state_machine)
+
+    _feed(controller, [20.0 if i % 7 == 3 else 45.0 for i in range(100)])
+
+    mock_state_machine.send_event.assert_not_called()
+
+
+def test_lost_echoes_are_skipped(mock_state_machine):
+    """Test that a reading without an echo leaves the filter untouched."""
+    with patch("src.controllers.ultrasonic.GPIO"):
+        controller = UltrasonicController(mock_state_machine)
+
+    _feed(controller, [45.0, None, None, 45.0])
+
+    assert list(controller.filter.readings) == [45.0, 45.0]
+    mock_state_machine.send_event.assert_not_called()
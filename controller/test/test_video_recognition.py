@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("facenet_pytorch")
+cv2 = pytest.importorskip("cv2")
+
+from src.services.gallery import EmbeddingGallery
+from src.services.tracking import IoUTracker, iou
+from src.services.video_recognition import FAILED, VERIFIED, VideoRecognitionEngine
+
+FRAMES = 60
+
+
+class SquareMTCNN:
+    """Detects the bright square in a frame as a face."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect(self, images, landmarks=False):
+        self.calls += 1
+        found = [self._detect(img) for img in images]
+        return tuple(list(x) for x in zip(*found))
+
+    def _detect(self, img):
+        ys, xs = np.nonzero(np.asarray(img)[:, :, 0] > 128)
+        if not len(xs):
+            return None, None, None
+        box = [xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]
+        return np.array([box], dtype=float), np.array([0.99]), np.zeros((1, 5, 2))
+
+    def extract(self, img, boxes, save_path):
+        return torch.ones((len(boxes), 3, 160, 160))
+
+
+class StubEmbedder:
+    def __init__(self):
+        self.faces = 0
+
+    def __call__(self, faces):
+        self.faces += len(faces)
+        embeddings = np.zeros((len(faces), 512), dtype=np.float32)
+        embeddings[:, 1] = 1.0
+        return embeddings
+
+
+@pytest.fixture
+def service(stub_recognition_service):
+    """Creates a service with stub models that knows one face, "Jane Doe"."""
+    return stub_recognition_service(
+        SquareMTCNN(),
+        StubEmbedder(),
+        EmbeddingGallery(["Jane Doe"], np.eye(512, dtype=np.float32)[[1]]),
+    )
+
+
+@pytest.fixture
+def clip(tmp_path):
+    """Writes a 640x480 clip of a 120x140 square moving 2 px per frame."""
+    path = str(tmp_path / "Jane Doe (0.40)_04142025_165346_888.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 20, (640, 480))
+    for i in range(FRAMES):
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        frame[100:240, 100 + 2 * i : 220 + 2 * i] = 255
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def test_iou():
+    """Test intersection over union for identical, shifted and disjoint boxes."""
+    assert iou([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
+    assert iou([0, 0, 10, 10], [5, 0, 15, 10]) == pytest.approx(50 / 150)
+    assert iou([0, 0, 10, 10], [20, 20, 30, 30]) == 0.0
+
+
+def test_tracker_follows_moving_box():
+    """Test that a moving box keeps its track and a distant one starts another."""
+    tracker = IoUTracker(threshold=0.3, max_missed=1, limit=5)
+    [first] = tracker.update([[0, 0, 100, 100]], 0)
+    [same] = tracker.update([[20, 0, 120, 100]], 5)
+    assert same is first
+    assert tracker.boxes(10)[0][1].tolist() == [40, 0, 140, 100]
+
+    [other] = tracker.update([[400, 400, 500, 500]], 10)
+    assert other is not first
+    tracker.update([[400, 400, 500, 500]], 15)
+    assert tracker.tracks == [other]
+
+
+def test_clip_is_verified_in_one_pass(service, clip, tmp_path):
+    """Test that a clip of the expected face is verified with few detections."""
+    engine = VideoRecognitionEngine(
+        service, stride=5, batch=2, verify_matches=3, output_dir=str(tmp_path / "out")
+    )
+    result = engine.process(clip, expected="Jane Doe")
+    engine.artifact_writer.flush()
+
+    assert result["verdict"] == VERIFIED
+    assert result["identity"] == "Jane Doe"
+    assert result["frames"] == FRAMES
+    # Detection stops after the chunk in which the third match was found.
+    assert result["detections"] == 4
+    assert service.mtcnn.calls == 2
+    assert result["embeddings"] == 3
+    assert result["videoPath"].endswith("_04142025_165346_888 VV.mp4")
+    frames = cv2.VideoCapture(result["videoPath"]).get(cv2.CAP_PROP_FRAME_COUNT)
+    assert frames == FRAMES
+    assert cv2.imread(result["annotatedPath"]) is not None
+    assert cv2.imread(result["croppedPath"]).shape == (240, 170, 3)
+
+
+def test_tracked_face_is_not_embedded_again(service, clip, tmp_path):
+    """Test that a resolved track is followed without further embeddings."""
+    engine = VideoRecognitionEngine(
+        service, stride=5, batch=4, verify_matches=3, output_dir=str(tmp_path / "out")
+    )
+    result = engine.process(clip, expected="John Roe", write_video=False)
+
+    assert result["verdict"] == FAILED
+    assert result["matches"] == 0
+    assert result["detections"] == FRAMES // 5
+    assert result["embeddings"] == 3
+    assert service.embedder.faces == 3
+    assert result["identity"] == "Jane Doe"
+    assert result["videoPath"] is None
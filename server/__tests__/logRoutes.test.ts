@@ -48,6 +48,46 @@ describe('Log API', () => {
     expect(response.status).toBe(201);
   });
 
+  test('POST /api/log/batch should store every log in the batch', async () => {
+    const timestamp = Date.now() - 60000;
+    const response = await request(app)
+      .post('/api/log/batch')
+      .set('Authorization', `Bearer ${token}`)
+      .send({
+        logs: [
+          {
+            userId: 'Controller',
+            action: 'Camera is ON',
+            entityType: '',
+            entityId: '',
+            timestamp,
+          },
+          {
+            userId: 'Controller',
+            action: 'Camera is OFF',
+            entityType: '',
+            entityId: '',
+          },
+        ],
+      });
+
+    expect(response.status).toBe(201);
+    expect(response.body).toHaveProperty('count', 2);
+
+    const logs = await db.runAndReadAll('SELECT action FROM log');
+    expect(logs).toHaveLength(2);
+  });
+
+  test('POST /api/log/batch without logs should return 400', async () => {
+    const response = await request(app)
+      .post('/api/log/batch')
+      .set('Authorization', `Bearer ${token}`)
+      .send({});
+
+    expect(response.status).toBe(400);
+    expect(response.body).toHaveProperty('error');
+  });
+
   test('GET /api/log/{id} should return 200 for valid log ID', async () => {
     const logResponse = await request(app)
       .post('/api/log')
@@ -236,6 +236,74 @@ describe('Session Routes', () => {
     expect(response.body).toHaveProperty('error');
   });
 
+  test('POST /api/session/:sessionId/attendance/bulk should return 201 and one record per student', async () => {
+    const sessionResponse = await SessionService.createSession(
+      mockStartTime,
+      mockEndTime,
+      classId
+    );
+
+    const students = await Promise.all(
+      ['Jane Doe', 'John Roe', 'Alex Poe'].map((name) =>
+        StudentService.createStudent(name, 'path/to/image.jpg')
+      )
+    );
+    const studentIds = students.map((student) => student.id);
+
+    const response = await request(app)
+      .post(`/api/session/${sessionResponse.id}/attendance/bulk`)
+      .set('Authorization', `Bearer ${token}`)
+      .send({ studentIds });
+
+    expect(response.status).toBe(201);
+    expect(response.body).toHaveLength(3);
+    expect(
+      response.body.map((record: { studentId: string }) => record.studentId)
+    ).toEqual(expect.arrayContaining(studentIds));
+    expect(response.body[0]).toHaveProperty('sessionId', sessionResponse.id);
+    expect(response.body[0]).toHaveProperty('portraitCaptured', false);
+
+    const retry = await request(app)
+      .post(`/api/session/${sessionResponse.id}/attendance/bulk`)
+      .set('Authorization', `Bearer ${token}`)
+      .send({ studentIds });
+
+    expect(retry.status).toBe(201);
+    expect(retry.body).toHaveLength(3);
+  });
+
+  test('POST /api/session/:sessionId/attendance/bulk with an unknown student should return 400 and error details', async () => {
+    const sessionResponse = await SessionService.createSession(
+      mockStartTime,
+      mockEndTime,
+      classId
+    );
+
+    const response = await request(app)
+      .post(`/api/session/${sessionResponse.id}/attendance/bulk`)
+      .set('Authorization', `Bearer ${token}`)
+      .send({ studentIds: ['missing-student'] });
+
+    expect(response.status).toBe(400);
+    expect(response.body).toHaveProperty('error');
+  });
+
+  test('POST /api/session/:sessionId/attendance/bulk without studentIds should return 400 and error details', async () => {
+    const sessionResponse = await SessionService.createSession(
+      mockStartTime,
+      mockEndTime,
+      classId
+    );
+
+    const response = await request(app)
+      .post(`/api/session/${sessionResponse.id}/attendance/bulk`)
+      .set('Authorization', `Bearer ${token}`)
+      .send({});
+
+    expect(response.status).toBe(400);
+    expect(response.body).toHaveProperty('error');
+  });
+
   test('PUT /api/attendance/:attendanceId should return 200 and updated attendance details', async () => {
     const sessionResponse = await SessionService.createSession(
       mockStartTime,
@@ -30,6 +30,17 @@ const createLog = async (req: Request, res: Response, next: NextFunction) => {
   }
 };
 
+const createLogs = async (req: Request, res: Response, next: NextFunction) => {
+  const { logs } = req.body;
+  try {
+    const newLogs = await LogService.createLogs(logs);
+    res.status(201).send({ count: newLogs.length });
+    next();
+  } catch (e: any) {
+    res.status(400).json({ error: e.message });
+  }
+};
+
 const deleteLog = async (req: Request, res: Response, next: NextFunction) => {
   const { id } = req.params;
   try {
@@ -57,4 +68,4 @@ const getLogsPaginated = async (
   }
 };
 
-export { getLog, createLog, deleteLog, getLogsPaginated };
+export { getLog, createLog, createLogs, deleteLog, getLogsPaginated };
@@ -107,6 +107,26 @@ const addAttendanceRecord = async (
   }
 };
 
+const addAttendanceRecords = async (
+  req: Request,
+  res: Response,
+  next: NextFunction
+) => {
+  const { sessionId } = req.params;
+  const { studentIds } = req.body;
+  try {
+    const attendance = await SessionService.addAttendanceRecords(
+      sessionId,
+      studentIds
+    );
+    res.status(201).send(attendance);
+  } catch (e: any) {
+    res.status(400).json({ error: e.message });
+  } finally {
+    next();
+  }
+};
+
 const modifyAttendanceRecord = async (
   req: Request,
   res: Response,
@@ -219,6 +239,7 @@ export {
   getSession,
   updateSession,
   addAttendanceRecord,
+  addAttendanceRecords,
   modifyAttendanceRecord,
   deleteAttendanceRecord,
   getAttendanceRecordsForSession,
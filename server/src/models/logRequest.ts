@@ -3,4 +3,6 @@ export interface CreateLogRequest {
   action: string;
   entityType: string;
   entityId: string;
+  // Milliseconds since the epoch; defaults to the time the log is stored
+  timestamp?: number;
 }
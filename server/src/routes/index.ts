@@ -6,6 +6,7 @@ import {
   getSession,
   updateSession,
   addAttendanceRecord,
+  addAttendanceRecords,
   modifyAttendanceRecord,
   deleteAttendanceRecord,
   getAttendanceRecordsForProfessorPaged,
@@ -33,6 +34,7 @@ import {
 import {
   getLog,
   createLog,
+  createLogs,
   deleteLog,
   getLogsPaginated,
 } from '../controllers/log.js';
@@ -86,6 +88,11 @@ router.delete('/session/:id', verifyToken, deleteSession);
 router.get('/session/:id', verifyToken, getSession);
 router.put('/session/:id', verifyToken, updateSession);
 router.post('/session/:sessionId/attendance', verifyToken, addAttendanceRecord);
+router.post(
+  '/session/:sessionId/attendance/bulk',
+  verifyToken,
+  addAttendanceRecords
+);
 router.delete(
   '/session/:sessionId/attendance/:attendanceId',
   verifyToken,
@@ -107,6 +114,7 @@ router.delete('/student/:id', verifyToken, deleteStudent);
 // Log routes
 router.get('/log/:id', verifyToken, getLog);
 router.post('/log', verifyToken, createLog);
+router.post('/log/batch', verifyToken, createLogs);
 router.delete('/log/:id', verifyToken, deleteLog);
 router.get('/logs', verifyToken, getLogsPaginated);
 
@@ -1,4 +1,5 @@
 import { v4 as uuidv4 } from 'uuid';
+import { DuckDBTimestampValue } from '@duckdb/node-api';
 import { CreateLogRequest } from '../models/logRequest.js';
 import { Log } from '../models/log.js';
 import { LogPageResponse } from '../models/logPageResponse.js';
@@ -36,7 +37,11 @@ class LogService {
 
   async createLog(logDetails: CreateLogRequest): Promise<Log> {
     const id = uuidv4();
-    const currentDate = this.db.getCurrentDate();
+    const currentDate = logDetails.timestamp
+      ? new DuckDBTimestampValue(
+          BigInt(Math.round(logDetails.timestamp * 1000))
+        )
+      : this.db.getCurrentDate();
 
     const preparedStmt = await this.db.getPreparedStatementObject(
       'INSERT INTO log (id, timestamp, userId, action, entityType, entityId) VALUES ($1, $2, $3, $4, $5, $6)'
@@ -61,6 +66,18 @@ class LogService {
     };
   }
 
+  async createLogs(logs: CreateLogRequest[]): Promise<Log[]> {
+    if (!Array.isArray(logs) || logs.length === 0) {
+      throw new Error('logs must be a non-empty list');
+    }
+
+    const created: Log[] = [];
+    for (const logDetails of logs) {
+      created.push(await this.createLog(logDetails));
+    }
+    return created;
+  }
+
   async deleteLog(id: string) {
     const existingLog = await this.getLog(id);
     await this.db.runWithNoReturned(`DELETE FROM log WHERE id = ?`, [id]);
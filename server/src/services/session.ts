@@ -117,6 +117,57 @@ class SessionService {
     return await this.getAttendanceRecord(id);
   }
 
+  async addAttendanceRecords(
+    sessionId: string,
+    studentIds: string[]
+  ): Promise<Attendance[]> {
+    if (!sessionId || !Array.isArray(studentIds) || studentIds.length === 0) {
+      throw new Error('sessionId and a non-empty studentIds list are required');
+    }
+
+    const session = await this.getSession(sessionId);
+    const uniqueIds = [...new Set(studentIds)];
+    const placeholders = uniqueIds.map(() => '?').join(', ');
+
+    const students = await this.db.runAndReadAll<{ id: string }>(
+      `SELECT id FROM student WHERE id IN (${placeholders})`,
+      uniqueIds
+    );
+    if (students.length !== uniqueIds.length) {
+      const found = new Set(students.map((student) => student.id));
+      const missing = uniqueIds.filter((id) => !found.has(id));
+      throw new Error(`Student with id '${missing[0]}' not found`);
+    }
+
+    // Students that already have a record for this session keep it, so a
+    // retried roster upload does not create duplicates.
+    const existing = await this.db.runAndReadAll<{ studentId: string }>(
+      `SELECT studentId FROM attendance WHERE sessionId = ? AND studentId IN (${placeholders})`,
+      [session.id, ...uniqueIds]
+    );
+    const existingIds = new Set(existing.map((row) => row.studentId));
+    const newIds = uniqueIds.filter((id) => !existingIds.has(id));
+
+    if (newIds.length > 0) {
+      await this.db.runWithNoReturned(
+        `INSERT INTO attendance (id, studentId, sessionId, portraitUrl, portraitCaptured) VALUES ${newIds.map(() => '(?, ?, ?, ?, ?)').join(', ')}`,
+        newIds.flatMap((studentId) => [
+          uuidv4(),
+          studentId,
+          session.id,
+          '',
+          false,
+        ])
+      );
+    }
+
+    const records = await this.getAttendanceRecordsForSessions([session.id]);
+    const requested = new Set(uniqueIds);
+    return (records[session.id] || []).filter((record) =>
+      requested.has(record.studentId)
+    );
+  }
+
   async getAttendanceRecordsForSessions(
     sessionIds: string[]
   ): Promise<Record<string, Attendance[]>> {